@@ -0,0 +1,189 @@
+"""
+Admission control for the MCP server.
+Every transport (POST / and /mcp, both WebSockets, stdio) passes each
+decoded message through one AdmissionController before routing it:
+- Rate limit: a token bucket per client (the peer address for HTTP and
+  WebSockets, the session for stdio) refilled at MCP_RATE_LIMIT_RPS
+  requests per second, holding at most MCP_RATE_LIMIT_BURST. A batch costs
+  one token per member (at most a full bucket). 0 (the default) disables
+  rate limiting.
+- Concurrency: at most MCP_MAX_IN_FLIGHT messages are handled at once
+  across all clients (0 for no limit). Later messages wait in a FIFO queue
+  of at most MCP_MAX_QUEUED entries, for at most MCP_MAX_QUEUE_MS; a
+  message that finds the queue full, or waits longer, is shed.
+Rejected messages are answered right away with -32000 "Server overloaded"
+(or "Rate limit exceeded"), with the reason and, where it is known, the
+milliseconds to wait before retrying in the error data. Cancel notifications
+are always admitted, since they only reduce load.
+
+The limits are per process: with several HTTP workers, each one applies
+them to the traffic it receives.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Union
+
+import jsonrpc
+
+DEFAULT_MAX_IN_FLIGHT = 256
+DEFAULT_MAX_QUEUED = 1024
+DEFAULT_MAX_QUEUE_MS = 1000
+DEFAULT_MAX_CLIENTS = 10000
+
+REASON_RATE_LIMITED = "rate_limited"
+REASON_QUEUE_FULL = "queue_full"
+REASON_QUEUE_TIMEOUT = "queue_timeout"
+
+# Methods admitted without counting against any limit
+EXEMPT_METHODS = frozenset(["notifications/cancelled"])
+
+
+class Rejected(Exception):
+    """A message the server will not handle now"""
+
+    def __init__(self, reason: str, retry_after: Optional[float] = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def message(self) -> str:
+        return "Rate limit exceeded" if self.reason == REASON_RATE_LIMITED else "Server overloaded"
+
+    def response(self, data: Any) -> Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        """The error response to a message (or batch); None if it only holds notifications"""
+        error = {"reason": self.reason}
+        if self.retry_after is not None:
+            error["retry_after_ms"] = max(1, round(self.retry_after * 1000))
+        members = data if isinstance(data, list) else [data]
+        responses = [
+            jsonrpc.error_response(jsonrpc.SERVER_OVERLOADED, self.message, jsonrpc.extract_id(member), error)
+            for member in members if not jsonrpc.is_notification(member)
+        ]
+        if not isinstance(data, list):
+            return responses[0] if responses else None
+        return responses or None
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+
+
+class AdmissionController:
+    """Per-client rate limits and a global in-flight cap with a bounded wait queue"""
+
+    def __init__(self, rate: float = 0, burst: Optional[int] = None, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 max_queued: int = DEFAULT_MAX_QUEUED, max_queue_ms: int = DEFAULT_MAX_QUEUE_MS,
+                 max_clients: int = DEFAULT_MAX_CLIENTS):
+        self.rate = rate
+        self.burst = max(1, burst if burst else int(rate) or 1)
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.max_queue_seconds = max_queue_ms / 1000
+        self.max_clients = max(1, max_clients)
+        self.in_flight = 0
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Any) -> "AdmissionController":
+        return cls(rate=config.rate_limit_rps, burst=config.rate_limit_burst, max_in_flight=config.max_in_flight,
+                   max_queued=config.max_queued, max_queue_ms=config.max_queue_ms)
+
+    @staticmethod
+    def exempt(data: Any) -> bool:
+        return isinstance(data, dict) and data.get("method") in EXEMPT_METHODS
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def _take_token(self, client: str, cost: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                # Least recently seen clients are forgotten first; a forgotten
+                # client starts again with a full bucket
+                while len(self._buckets) >= self.max_clients:
+                    self._buckets.popitem(last=False)
+                bucket = self._buckets[client] = TokenBucket(self.burst, now)
+            else:
+                self._buckets.move_to_end(client)
+                bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+                bucket.updated = now
+            # A batch larger than the burst drains a full bucket
+            cost = min(cost, self.burst)
+            if bucket.tokens < cost:
+                raise Rejected(REASON_RATE_LIMITED, (cost - bucket.tokens) / self.rate)
+            bucket.tokens -= cost
+
+    async def admit(self, client: str, data: Any) -> float:
+        """Wait for a slot for one message; returns the seconds spent queued.
+
+        Raises Rejected when the client is over its rate or the server is
+        overloaded. Every admitted message must be followed by `release()`.
+        """
+        if self.rate:
+            self._take_token(client, len(data) if isinstance(data, list) and data else 1)
+        with self._lock:
+            if not self.max_in_flight or (self.in_flight < self.max_in_flight and not self._waiters):
+                self.in_flight += 1
+                return 0.0
+            if len(self._waiters) >= self.max_queued:
+                raise Rejected(REASON_QUEUE_FULL, self.max_queue_seconds)
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.max_queue_seconds)
+        except asyncio.TimeoutError:
+            if not (waiter.done() and not waiter.cancelled()):
+                raise Rejected(REASON_QUEUE_TIMEOUT, self.max_queue_seconds) from None
+            # The slot was handed over just as the wait timed out
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # The slot was handed over as the caller left
+            raise
+        return time.perf_counter() - start
+
+    def release(self) -> None:
+        """Free the slot of a finished message, handing it to the oldest waiter"""
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if not waiter.done():
+                    break
+            else:
+                self.in_flight -= 1
+                return
+        # The slot changes hands without in_flight dropping; waiters may
+        # belong to another event loop (dual mode runs two)
+        waiter.get_loop().call_soon_threadsafe(self._hand_over, waiter)
+
+    def _hand_over(self, waiter: asyncio.Future) -> None:
+        if waiter.done():
+            self.release()  # It timed out in the meantime: pass the slot on
+        else:
+            waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "max_in_flight": self.max_in_flight,
+                "max_queued": self.max_queued,
+                "rate_limit_rps": self.rate,
+                "rate_limit_burst": self.burst,
+                "clients": len(self._buckets)
+            }
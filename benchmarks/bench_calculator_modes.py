@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the calculator's numeric modes (auto, float, decimal,
+fraction) on flat lists of floats, of decimal strings and of rows, from 1k
+to 100k operands, plus the time the guards take to reject an oversized
+exact multiply before doing any of the work.
+
+Usage: python benchmarks/bench_calculator_modes.py [--sizes 1000,100000] [--repeat 3]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numeric
+from calculator import CalculatorTool
+
+OPERATIONS = ("add", "mean", "sum_of_squares", "multiply")
+
+
+def best_ms(tool: CalculatorTool, params: Dict[str, Any], repeat: int) -> str:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            tool.execute(params)
+        except ValueError as e:
+            return f"({e})"[:30]
+        best = min(best, time.perf_counter() - start)
+    return f"{best * 1000:.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,100000", help="comma-separated operand counts")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the best is reported")
+    args = parser.parse_args()
+
+    tool = CalculatorTool()
+    rng = random.Random(3)
+    for size in (int(s) for s in args.sizes.split(",")):
+        floats = [rng.uniform(0.5, 1.5) for _ in range(size)]
+        strings = [f"{x:.6f}" for x in floats]
+        rows = [floats[i:i + 4] for i in range(0, size - 3, 4)]
+        print(f"\n{size} operands, ms per call")
+        print(f"{'case':<28}" + "".join(f"{mode:>12}" for mode in numeric.MODES))
+        for label, numbers in (("floats", floats), ("decimal strings", strings), ("rows x 4", rows)):
+            for operation in OPERATIONS:
+                cells = []
+                for mode in numeric.MODES:
+                    if mode == numeric.MODE_AUTO and numbers is strings:
+                        cells.append("-")
+                        continue
+                    cells.append(best_ms(tool, {"operation": operation, "numbers": numbers, "mode": mode},
+                                         args.repeat))
+                print(f"{label + ' ' + operation:<28}" + "".join(f"{cell:>12}" for cell in cells))
+
+    huge = [2 ** (numeric.DEFAULT_MAX_OPERAND_BITS - 1) + 1] * 1000
+    start = time.perf_counter()
+    for mode in (numeric.MODE_AUTO, numeric.MODE_FRACTION):
+        try:
+            tool.execute({"operation": "multiply", "numbers": huge, "mode": mode})
+        except ValueError as e:
+            print(f"\nguard ({mode}): rejected 1000 x {numeric.DEFAULT_MAX_OPERAND_BITS}-bit multiply "
+                  f"in {(time.perf_counter() - start) * 1000:.2f} ms: {e}")
+        start = time.perf_counter()
+
+
+if __name__ == "__main__":
+    main()
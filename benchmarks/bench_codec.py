@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the JSON-RPC hot path: wire bytes in, response bytes out.
+Compares the previous pydantic path (JsonRpcRequest(**data), .dict(), then
+FastAPI's jsonable_encoder + json.dumps) with the jsonrpc codec used by the
+dispatcher, for list_tools and execute requests.
+
+Usage: python benchmarks/bench_codec.py [--seconds 2]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import warnings
+from typing import Any, Dict, Literal, Optional, Union
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MCP_HTTP_MODE", "1")
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+import jsonrpc
+from router import Context
+from service import ROUTER, TOOLS
+from sessions import Session
+
+
+class JsonRpcRequest(BaseModel):
+    jsonrpc: Literal["2.0"]
+    method: str
+    params: Optional[Dict[str, Any]] = None
+    id: Optional[Union[int, str]] = None
+
+
+class JsonRpcResponse(BaseModel):
+    jsonrpc: Literal["2.0"] = "2.0"
+    result: Optional[Any] = None
+    error: Optional[Dict[str, Any]] = None
+    id: Optional[Union[int, str]] = None
+
+
+async def legacy_handle(body: bytes) -> bytes:
+    """The request path before the codec: pydantic models and double encoding"""
+    request_model = JsonRpcRequest(**json.loads(body))
+    if request_model.method == "list_tools":
+        result = {}
+        for name, tool in TOOLS.items():
+            result[name] = {"name": tool.name, "description": tool.description, "parameters": tool.parameters}
+    else:
+        result = []
+        for call in request_model.params["function_calls"]:
+            result.append({"status": "success", "result": TOOLS[call["name"]].execute(call["parameters"])})
+    response = JsonRpcResponse(result=result, id=request_model.id).dict()
+    return json.dumps(jsonable_encoder(response), separators=(",", ":")).encode("utf-8")
+
+
+CONTEXT = Context(Session(initialized=True), "benchmark")
+
+
+async def codec_handle(body: bytes) -> bytes:
+    return jsonrpc.dumps(await ROUTER.dispatch(jsonrpc.loads(body), CONTEXT))
+
+
+async def measure(handler, body: bytes, seconds: float) -> float:
+    count = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            await handler(body)
+        count += 100
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0, help="duration of each measurement")
+    args = parser.parse_args()
+
+    requests = {
+        "list_tools": {"jsonrpc": "2.0", "method": "list_tools", "id": 1},
+        "execute": {
+            "jsonrpc": "2.0",
+            "method": "execute",
+            "params": {"function_calls": [
+                {"name": "calculator", "parameters": {"operation": "add", "numbers": [1, 2, 3, 4]}}
+            ]},
+            "id": 2
+        }
+    }
+
+    print(f"codec backend: {'orjson' if jsonrpc.orjson is not None else 'json'}")
+    print(f"{'method':<12}{'pydantic req/s':>16}{'codec req/s':>14}{'speed-up':>10}")
+    for method, request in requests.items():
+        body = json.dumps(request).encode("utf-8")
+        before = asyncio.run(measure(legacy_handle, body, args.seconds))
+        after = asyncio.run(measure(codec_handle, body, args.seconds))
+        print(f"{method:<12}{before:>16,.0f}{after:>14,.0f}{after / before:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
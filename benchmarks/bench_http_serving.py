@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the HTTP serving settings: spawns the server once per profile
+(event loop, parser, access log, server) and measures POST /mcp `execute`
+requests from `--concurrency` clients three ways:
+- keep-alive: every client reuses one HTTP/1.1 connection
+- reconnect: every request opens a new connection, as clients do when the
+  server's keep-alive timeout closed their idle connection
+- h2 (Hypercorn profiles, needs httpx and h2): all clients share one HTTP/2
+  connection, next to httpx over HTTP/1.1 connections for reference
+Profiles that need a module the interpreter lacks (uvloop, httptools,
+hypercorn) are skipped; `--python` runs the server with another interpreter,
+e.g. a virtualenv with the optional packages installed.
+
+Usage: python benchmarks/bench_http_serving.py [--python .venv/bin/python]
+       [--concurrency 16] [--requests 3000] [--profiles baseline,uvloop,...]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_load import HttpConnection, HttpServer, execute_request, is_error, percentile
+
+# name -> (server environment, modules the profile needs)
+PROFILES = {
+    "baseline": ({"MCP_HTTP_LOOP": "asyncio", "MCP_HTTP_PARSER": "h11", "MCP_HTTP_ACCESS_LOG": "1"}, ()),
+    "uvloop": ({"MCP_HTTP_LOOP": "uvloop", "MCP_HTTP_PARSER": "h11", "MCP_HTTP_ACCESS_LOG": "1"}, ("uvloop",)),
+    "uvloop+httptools": ({"MCP_HTTP_LOOP": "uvloop", "MCP_HTTP_PARSER": "httptools", "MCP_HTTP_ACCESS_LOG": "1"},
+                         ("uvloop", "httptools")),
+    "tuned": ({"MCP_HTTP_LOOP": "uvloop", "MCP_HTTP_PARSER": "httptools", "MCP_HTTP_ACCESS_LOG": "0"},
+              ("uvloop", "httptools")),
+    "hypercorn": ({"MCP_HTTP_SERVER": "hypercorn", "MCP_HTTP_LOOP": "uvloop", "MCP_HTTP_ACCESS_LOG": "0"},
+                  ("hypercorn", "uvloop"))
+}
+
+Send = Callable[[bytes], Awaitable[bool]]
+
+
+def has_modules(python: str, modules: List[str]) -> bool:
+    if not modules:
+        return True
+    check = subprocess.run([python, "-c", "import " + ", ".join(modules)], capture_output=True)
+    return check.returncode == 0
+
+
+async def measure(senders: List[Send], total: int, warmup: int, body_for: Callable[[int], bytes]) -> Dict[str, Any]:
+    """Share `warmup`, then `total` requests among the senders, one at a time per sender"""
+    latencies: List[float] = []
+    errors = 0
+    next_id = 0
+
+    async def client(send: Send, count: int, record: bool) -> None:
+        nonlocal errors, next_id
+        for _ in range(count):
+            next_id += 1
+            body = body_for(next_id)
+            start = time.perf_counter()
+            try:
+                failed = await send(body)
+            except (ConnectionError, OSError):
+                failed = True
+            if record:
+                latencies.append(time.perf_counter() - start)
+                errors += failed
+
+    def shares(count: int) -> List[int]:
+        return [count // len(senders) + (i < count % len(senders)) for i in range(len(senders))]
+
+    await asyncio.gather(*(client(send, n, False) for send, n in zip(senders, shares(warmup))))
+    start = time.perf_counter()
+    await asyncio.gather(*(client(send, n, True) for send, n in zip(senders, shares(total))))
+    elapsed = time.perf_counter() - start
+    ordered = sorted(latency * 1000 for latency in latencies)
+    return {"throughput": len(ordered) / elapsed, "p50_ms": percentile(ordered, 50),
+            "p99_ms": percentile(ordered, 99), "errors": errors}
+
+
+def is_failure(status: int, body: bytes) -> bool:
+    return status != 200 or is_error(json.loads(body))
+
+
+async def keep_alive(port: int, args, body_for) -> Dict[str, Any]:
+    connections = [await HttpConnection.open(port) for _ in range(args.concurrency)]
+
+    def sender(connection: HttpConnection) -> Send:
+        async def send(body: bytes) -> bool:
+            return is_failure(*await connection.request("POST", "/mcp", body))
+        return send
+
+    try:
+        return await measure([sender(c) for c in connections], args.requests, args.warmup, body_for)
+    finally:
+        for connection in connections:
+            await connection.close()
+
+
+async def reconnect(port: int, args, body_for) -> Dict[str, Any]:
+    async def send(body: bytes) -> bool:
+        connection = await HttpConnection.open(port)
+        try:
+            return is_failure(*await connection.request("POST", "/mcp", body))
+        finally:
+            await connection.close()
+
+    return await measure([send] * args.concurrency, args.requests, args.warmup, body_for)
+
+
+async def httpx_clients(port: int, args, body_for, http2: bool) -> Optional[Dict[str, Any]]:
+    try:
+        import httpx
+        client = httpx.AsyncClient(http1=not http2, http2=http2,
+                                   limits=httpx.Limits(max_connections=1 if http2 else args.concurrency))
+    except ImportError:
+        return None
+    url = f"http://127.0.0.1:{port}/mcp"
+
+    async def send(body: bytes) -> bool:
+        response = await client.post(url, content=body, headers={"Content-Type": "application/json"})
+        return is_failure(response.status_code, response.content)
+
+    async with client:
+        return await measure([send] * args.concurrency, args.requests, args.warmup, body_for)
+
+
+async def run_profile(name: str, env: Dict[str, str], args) -> Dict[str, Optional[Dict[str, Any]]]:
+    server = HttpServer(1, args.python, **env)
+    try:
+        await server.wait_ready()
+        body_for = lambda request_id: json.dumps(execute_request(request_id, args.batch, args.numbers)).encode()
+        results = {"keep-alive": await keep_alive(server.port, args, body_for),
+                   "reconnect": await reconnect(server.port, args, body_for)}
+        if env.get("MCP_HTTP_SERVER") == "hypercorn":
+            results["httpx h1"] = await httpx_clients(server.port, args, body_for, http2=False)
+            results["httpx h2"] = await httpx_clients(server.port, args, body_for, http2=True)
+        return results
+    finally:
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--python", default=sys.executable, help="interpreter that runs the server")
+    parser.add_argument("--profiles", default=",".join(PROFILES), help=f"subset of {', '.join(PROFILES)}")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=3000, help="measured requests per case")
+    parser.add_argument("--warmup", type=int, default=300, help="unmeasured requests sent first")
+    parser.add_argument("--batch", type=int, default=1, help="function calls per execute request")
+    parser.add_argument("--numbers", type=int, default=8, help="operands per calculator call")
+    args = parser.parse_args()
+
+    print(f"{'profile':<18}{'clients':<12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name in (p.strip() for p in args.profiles.split(",") if p.strip()):
+        env, modules = PROFILES[name]
+        if not has_modules(args.python, list(modules)):
+            print(f"{name:<18}skipped: needs {', '.join(modules)}")
+            continue
+        for case, r in asyncio.run(run_profile(name, env, args)).items():
+            if r is None:
+                print(f"{name:<18}{case:<12}skipped: needs httpx and h2")
+                continue
+            print(f"{name:<18}{case:<12}{r['throughput']:>10.0f}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+                  f"{r['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Load test of the MCP server over every transport: stdio, HTTP POST `/` and
+`/mcp`, and the WebSockets at `/` and `/mcp`. Spawns the server locally (a
+stdio process, and an HTTP server on a free 127.0.0.1 port), so it needs no
+network. Each of `--concurrency` clients sends `execute` requests of
+`--batch` calculator calls over `--numbers` operands, one request at a time,
+until `--requests` requests were answered. HTTP and WebSocket clients each
+use their own connection; stdio clients share the server's stdin, which
+pipelines their requests.
+
+Reports throughput, p50/p95/p99 latency and the server's peak RSS (Linux
+only) per transport. `--output` saves the results as JSON; `--baseline`
+compares them with saved results and exits with status 1 when throughput
+dropped or latency or RSS grew by more than the tolerance.
+
+Usage: python benchmarks/bench_load.py [--transports stdio,http,http-mcp,ws,ws-mcp]
+       [--concurrency 8] [--requests 2000] [--batch 4] [--numbers 16]
+       [--workers 1] [--output results.json] [--baseline baseline.json]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import websockets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRANSPORTS = ("stdio", "http", "http-mcp", "ws", "ws-mcp")
+PATHS = {"http": "/", "http-mcp": "/mcp", "ws": "/", "ws-mcp": "/mcp"}
+
+# Throughput may not drop, and latency and RSS may not grow, by more than these fractions
+DEFAULT_TOLERANCE = 0.15
+DEFAULT_RSS_TOLERANCE = 0.25
+# metric, higher is better
+COMPARED = (
+    ("throughput", True),
+    ("p50_ms", False),
+    ("p95_ms", False),
+    ("p99_ms", False),
+    ("peak_rss_mb", False)
+)
+
+RSS_SAMPLE_SECONDS = 0.2
+STARTUP_TIMEOUT = 30.0
+
+Send = Callable[[bytes], Awaitable[Any]]
+
+
+def execute_request(request_id: int, batch: int, numbers: int) -> Dict[str, Any]:
+    operands = [float(i % 97) + 0.5 for i in range(numbers)]
+    calls = [{"name": "calculator", "parameters": {"operation": "add", "numbers": operands}}
+             for _ in range(batch)]
+    return {"jsonrpc": "2.0", "method": "execute", "params": {"function_calls": calls}, "id": request_id}
+
+
+def is_error(response: Any) -> bool:
+    """Whether a JSON-RPC response (or any result in it) reports a failure"""
+    if not isinstance(response, dict) or response.get("error") is not None:
+        return True
+    results = response.get("result")
+    return isinstance(results, list) and any(r.get("status") != "success" for r in results)
+
+
+def percentile(ordered: List[float], p: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+
+# --- Server processes and their memory ---------------------------------------
+
+def server_env(**overrides: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    for name in ("MCP_STDIO_MODE", "MCP_HTTP_MODE"):
+        env.pop(name, None)
+    env.update(overrides)
+    return env
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _children() -> Dict[int, List[int]]:
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                # The command name may contain spaces; fields after it don't
+                ppid = int(stat.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def _rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def tree_rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of a process and its descendants (worker processes), or None off Linux"""
+    if not os.path.isdir("/proc"):
+        return None
+    children, pending, total = _children(), [pid], 0
+    while pending:
+        current = pending.pop()
+        total += _rss_kb(current)
+        pending.extend(children.get(current, []))
+    return total / 1024
+
+
+class RssSampler:
+    """Peak RSS of a server process tree, sampled in the background while a run lasts"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.peak: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _sample(self) -> None:
+        while True:
+            rss = await asyncio.to_thread(tree_rss_mb, self.pid)
+            if rss is not None:
+                self.peak = rss if self.peak is None else max(self.peak, rss)
+            await asyncio.sleep(RSS_SAMPLE_SECONDS)
+
+    def __enter__(self) -> "RssSampler":
+        self._task = asyncio.create_task(self._sample())
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._task.cancel()
+
+
+# --- Clients -------------------------------------------------------------------
+
+class HttpConnection:
+    """Minimal keep-alive HTTP/1.1 client, so client overhead stays out of the numbers"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str):
+        self.reader = reader
+        self.writer = writer
+        self.host = host
+
+    @classmethod
+    async def open(cls, port: int) -> "HttpConnection":
+        reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=2 ** 26)
+        return cls(reader, writer, f"127.0.0.1:{port}")
+
+    async def request(self, method: str, path: str, body: bytes = b"") -> Tuple[int, bytes]:
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n")
+        self.writer.write(head.encode("ascii") + body)
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Server closed the connection")
+        status = int(status_line.split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        return status, await self.reader.readexactly(length) if length else b""
+
+    async def close(self) -> None:
+        self.writer.close()
+
+
+class StdioClient:
+    """Pipelines requests to a stdio server process and matches responses by id"""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.pending: Dict[Any, asyncio.Future] = {}
+        self._reader = asyncio.create_task(self._read())
+
+    @classmethod
+    async def spawn(cls) -> "StdioClient":
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "server.py", cwd=ROOT, env=server_env(MCP_STDIO_MODE="1"),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, limit=2 ** 26
+        )
+        return cls(process)
+
+    async def _read(self) -> None:
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            future = self.pending.pop(response.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("stdio server exited"))
+
+    async def send(self, message: Dict[str, Any]) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self.pending[message["id"]] = future
+        self.process.stdin.write(json.dumps(message).encode("utf-8") + b"\n")
+        await self.process.stdin.drain()
+        return await future
+
+    async def close(self) -> None:
+        self.process.stdin.close()
+        try:
+            await asyncio.wait_for(self.process.wait(), 10)
+        except asyncio.TimeoutError:
+            self.process.kill()
+        self._reader.cancel()
+
+
+class HttpServer:
+    """`python server.py` in HTTP mode on a free local port"""
+
+    def __init__(self, workers: int, python: str = sys.executable, **env: str):
+        self.port = free_port()
+        self.process = subprocess.Popen(
+            [python, "server.py"], cwd=ROOT,
+            env=server_env(MCP_HTTP_MODE="1", MCP_HTTP_HOST="127.0.0.1",
+                           MCP_HTTP_PORT=str(self.port), MCP_HTTP_WORKERS=str(workers), **env),
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+
+    async def wait_ready(self) -> None:
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"HTTP server exited with status {self.process.returncode}")
+            try:
+                connection = await HttpConnection.open(self.port)
+                try:
+                    status, _ = await connection.request("GET", "/health")
+                finally:
+                    await connection.close()
+                if status == 200:
+                    return
+            except OSError:
+                pass
+            await asyncio.sleep(0.1)
+        raise RuntimeError(f"HTTP server did not answer on port {self.port} within {STARTUP_TIMEOUT:.0f}s")
+
+    def stop(self) -> None:
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+# --- Load generation -------------------------------------------------------------
+
+async def drive(senders: List[Send], total: int, warmup: int, args) -> Dict[str, Any]:
+    """Share `warmup`, then `total` requests among the senders and time the measured ones"""
+    latencies: List[float] = []
+    errors = 0
+    next_id = 0
+
+    async def client(send: Send, count: int, record: bool) -> None:
+        nonlocal errors, next_id
+        for _ in range(count):
+            next_id += 1
+            message = execute_request(next_id, args.batch, args.numbers)
+            start = time.perf_counter()
+            try:
+                failed = is_error(await send(message))
+            except (ConnectionError, websockets.ConnectionClosed):
+                failed = True
+            if record:
+                latencies.append(time.perf_counter() - start)
+                errors += failed
+
+    def shares(count: int) -> List[int]:
+        return [count // len(senders) + (i < count % len(senders)) for i in range(len(senders))]
+
+    await asyncio.gather(*(client(send, n, False) for send, n in zip(senders, shares(warmup))))
+    start = time.perf_counter()
+    await asyncio.gather(*(client(send, n, True) for send, n in zip(senders, shares(total))))
+    elapsed = time.perf_counter() - start
+
+    ordered = sorted(latency * 1000 for latency in latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered), 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3) if ordered else 0.0
+    }
+
+
+async def run_stdio(args) -> Dict[str, Any]:
+    client = await StdioClient.spawn()
+    try:
+        await client.send({"jsonrpc": "2.0", "method": "initialize", "params": {"client_name": "bench"},
+                           "id": "init"})
+        with RssSampler(client.process.pid) as rss:
+            result = await drive([client.send] * args.concurrency, args.requests, args.warmup, args)
+        result["peak_rss_mb"] = rss.peak
+        return result
+    finally:
+        await client.close()
+
+
+async def run_http(server: HttpServer, path: str, args) -> Dict[str, Any]:
+    connections = [await HttpConnection.open(server.port) for _ in range(args.concurrency)]
+
+    def sender(connection: HttpConnection) -> Send:
+        async def send(message: Dict[str, Any]) -> Any:
+            status, body = await connection.request("POST", path, json.dumps(message).encode("utf-8"))
+            return json.loads(body) if status == 200 else None
+        return send
+
+    try:
+        with RssSampler(server.process.pid) as rss:
+            result = await drive([sender(c) for c in connections], args.requests, args.warmup, args)
+        result["peak_rss_mb"] = rss.peak
+        return result
+    finally:
+        for connection in connections:
+            await connection.close()
+
+
+async def run_websocket(server: HttpServer, path: str, args) -> Dict[str, Any]:
+    url = f"ws://127.0.0.1:{server.port}{path}"
+    connections = [await websockets.connect(url, max_size=None, compression=None)
+                   for _ in range(args.concurrency)]
+
+    def sender(connection) -> Send:
+        async def send(message: Dict[str, Any]) -> Any:
+            await connection.send(json.dumps(message))
+            return json.loads(await connection.recv())
+        return send
+
+    try:
+        with RssSampler(server.process.pid) as rss:
+            result = await drive([sender(c) for c in connections], args.requests, args.warmup, args)
+        result["peak_rss_mb"] = rss.peak
+        return result
+    finally:
+        for connection in connections:
+            await connection.close()
+
+
+async def run(args) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    if "stdio" in args.transports:
+        results["stdio"] = await run_stdio(args)
+    networked = [t for t in args.transports if t != "stdio"]
+    if networked:
+        server = HttpServer(args.workers)
+        try:
+            await server.wait_ready()
+            for transport in networked:
+                runner = run_websocket if transport.startswith("ws") else run_http
+                results[transport] = await runner(server, PATHS[transport], args)
+        finally:
+            server.stop()
+    return results
+
+
+# --- Reporting ---------------------------------------------------------------------
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            tolerance: float, rss_tolerance: float) -> List[str]:
+    """Regressions of `results` against `baseline`, one message each"""
+    regressions = []
+    for transport, current in results.items():
+        previous = baseline.get(transport)
+        if previous is None:
+            continue
+        if current["errors"] > previous.get("errors", 0):
+            regressions.append(f"{transport}: errors {previous.get('errors', 0)} -> {current['errors']}")
+        for metric, higher_is_better in COMPARED:
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            allowed = rss_tolerance if metric == "peak_rss_mb" else tolerance
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > allowed:
+                regressions.append(f"{transport}: {metric} {old:g} -> {new:g} ({change:+.1%}, "
+                                   f"tolerance {allowed:.0%})")
+    return regressions
+
+
+def print_table(results: Dict[str, Dict[str, Any]]) -> None:
+    print(f"{'transport':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}{'rss MB':>9}")
+    for transport, r in results.items():
+        rss = f"{r['peak_rss_mb']:.1f}" if r["peak_rss_mb"] is not None else "n/a"
+        print(f"{transport:<10}{r['throughput']:>10.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+              f"{r['p99_ms']:>10.2f}{r['errors']:>8}{rss:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--transports", default=",".join(TRANSPORTS),
+                        help=f"comma-separated subset of {', '.join(TRANSPORTS)}")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per transport")
+    parser.add_argument("--warmup", type=int, default=200, help="unmeasured requests sent first")
+    parser.add_argument("--batch", type=int, default=4, help="function calls per execute request")
+    parser.add_argument("--numbers", type=int, default=16, help="operands per calculator call")
+    parser.add_argument("--workers", type=int, default=1, help="HTTP worker processes (MCP_HTTP_WORKERS)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare with; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative throughput drop or latency growth")
+    parser.add_argument("--rss-tolerance", type=float, default=DEFAULT_RSS_TOLERANCE,
+                        help="allowed relative growth of peak RSS")
+    args = parser.parse_args()
+    args.transports = [t.strip() for t in args.transports.split(",") if t.strip()]
+    unknown = set(args.transports) - set(TRANSPORTS)
+    if unknown:
+        parser.error(f"unknown transports: {', '.join(sorted(unknown))}")
+    if min(args.concurrency, args.requests, args.batch, args.numbers, args.workers) < 1:
+        parser.error("--concurrency, --requests, --batch, --numbers and --workers must be at least 1")
+
+    config = {name: getattr(args, name)
+              for name in ("transports", "concurrency", "requests", "warmup", "batch", "numbers", "workers")}
+    print(f"Load test: {config}")
+    results = asyncio.run(run(args))
+    print_table(results)
+
+    if args.output:
+        report = {
+            "config": config,
+            "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                            "cpus": os.cpu_count()},
+            "results": results
+        }
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("config") != config:
+            print(f"warning: baseline was run with a different configuration: {baseline.get('config')}")
+        regressions = compare(results, baseline.get("results", {}), args.tolerance, args.rss_tolerance)
+        if regressions:
+            print("Regressions against the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark of the stdio server: import time and first response.
+Runs `python -X importtime -c "import server"` in stdio mode and reports the
+total import time, the slowest top-level imports and whether any of the web
+stack (FastAPI, Starlette, pydantic, uvicorn) was imported. Then starts
+`python server.py` in stdio mode repeatedly and measures the time from spawn
+until the response to `initialize` arrives on stdout.
+
+Usage: python benchmarks/bench_startup.py [--runs 10] [--top 10]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WEB_STACK = ("fastapi", "starlette", "pydantic", "uvicorn")
+# "import time: self [us] | cumulative | imported package", nesting shown by indentation
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+INITIALIZE = {"jsonrpc": "2.0", "method": "initialize", "params": {"client_name": "bench"}, "id": 1}
+
+
+def stdio_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["MCP_STDIO_MODE"] = "1"
+    env.pop("MCP_HTTP_MODE", None)
+    return env
+
+
+def import_profile() -> Tuple[int, List[Tuple[str, int]], List[str]]:
+    """Microseconds to import `server`, its direct imports with theirs, and web modules seen"""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=ROOT, env=stdio_env(), capture_output=True, text=True, check=True
+    )
+    # A module's line is printed after the lines of everything it imported
+    total, direct, pending, web = 0, [], [], []
+    for line in process.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if not match:
+            continue
+        module, depth = match.group(4), len(match.group(3))
+        if module.split(".")[0] in WEB_STACK:
+            web.append(module)
+        if depth == 3:
+            pending.append((module, int(match.group(2))))
+        elif depth == 1:
+            if module == "server":
+                total, direct = int(match.group(2)), pending
+            pending = []
+    return total, direct, web
+
+
+def first_response_seconds() -> float:
+    """Spawn the stdio server and time the answer to its first request"""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "server.py"], cwd=ROOT, env=stdio_env(),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    try:
+        process.stdin.write(json.dumps(INITIALIZE).encode("utf-8") + b"\n")
+        process.stdin.flush()
+        line = process.stdout.readline()
+        elapsed = time.perf_counter() - start
+        if json.loads(line).get("id") != 1:
+            raise RuntimeError(f"Unexpected first response: {line!r}")
+        return elapsed
+    finally:
+        process.stdin.close()
+        process.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="server starts to time")
+    parser.add_argument("--top", type=int, default=10, help="slowest direct imports of server to list")
+    args = parser.parse_args()
+
+    total, direct, web = import_profile()
+    print(f"import server (stdio mode): {total / 1000:.1f} ms")
+    for module, us in sorted(direct, key=lambda item: -item[1])[:args.top]:
+        print(f"  {module:<32}{us / 1000:>8.1f} ms")
+    print(f"web stack imported: {', '.join(sorted(set(m.split('.')[0] for m in web))) if web else 'none'}")
+
+    timings = [first_response_seconds() * 1000 for _ in range(args.runs)]
+    print(f"spawn to first response over {args.runs} runs: "
+          f"median {statistics.median(timings):.1f} ms, min {min(timings):.1f} ms, max {max(timings):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of parameter validation: the compiled calculator schema on
+flat lists and on batches of rows from 10 to 100k numbers, next to the time
+it takes to decode the same call from JSON and to execute it, so the
+validation cost can be read against the rest of the request path.
+
+Usage: python benchmarks/bench_validation.py [--seconds 1]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jsonrpc
+from calculator import CalculatorTool
+from schema import compile_schema
+
+
+def per_call_us(function: Callable[[], Any], seconds: float) -> float:
+    calls, start = 0, time.perf_counter()
+    deadline = start + seconds
+    while True:
+        function()
+        calls += 1
+        now = time.perf_counter()
+        if now >= deadline:
+            return (now - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1.0, help="time spent per case")
+    args = parser.parse_args()
+
+    tool = CalculatorTool()
+    compile_start = time.perf_counter()
+    validate = compile_schema(tool.parameters)
+    print(f"compile calculator schema: {(time.perf_counter() - compile_start) * 1e6:.0f} us")
+
+    cases: Dict[str, Dict[str, Any]] = {}
+    for size in (10, 1000, 100000):
+        cases[f"{size} floats"] = {"operation": "add", "numbers": [random.random() for _ in range(size)]}
+        cases[f"{size} ints"] = {"operation": "add", "numbers": [random.randrange(1 << 30) for _ in range(size)]}
+        cases[f"{size // 4} rows x 4"] = {"operation": "add",
+                                          "numbers": [[random.random() for _ in range(4)] for _ in range(max(1, size // 4))]}
+
+    print(f"{'case':<20}{'decode us':>12}{'validate us':>14}{'execute us':>14}")
+    for name, params in cases.items():
+        body = jsonrpc.dumps(params)
+        decode_us = per_call_us(lambda: jsonrpc.loads(body), args.seconds)
+        validate_us = per_call_us(lambda: validate(params), args.seconds)
+        execute_us = per_call_us(lambda: tool.execute(params), args.seconds)
+        print(f"{name:<20}{decode_us:>12.1f}{validate_us:>14.1f}{execute_us:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Calculator tool for the MCP server.
+`numbers` is either a list of numbers, folded into a single result, or a
+batch of equal-length rows reduced along `axis`: axis 1 (the default) folds
+each row, axis 0 folds down the columns, which applies the operation
+element-wise across parallel vectors. `mode` selects the arithmetic: the
+default keeps ints exact and floats float64, "float", "decimal" and
+"fraction" are described in numeric.py.
+
+The size limits (MCP_CALC_MAX_NUMBERS, the numeric.Limits guards and the
+NumPy threshold) are passed in by the server from its ServerConfig; they are
+attributes of the tool, so they reach the worker processes with it.
+"""
+
+import math
+import operator
+from functools import reduce
+from itertools import islice
+from typing import Dict, Any, List, Optional, Sequence
+
+import numeric
+import vectorized
+from schema import ValidationError
+
+OPERATIONS = ["add", "subtract", "multiply", "divide", "mean", "min", "max", "sum_of_squares", "dot"]
+
+# Calls over at most this many small operands are cheap enough to run inline
+# on the event loop; anything larger is sent to the CPU worker pool
+INLINE_MAX_NUMBERS = 256
+INLINE_MAX_INT_BITS = 64
+# Decimal and fraction arithmetic costs far more per operand
+INLINE_MAX_EXACT_NUMBERS = 32
+# Most operands one call may carry, counted across all rows
+DEFAULT_MAX_NUMBERS = 1000000
+
+
+def _fold(operation: str, numbers: Sequence[Any], limits: numeric.Limits) -> Any:
+    """Pure-Python fold of one vector: C-level builtins, exact for integers"""
+    if operation == "add":
+        return sum(numbers)
+    elif operation == "subtract":
+        return numbers[0] - sum(islice(numbers, 1, None))
+    elif operation == "multiply":
+        limits.check_int_operands(operation, numbers)
+        return math.prod(numbers)
+    elif operation == "divide":
+        try:
+            numbers.index(0, 1)
+        except ValueError:
+            return reduce(operator.truediv, numbers)
+        raise ValueError("Division by zero is not allowed")
+    elif operation == "mean":
+        return sum(numbers) / len(numbers)
+    elif operation == "min":
+        return min(numbers)
+    elif operation == "max":
+        return max(numbers)
+    elif operation == "sum_of_squares":
+        limits.check_int_operands(operation, numbers)
+        return sum(map(operator.mul, numbers, numbers))
+    else:
+        raise ValueError(f"Unknown operation: {operation}")
+
+
+def _dot(numbers: Sequence[Any], vector: Sequence[Any], limits: numeric.Limits) -> Any:
+    if len(numbers) != len(vector):
+        raise ValueError("vector must have one entry per column of numbers")
+    limits.check_int_operands("dot", numbers)
+    limits.check_int_operands("dot", vector)
+    return sum(map(operator.mul, numbers, vector))
+
+
+def _count(numbers: List[Any]) -> int:
+    if len(numbers) and isinstance(numbers[0], list):
+        return sum(len(row) for row in numbers if isinstance(row, list))
+    return len(numbers)
+
+
+def _has_strings(numbers: Sequence[Any]) -> bool:
+    return any(isinstance(n, str) or isinstance(n, list) and _has_strings(n) for n in numbers)
+
+
+def _string_path(numbers: Sequence[Any]) -> Optional[List[int]]:
+    """Index path of the first string operand, one type pass per row"""
+    kinds = set(map(type, numbers))
+    if str not in kinds and list not in kinds:
+        return None
+    for i, n in enumerate(numbers):
+        if isinstance(n, str):
+            return [i]
+        if isinstance(n, list) and str in set(map(type, n)):
+            return [i, next(j for j, m in enumerate(n) if isinstance(m, str))]
+    return None
+
+
+class CalculatorTool:
+    # CPU-bound: routed to the process pool unless the call is trivially small
+    execution = "cpu"
+    # Pure function of its parameters, so results may be cached
+    deterministic = True
+
+    def __init__(self, max_numbers: int = DEFAULT_MAX_NUMBERS, limits: numeric.Limits = numeric.DEFAULT_LIMITS,
+                 vector_threshold: int = vectorized.DEFAULT_VECTOR_THRESHOLD):
+        self.max_numbers = max_numbers = max(1, max_numbers)
+        self.limits = limits
+        self.vector_threshold = vector_threshold
+        self.name = "calculator"
+        self.description = "A basic calculator that can perform arithmetic operations"
+        self.parameters = {
+            "type": "object",
+            "properties": {
+                "operation": {
+                    "type": "string",
+                    "enum": OPERATIONS,
+                    "description": "The arithmetic operation or aggregate to compute"
+                },
+                "numbers": {
+                    "type": "array",
+                    "items": {
+                        "anyOf": [
+                            {"type": ["number", "string"]},
+                            {"type": "array", "items": {"type": ["number", "string"]}, "minItems": 1,
+                             "maxItems": max_numbers}
+                        ]
+                    },
+                    "description": "List of numbers to perform the operation on, or a batch of equal-length rows. "
+                                   "Strings such as \"0.1\" or \"1/3\" give exact operands in decimal and fraction mode",
+                    "minItems": 1,
+                    "maxItems": max_numbers
+                },
+                "numbers_b64": {
+                    "type": "string",
+                    "contentEncoding": "base64",
+                    "maxLength": 4 * math.ceil(max_numbers * 8 / 3),
+                    "description": "Alternative to numbers for large inputs: base64-encoded little-endian float64 values"
+                },
+                "axis": {
+                    "type": "integer",
+                    "enum": [0, 1],
+                    "default": 1,
+                    "description": "For a batch of rows: 1 reduces each row, 0 applies the operation element-wise across rows"
+                },
+                "vector": {
+                    "type": "array",
+                    "items": {"type": ["number", "string"]},
+                    "maxItems": max_numbers,
+                    "description": "Right-hand operand of dot: one entry per number, or per column of a batch"
+                },
+                "mode": {
+                    "type": "string",
+                    "enum": numeric.MODES,
+                    "default": numeric.MODE_AUTO,
+                    "description": "auto: exact integers, float64 otherwise; float: float64 with correctly rounded "
+                                   "sums; decimal: decimal arithmetic at `precision` digits; fraction: exact "
+                                   "rationals. decimal and fraction results are strings"
+                },
+                "precision": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "maximum": limits.max_precision,
+                    "default": numeric.DEFAULT_PRECISION,
+                    "description": "Significant digits of decimal mode"
+                }
+            },
+            "required": ["operation"],
+            "anyOf": [
+                {"required": ["numbers"]},
+                {"required": ["numbers_b64"]}
+            ]
+        }
+
+    @classmethod
+    def from_config(cls, config: Any) -> "CalculatorTool":
+        return cls(max_numbers=config.calc_max_numbers, limits=numeric.Limits.from_config(config),
+                   vector_threshold=config.vector_threshold)
+
+    def validate(self, params: Dict[str, Any]) -> None:
+        """Reject string operands up front unless the mode parses them"""
+        if params.get("mode", numeric.MODE_AUTO) != numeric.MODE_AUTO:
+            return
+        for name in ("numbers", "vector"):
+            values = params.get(name)
+            path = _string_path(values) if isinstance(values, list) else None
+            if path is not None:
+                raise ValidationError("string operands require mode float, decimal or fraction", [name] + path)
+
+    def execution_for(self, params: Dict[str, Any]) -> str:
+        """Pick where a single call runs: inline for small inputs, else the CPU pool"""
+        if not isinstance(params, dict):
+            return self.execution
+        numbers = params.get("numbers")
+        if numbers is None and isinstance(params.get("numbers_b64"), str):
+            # Each float64 takes 8 bytes, i.e. about 10.7 base64 characters
+            return "inline" if len(params["numbers_b64"]) * 3 // 32 <= INLINE_MAX_NUMBERS else self.execution
+        if not isinstance(numbers, list) or _count(numbers) > INLINE_MAX_NUMBERS:
+            return self.execution
+        if params.get("mode") in (numeric.MODE_DECIMAL, numeric.MODE_FRACTION) and \
+                _count(numbers) > INLINE_MAX_EXACT_NUMBERS:
+            return self.execution
+        for num in numbers:
+            if isinstance(num, list):
+                if any(isinstance(n, int) and n.bit_length() > INLINE_MAX_INT_BITS for n in num):
+                    return self.execution
+            elif isinstance(num, int) and num.bit_length() > INLINE_MAX_INT_BITS:
+                return self.execution
+        return "inline"
+
+    def execute(self, params: Dict[str, Any]) -> Any:
+        operation = params["operation"]
+        if "numbers" not in params and "numbers_b64" in params:
+            numbers = vectorized.decode_float64(params["numbers_b64"], self.vector_threshold)
+        else:
+            numbers = params["numbers"]
+        if _count(numbers) > self.max_numbers:
+            raise ValueError(f"At most {self.max_numbers} numbers are allowed per call")
+
+        mode = params.get("mode", numeric.MODE_AUTO)
+        if mode != numeric.MODE_AUTO:
+            arithmetic = numeric.Arithmetic(mode, params.get("precision"), self.limits)
+            return self._execute_exact(arithmetic, operation, numbers, params)
+        if params.get("precision") is not None:
+            raise ValueError("precision only applies to decimal mode")
+        try:
+            return self._execute_auto(operation, numbers, params)
+        except TypeError:
+            if _has_strings(numbers) or _has_strings(params.get("vector") or []):
+                raise ValueError("String operands require mode float, decimal or fraction") from None
+            raise
+
+    def _execute_auto(self, operation: str, numbers: Any, params: Dict[str, Any]) -> Any:
+        if len(numbers) and isinstance(numbers[0], list):
+            return self._execute_batch(operation, numbers, params)
+
+        if operation == "dot":
+            return self._execute_dot(numbers, params)
+
+        if len(numbers) < 2:
+            raise ValueError("At least two numbers are required")
+
+        if vectorized.is_vector(numbers):
+            return vectorized.reduce(operation, numbers)
+        return _fold(operation, numbers, self.limits)
+
+    def _execute_batch(self, operation: str, rows: List[Any], params: Dict[str, Any]) -> Any:
+        if not all(isinstance(row, list) and row for row in rows) or any(len(row) != len(rows[0]) for row in rows):
+            raise ValueError(vectorized.MATRIX_SHAPE_ERROR)
+        if operation == "dot":
+            return self._execute_dot(rows, params)
+        axis = params.get("axis", 1)
+        if axis not in (0, 1):
+            raise ValueError("axis must be 0 or 1")
+
+        if vectorized.available() and len(rows) * len(rows[0]) >= self.vector_threshold:
+            values = vectorized.as_matrix(rows)
+            if values is not None:
+                result = vectorized.reduce_axis(operation, values, axis)
+                if result is not None:
+                    return result
+
+        vectors = rows if axis == 1 else list(zip(*rows))
+        return [_fold(operation, vector, self.limits) for vector in vectors]
+
+    def _execute_dot(self, numbers: List[Any], params: Dict[str, Any]) -> Any:
+        vector = params.get("vector")
+        if not isinstance(vector, list):
+            raise ValueError("dot requires a vector parameter")
+
+        if vectorized.available() and _count(numbers) >= self.vector_threshold:
+            result = vectorized.dot(numbers, vector)
+            if result is not None:
+                return result
+
+        if len(numbers) and isinstance(numbers[0], list):
+            return [_dot(row, vector, self.limits) for row in numbers]
+        return _dot(numbers, vector, self.limits)
+
+    def _execute_exact(self, arithmetic: numeric.Arithmetic, operation: str, numbers: Any,
+                       params: Dict[str, Any]) -> Any:
+        """The float, decimal and fraction modes: pure Python, any input shape"""
+        batch = len(numbers) and isinstance(numbers[0], list)
+        if batch and (not all(isinstance(row, list) and row for row in numbers)
+                      or any(len(row) != len(numbers[0]) for row in numbers)):
+            raise ValueError(vectorized.MATRIX_SHAPE_ERROR)
+
+        if operation == "dot":
+            vector = params.get("vector")
+            if not isinstance(vector, list):
+                raise ValueError("dot requires a vector parameter")
+            vector = arithmetic.convert(vector)
+            if batch:
+                return [arithmetic.output(arithmetic.dot(arithmetic.convert(row), vector)) for row in numbers]
+            return arithmetic.output(arithmetic.dot(arithmetic.convert(numbers), vector))
+
+        if batch:
+            axis = params.get("axis", 1)
+            if axis not in (0, 1):
+                raise ValueError("axis must be 0 or 1")
+            rows = [arithmetic.convert(row) for row in numbers]
+            vectors = rows if axis == 1 else [list(column) for column in zip(*rows)]
+            return [arithmetic.output(arithmetic.fold(operation, vector)) for vector in vectors]
+
+        if len(numbers) < 2:
+            raise ValueError("At least two numbers are required")
+        return arithmetic.output(arithmetic.fold(operation, arithmetic.convert(numbers)))
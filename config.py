@@ -0,0 +1,185 @@
+"""
+Server configuration, resolved from the environment once at startup.
+Request handling reads the frozen ServerConfig instead of os.environ, so no
+environment lookups happen per request or per connection.
+
+Components never read the environment themselves: the server builds them
+from this config (e.g. `ToolExecutor.from_config`), so a malformed value is
+logged and replaced by its default instead of failing at import. See
+README.md for the full list of variables.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Mapping, Optional, Sequence
+
+from loguru import logger
+
+import admission
+import calculator
+import executor
+import numeric
+import result_cache
+import sessions
+import stdio_transport
+import vectorized
+import ws_transport
+
+# Largest HTTP request body or WebSocket message accepted
+DEFAULT_MAX_REQUEST_BYTES = 32 * 1024 * 1024
+
+HTTP_SERVERS = ("uvicorn", "hypercorn")
+HTTP_LOOPS = ("auto", "asyncio", "uvloop")
+HTTP_PARSERS = ("auto", "h11", "httptools")
+# Seconds an idle keep-alive connection stays open; uvicorn's default of 5
+# makes clients that pause between bursts reconnect (see README.md)
+DEFAULT_HTTP_KEEP_ALIVE = 75
+DEFAULT_HTTP_BACKLOG = 2048
+
+
+def _flag(environ: Mapping[str, str], name: str, default: bool = False) -> bool:
+    value = environ.get(name)
+    if value is None or value == "":
+        return default
+    return value not in ("0", "false", "False", "no")
+
+
+def _choice(environ: Mapping[str, str], name: str, choices: Sequence[str]) -> str:
+    value = (environ.get(name) or choices[0]).lower()
+    if value not in choices:
+        logger.warning(f"Ignoring invalid {name}={value!r}, using {choices[0]}")
+        return choices[0]
+    return value
+
+
+def _int(environ: Mapping[str, str], name: str, default: int, minimum: int = 1) -> int:
+    value = environ.get(name)
+    if not value:
+        return default
+    try:
+        return max(minimum, int(value))
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={value!r}, using {default}")
+        return default
+
+
+def _float(environ: Mapping[str, str], name: str, default: float, minimum: float = 0.0) -> float:
+    value = environ.get(name)
+    if not value:
+        return default
+    try:
+        return max(minimum, float(value))
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={value!r}, using {default}")
+        return default
+
+
+@dataclass(frozen=True)
+class ServerConfig:
+    stdio_mode: bool = False
+    http_mode: bool = False
+    logging_config: str = "default"
+    stdio_framing: str = stdio_transport.FRAMING_AUTO
+    stdio_max_message_bytes: int = stdio_transport.DEFAULT_MAX_MESSAGE_BYTES
+    stdio_max_in_flight: int = stdio_transport.DEFAULT_MAX_IN_FLIGHT
+    stdio_send_queue_size: int = stdio_transport.DEFAULT_SEND_QUEUE_SIZE
+    ws_max_in_flight: int = ws_transport.DEFAULT_MAX_IN_FLIGHT
+    ws_send_queue_size: int = ws_transport.DEFAULT_SEND_QUEUE_SIZE
+    ws_per_message_deflate: bool = True
+    http_host: str = "0.0.0.0"
+    http_port: int = 8000
+    http_workers: int = 1
+    http_server: str = HTTP_SERVERS[0]
+    http_loop: str = "auto"
+    http_parser: str = "auto"
+    http_keep_alive: int = DEFAULT_HTTP_KEEP_ALIVE
+    http_backlog: int = DEFAULT_HTTP_BACKLOG
+    http_access_log: bool = True
+    http_certfile: Optional[str] = None
+    http_keyfile: Optional[str] = None
+    metrics_dir: Optional[str] = None
+    log_format: Optional[str] = None
+    log_debug_rate: int = 100
+    plugins_dir: Optional[str] = None
+    plugins_poll_seconds: int = 2
+    plugin_entry_points: bool = False
+    rate_limit_rps: int = 0
+    rate_limit_burst: int = 0
+    max_in_flight: int = admission.DEFAULT_MAX_IN_FLIGHT
+    max_queued: int = admission.DEFAULT_MAX_QUEUED
+    max_queue_ms: int = admission.DEFAULT_MAX_QUEUE_MS
+    max_request_bytes: int = DEFAULT_MAX_REQUEST_BYTES
+    thread_pool_size: int = executor.DEFAULT_THREAD_WORKERS
+    process_pool_size: int = executor.DEFAULT_PROCESS_WORKERS
+    batch_concurrency: int = executor.DEFAULT_THREAD_WORKERS
+    tool_timeout_ms: int = executor.DEFAULT_TIMEOUT_MS
+    result_cache_size: int = result_cache.DEFAULT_MAX_ENTRIES
+    result_cache_bytes: int = result_cache.DEFAULT_MAX_BYTES
+    result_cache_ttl: float = result_cache.DEFAULT_TTL
+    max_sessions: int = sessions.DEFAULT_MAX_SESSIONS
+    session_ttl: float = sessions.DEFAULT_SESSION_TTL
+    calc_max_numbers: int = calculator.DEFAULT_MAX_NUMBERS
+    calc_max_precision: int = numeric.DEFAULT_MAX_PRECISION
+    calc_max_operand_bits: int = numeric.DEFAULT_MAX_OPERAND_BITS
+    calc_max_result_bits: int = numeric.DEFAULT_MAX_RESULT_BITS
+    vector_threshold: int = vectorized.DEFAULT_VECTOR_THRESHOLD
+
+    @classmethod
+    def from_env(cls, environ: Optional[Mapping[str, str]] = None) -> "ServerConfig":
+        env = os.environ if environ is None else environ
+        thread_pool_size = _int(env, "MCP_THREAD_POOL_SIZE", executor.DEFAULT_THREAD_WORKERS)
+        return cls(
+            stdio_mode=env.get("MCP_STDIO_MODE") == "1",
+            http_mode=env.get("MCP_HTTP_MODE") == "1",
+            logging_config=env.get("LOGGING_CONFIG", "default"),
+            stdio_framing=(env.get("MCP_STDIO_FRAMING") or stdio_transport.FRAMING_AUTO).lower(),
+            stdio_max_message_bytes=_int(env, "MCP_STDIO_MAX_MESSAGE_BYTES", stdio_transport.DEFAULT_MAX_MESSAGE_BYTES),
+            stdio_max_in_flight=_int(env, "MCP_STDIO_MAX_IN_FLIGHT", stdio_transport.DEFAULT_MAX_IN_FLIGHT),
+            stdio_send_queue_size=_int(env, "MCP_STDIO_SEND_QUEUE_SIZE", stdio_transport.DEFAULT_SEND_QUEUE_SIZE),
+            ws_max_in_flight=_int(env, "MCP_WS_MAX_IN_FLIGHT", ws_transport.DEFAULT_MAX_IN_FLIGHT),
+            ws_send_queue_size=_int(env, "MCP_WS_SEND_QUEUE_SIZE", ws_transport.DEFAULT_SEND_QUEUE_SIZE),
+            ws_per_message_deflate=_flag(env, "MCP_WS_PER_MESSAGE_DEFLATE", True),
+            http_host=env.get("MCP_HTTP_HOST") or "0.0.0.0",
+            # PORT is what container platforms set
+            http_port=_int(env, "MCP_HTTP_PORT", _int(env, "PORT", 8000)),
+            http_workers=_int(env, "MCP_HTTP_WORKERS", 1),
+            http_server=_choice(env, "MCP_HTTP_SERVER", HTTP_SERVERS),
+            http_loop=_choice(env, "MCP_HTTP_LOOP", HTTP_LOOPS),
+            http_parser=_choice(env, "MCP_HTTP_PARSER", HTTP_PARSERS),
+            http_keep_alive=_int(env, "MCP_HTTP_KEEP_ALIVE", DEFAULT_HTTP_KEEP_ALIVE),
+            http_backlog=_int(env, "MCP_HTTP_BACKLOG", DEFAULT_HTTP_BACKLOG),
+            http_access_log=_flag(env, "MCP_HTTP_ACCESS_LOG", True),
+            http_certfile=env.get("MCP_HTTP_CERTFILE") or None,
+            http_keyfile=env.get("MCP_HTTP_KEYFILE") or None,
+            metrics_dir=env.get("MCP_METRICS_DIR") or None,
+            log_format=(env.get("MCP_LOG_FORMAT") or "").lower() or None,
+            log_debug_rate=_int(env, "MCP_LOG_DEBUG_RATE", 100, minimum=0),
+            plugins_dir=env.get("MCP_PLUGINS_DIR") or None,
+            plugins_poll_seconds=_int(env, "MCP_PLUGINS_POLL_SECONDS", 2, minimum=0),
+            plugin_entry_points=_flag(env, "MCP_PLUGIN_ENTRY_POINTS"),
+            rate_limit_rps=_int(env, "MCP_RATE_LIMIT_RPS", 0, minimum=0),
+            rate_limit_burst=_int(env, "MCP_RATE_LIMIT_BURST", 0, minimum=0),
+            max_in_flight=_int(env, "MCP_MAX_IN_FLIGHT", admission.DEFAULT_MAX_IN_FLIGHT, minimum=0),
+            max_queued=_int(env, "MCP_MAX_QUEUED", admission.DEFAULT_MAX_QUEUED, minimum=0),
+            max_queue_ms=_int(env, "MCP_MAX_QUEUE_MS", admission.DEFAULT_MAX_QUEUE_MS, minimum=0),
+            max_request_bytes=_int(env, "MCP_MAX_REQUEST_BYTES", DEFAULT_MAX_REQUEST_BYTES),
+            thread_pool_size=thread_pool_size,
+            process_pool_size=_int(env, "MCP_PROCESS_POOL_SIZE", executor.DEFAULT_PROCESS_WORKERS),
+            batch_concurrency=_int(env, "MCP_BATCH_CONCURRENCY", thread_pool_size),
+            tool_timeout_ms=_int(env, "MCP_TOOL_TIMEOUT_MS", executor.DEFAULT_TIMEOUT_MS, minimum=0),
+            result_cache_size=_int(env, "MCP_RESULT_CACHE_SIZE", result_cache.DEFAULT_MAX_ENTRIES, minimum=0),
+            result_cache_bytes=_int(env, "MCP_RESULT_CACHE_BYTES", result_cache.DEFAULT_MAX_BYTES, minimum=0),
+            result_cache_ttl=_float(env, "MCP_RESULT_CACHE_TTL", result_cache.DEFAULT_TTL),
+            max_sessions=_int(env, "MCP_MAX_SESSIONS", sessions.DEFAULT_MAX_SESSIONS),
+            session_ttl=_float(env, "MCP_SESSION_TTL", sessions.DEFAULT_SESSION_TTL),
+            calc_max_numbers=_int(env, "MCP_CALC_MAX_NUMBERS", calculator.DEFAULT_MAX_NUMBERS),
+            calc_max_precision=_int(env, "MCP_CALC_MAX_PRECISION", numeric.DEFAULT_MAX_PRECISION),
+            calc_max_operand_bits=_int(env, "MCP_CALC_MAX_OPERAND_BITS", numeric.DEFAULT_MAX_OPERAND_BITS, minimum=64),
+            calc_max_result_bits=_int(env, "MCP_CALC_MAX_RESULT_BITS", numeric.DEFAULT_MAX_RESULT_BITS),
+            vector_threshold=_int(env, "MCP_VECTOR_THRESHOLD", vectorized.DEFAULT_VECTOR_THRESHOLD, minimum=0)
+        )
+
+    @property
+    def multi_worker(self) -> bool:
+        """Whether HTTP requests are served by several worker processes (HTTP mode only)"""
+        return self.http_mode and self.http_workers > 1
@@ -0,0 +1,434 @@
+"""
+Tool execution layer for the MCP server.
+Tools declare how they should run through an `execution` attribute (and may
+refine it per call with `execution_for(params)`):
+- "inline": run directly on the event loop (only for trivially cheap calls)
+- "async":  `execute` is a coroutine and is awaited on the event loop
+- "io":     blocking I/O-bound work, run on a thread pool
+- "cpu":    CPU-bound work, run on a process pool so it cannot hold the GIL
+Synchronous tools without a declaration default to "io". Pool sizes come
+from MCP_THREAD_POOL_SIZE, MCP_PROCESS_POOL_SIZE and MCP_BATCH_CONCURRENCY
+through the server's ServerConfig (see `from_config`).
+
+The BatchExecutor dispatches the calls of one `execute` request concurrently
+through the ToolExecutor, keeping the order of the incoming calls and the
+time each call took. Calls to tools declaring `deterministic = True` are
+answered from the ResultCache when one is enabled (see result_cache.py), and
+each call's duration is recorded in the ServerMetrics when they are given.
+The first call to a plugin tool imports its module on a worker thread, so a
+slow import does not stall the event loop (see plugins.py).
+
+Every call runs under a timeout: the tool's `timeout` attribute (seconds),
+else MCP_TOOL_TIMEOUT_MS (default 30000, 0 for none), and never past the
+deadline of the request it belongs to. A "cpu" call that times out or is
+cancelled has its worker process killed, so abandoned work stops using a
+core; the pool is replaced and the other calls it was running are retried
+once on the new one. "async" calls are cancelled; "io" calls are abandoned
+(a thread cannot be stopped) and "inline" calls are too short to bound.
+"""
+
+import asyncio
+import itertools
+import os
+import signal
+import threading
+import time
+from concurrent.futures import BrokenExecutor, Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Set
+
+from loguru import logger
+
+from plugins import PluginTool
+from result_cache import ResultCache, is_deterministic
+
+EXECUTION_INLINE = "inline"
+EXECUTION_ASYNC = "async"
+EXECUTION_IO = "io"
+EXECUTION_CPU = "cpu"
+EXECUTION_KINDS = (EXECUTION_INLINE, EXECUTION_ASYNC, EXECUTION_IO, EXECUTION_CPU)
+
+DEFAULT_THREAD_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+DEFAULT_PROCESS_WORKERS = os.cpu_count() or 1
+DEFAULT_TIMEOUT_MS = 30000
+
+# SIGKILL cannot be caught by the tool; Windows only has SIGTERM (TerminateProcess)
+_KILL_SIGNAL = getattr(signal, "SIGKILL", signal.SIGTERM)
+
+
+def _run_tool(tool: Any, params: Dict[str, Any]) -> Any:
+    # Module-level so it can be pickled into process pool workers
+    return tool.execute(params)
+
+
+# Set in each process pool worker: the shared slot array and this worker's slot
+_worker_slots: Any = None
+_worker_slot = -1
+
+
+def _init_worker(slots: Any, claimed: Any) -> None:
+    global _worker_slots, _worker_slot
+    with claimed.get_lock():
+        slot = claimed.value
+        claimed.value += 1
+    if 2 * slot < len(slots):
+        _worker_slots, _worker_slot = slots, slot
+        slots[2 * slot] = os.getpid()
+
+
+def _run_tracked(token: int, tool: Any, params: Dict[str, Any]) -> Any:
+    """Run a call in a worker, publishing its token so the parent can find the worker"""
+    slots, slot = _worker_slots, _worker_slot
+    if slots is None:
+        return tool.execute(params)
+    slots[2 * slot + 1] = token
+    try:
+        return tool.execute(params)
+    finally:
+        slots[2 * slot + 1] = 0
+
+
+class ProcessPool:
+    """A process pool whose workers publish (pid, token of the running call)
+    in shared memory, so the worker running a given call can be killed"""
+
+    def __init__(self, max_workers: int):
+        # Imported here: multiprocessing is slow to import and most
+        # processes never start a process pool
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        self._slots = multiprocessing.RawArray("q", 2 * max_workers)
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker,
+            initargs=(self._slots, multiprocessing.Value("i", 0))
+        )
+        self.killed = False
+
+    def submit(self, token: int, tool: Any, params: Dict[str, Any]) -> Future:
+        return self._executor.submit(_run_tracked, token, tool, params)
+
+    def kill(self, token: int) -> bool:
+        """Kill the worker running the call with this token; False if none is"""
+        slots = self._slots
+        for slot in range(0, len(slots), 2):
+            pid = slots[slot]
+            if pid and slots[slot + 1] == token:
+                try:
+                    os.kill(pid, _KILL_SIGNAL)
+                except OSError:
+                    return False
+                self.killed = True
+                return True
+        return False
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+class PoolStats:
+    """Occupancy counters for one worker pool"""
+
+    __slots__ = ("name", "max_workers", "in_flight", "peak_in_flight", "submitted", "completed", "_lock")
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self._lock = threading.Lock()
+
+    def enter(self) -> None:
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+            if self.in_flight > self.peak_in_flight:
+                self.peak_in_flight = self.in_flight
+
+    def exit(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        in_flight = self.in_flight
+        return {
+            "max_workers": self.max_workers,
+            "in_flight": in_flight,
+            "queue_depth": max(0, in_flight - self.max_workers),
+            "saturation": round(in_flight / self.max_workers, 3),
+            "peak_in_flight": self.peak_in_flight,
+            "submitted": self.submitted,
+            "completed": self.completed
+        }
+
+
+class ToolExecutor:
+    """Route each tool call inline, to a thread pool or to a process pool"""
+
+    def __init__(self, thread_workers: int = DEFAULT_THREAD_WORKERS,
+                 process_workers: int = DEFAULT_PROCESS_WORKERS):
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPool] = None
+        self._pool_lock = threading.Lock()
+        self._tokens = itertools.count(1)
+        self.thread_stats = PoolStats("thread", thread_workers)
+        self.process_stats = PoolStats("process", process_workers)
+
+    @classmethod
+    def from_config(cls, config: Any) -> "ToolExecutor":
+        return cls(thread_workers=config.thread_pool_size, process_workers=config.process_pool_size)
+
+    # Pools are created on first use so idle servers never spawn workers
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            with self._pool_lock:
+                if self._thread_pool is None:
+                    self._thread_pool = ThreadPoolExecutor(
+                        max_workers=self.thread_stats.max_workers, thread_name_prefix="mcp-tool"
+                    )
+        return self._thread_pool
+
+    def _get_process_pool(self) -> ProcessPool:
+        if self._process_pool is None:
+            with self._pool_lock:
+                if self._process_pool is None:
+                    self._process_pool = ProcessPool(self.process_stats.max_workers)
+                    logger.info(f"Started process pool with {self.process_stats.max_workers} workers")
+        return self._process_pool
+
+    def _discard_process_pool(self, pool: ProcessPool) -> None:
+        """Stop handing out a broken pool; the next call starts a fresh one"""
+        with self._pool_lock:
+            if self._process_pool is pool:
+                self._process_pool = None
+        pool.shutdown(wait=False)
+
+    @staticmethod
+    def execution_kind(tool: Any, params: Dict[str, Any]) -> str:
+        if asyncio.iscoroutinefunction(tool.execute):
+            return EXECUTION_ASYNC
+        execution_for = getattr(tool, "execution_for", None)
+        kind = execution_for(params) if execution_for is not None else getattr(tool, "execution", EXECUTION_IO)
+        if kind not in EXECUTION_KINDS:
+            raise ValueError(f"Tool '{tool.name}' declares unknown execution kind '{kind}'")
+        return kind
+
+    async def execute(self, tool: Any, params: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        """Run one call; raises asyncio.TimeoutError when it exceeds `timeout` seconds"""
+        kind = self.execution_kind(tool, params)
+        if kind == EXECUTION_ASYNC:
+            return await asyncio.wait_for(tool.execute(params), timeout)
+        if kind == EXECUTION_INLINE:
+            return tool.execute(params)
+
+        if kind == EXECUTION_IO:
+            stats = self.thread_stats
+            stats.enter()
+            try:
+                loop = asyncio.get_running_loop()
+                return await asyncio.wait_for(
+                    loop.run_in_executor(self._get_thread_pool(), _run_tool, tool, params), timeout
+                )
+            finally:
+                stats.exit()
+
+        stats = self.process_stats
+        stats.enter()
+        try:
+            return await self._execute_in_process(tool, params, timeout)
+        finally:
+            stats.exit()
+
+    async def _execute_in_process(self, tool: Any, params: Dict[str, Any], timeout: Optional[float]) -> Any:
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        retried = False
+        while True:
+            pool, token = self._get_process_pool(), next(self._tokens)
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(pool.submit(token, tool, params)), timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                # Nobody wants the result any more: stop the worker computing it
+                if pool.kill(token):
+                    self._discard_process_pool(pool)
+                raise
+            except BrokenExecutor:
+                self._discard_process_pool(pool)
+                # The pool breaks for every call when one of its workers is
+                # killed; only calls whose own worker died unexpectedly fail
+                if not pool.killed or retried:
+                    raise RuntimeError("Tool worker process terminated unexpectedly")
+                retried = True
+                if deadline is not None:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        raise asyncio.TimeoutError()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "thread_pool": self.thread_stats.snapshot(),
+            "process_pool": self.process_stats.snapshot()
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._pool_lock:
+            for pool in (self._thread_pool, self._process_pool):
+                if pool is not None:
+                    pool.shutdown(wait=wait)
+            self._thread_pool = None
+            self._process_pool = None
+
+
+class BatchExecutor:
+    """Run a batch of function calls concurrently, preserving result order"""
+
+    def __init__(self, tools: Mapping[str, Any], executor: Optional[ToolExecutor] = None,
+                 max_concurrency: Optional[int] = None, cache: Optional[ResultCache] = None,
+                 metrics: Optional[Any] = None, timeout_ms: int = DEFAULT_TIMEOUT_MS):
+        self.tools = tools
+        self.executor = executor or ToolExecutor()
+        self.max_concurrency = max_concurrency or DEFAULT_THREAD_WORKERS
+        self.cache = cache
+        self.metrics = metrics
+        # Default per-call timeout in seconds; None when calls are unbounded
+        self.timeout = timeout_ms / 1000 if timeout_ms else None
+
+    def timeout_for(self, tool: Any, deadline: Optional[float] = None) -> Optional[float]:
+        """Seconds a call to `tool` may take, given the request's loop-time deadline"""
+        timeout = getattr(tool, "timeout", None) or self.timeout
+        if deadline is not None:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                raise TimeoutError("Request deadline passed before the call started")
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    async def call(self, call: Dict[str, Any], deadline: Optional[float] = None) -> Any:
+        """Execute a single function call and return the tool's result"""
+        if not isinstance(call, dict):
+            raise ValueError("Invalid params: a function call must be an object")
+        name = call.get("name")
+        if not isinstance(name, str):
+            raise ValueError("Invalid params: name must be a string")
+        if name not in self.tools:
+            raise LookupError(f"Tool '{name}' not found")
+        tool, params = self.tools[name], call.get("parameters")
+        if isinstance(tool, PluginTool) and not tool.loaded:
+            # A failed import is this call's error; the tool's own checks
+            # were skipped while it was not loaded, so they run now
+            await asyncio.to_thread(tool.load)
+            tool.validate(params)
+        timeout = self.timeout_for(tool, deadline)
+        try:
+            cache = self.cache
+            if cache is not None and cache.enabled and is_deterministic(tool):
+                # Callers sharing one computation each wait under their own
+                # timeout; the computation stops when the last one leaves
+                return await cache.get_or_compute(name, params, lambda: self.executor.execute(tool, params), timeout)
+            return await self.executor.execute(tool, params, timeout)
+        except asyncio.TimeoutError:
+            if timeout is None:
+                raise
+            raise TimeoutError(f"Tool '{name}' timed out after {timeout:.3g} s") from None
+
+    async def run(self, calls: List[Dict[str, Any]], concurrency: Optional[int] = None,
+                  fail_fast: bool = False, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Execute all calls and return one result entry per call, in order.
+
+        `concurrency` lowers the number of calls in flight for this batch
+        (it can never exceed `max_concurrency`). With `fail_fast`, the first
+        failing call cancels every call that has not finished yet. `timeout`
+        (seconds) is the deadline of the whole batch, including the time
+        calls wait for a concurrency slot.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(calls)
+
+        async def store(index: int, entry: Dict[str, Any]) -> None:
+            results[index] = entry
+
+        await self.stream(calls, store, concurrency, fail_fast, timeout)
+        return results
+
+    async def stream(self, calls: List[Dict[str, Any]],
+                     on_result: Callable[[int, Dict[str, Any]], Awaitable[None]],
+                     concurrency: Optional[int] = None, fail_fast: bool = False,
+                     timeout: Optional[float] = None) -> Dict[str, int]:
+        """Execute all calls, handing each entry to `on_result(index, entry)` as soon as its call finishes.
+
+        Takes the same options as `run`. Entries are not kept: a call keeps
+        its concurrency slot while `on_result` is awaited, so a consumer that
+        falls behind slows the batch down instead of letting results pile up.
+        Returns the number of calls, successes and errors.
+        """
+        counts = {"calls": len(calls), "succeeded": 0, "failed": 0}
+        if not calls:
+            return counts
+
+        limit = self.max_concurrency
+        if concurrency:
+            limit = max(1, min(int(concurrency), limit))
+        deadline = None if timeout is None else asyncio.get_running_loop().time() + timeout
+        semaphore = asyncio.Semaphore(limit)
+        finished = bytearray(len(calls))
+        tasks: List[asyncio.Task] = []
+        # Tasks handing over a finished entry; fail_fast leaves them alone
+        emitting: Set[asyncio.Task] = set()
+        failed = False
+
+        async def run_one(index: int, call: Dict[str, Any]) -> None:
+            nonlocal failed
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    entry = {"status": "success", "result": await self.call(call, deadline)}
+                except asyncio.CancelledError:
+                    if not failed:
+                        raise  # The request itself was cancelled
+                    return
+                except Exception as e:
+                    entry = {"status": "error", "error": str(e)}
+                    if fail_fast:
+                        failed = True
+                        current = asyncio.current_task()
+                        for task in tasks:
+                            if task is not current and task not in emitting and not task.done():
+                                task.cancel()
+                elapsed = time.perf_counter() - start
+                entry["duration_ms"] = round(elapsed * 1000, 3)
+                finished[index] = 1
+                counts["succeeded" if entry["status"] == "success" else "failed"] += 1
+                if self.metrics is not None:
+                    # Unknown names share one series so clients cannot add series
+                    name = call.get("name") if isinstance(call, dict) else None
+                    tool = name if isinstance(name, str) and name in self.tools else "unknown"
+                    self.metrics.tool_duration.observe((tool, entry["status"]), elapsed)
+                current = asyncio.current_task()
+                emitting.add(current)
+                try:
+                    await on_result(index, entry)
+                except Exception:
+                    # Nobody can take the other results either
+                    for task in tasks:
+                        if task is not current:
+                            task.cancel()
+                    raise
+                finally:
+                    emitting.discard(current)
+
+        if len(calls) == 1:
+            # Nothing to overlap with, so skip the task machinery
+            await run_one(0, calls[0])
+        else:
+            tasks.extend(asyncio.ensure_future(run_one(index, call)) for index, call in enumerate(calls))
+            outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+            for outcome in outcomes:
+                # A failing on_result (e.g. the client went away) ends the batch
+                if isinstance(outcome, Exception):
+                    raise outcome
+
+        for index, done in enumerate(finished):
+            if not done:
+                counts["failed"] += 1
+                await on_result(index, {"status": "error", "error": "Cancelled after an earlier call failed"})
+        return counts
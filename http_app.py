@@ -0,0 +1,326 @@
+"""
+HTTP and WebSocket routes of the MCP server (the FastAPI app).
+Only imported when HTTP is served: `server.app` loads it on first access, so
+the stdio entry path never imports FastAPI.
+"""
+
+import asyncio
+import math
+import sys
+from typing import Any, Dict, List, Optional, Union
+
+from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from loguru import logger
+
+import jsonrpc
+from admission import REASON_RATE_LIMITED, Rejected
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from router import Context
+from service import (ADMISSION, CONFIG, METRICS, RESULT_CACHE, SESSIONS, TOOL_EXECUTOR, TOOLS, handle_message,
+                     wants_stream, watch_plugins)
+from sessions import SESSION_COOKIE, SESSION_HEADER, Session
+from ws_transport import WebSocketSession
+
+try:
+    app = FastAPI()
+
+    # Log FastAPI initialization
+    logger.info("FastAPI application initialized")
+except Exception as e:
+    logger.exception(f"Error initializing FastAPI application: {e}")
+    sys.exit(1)
+
+def json_response(payload: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]) -> Response:
+    """Encode a JSON-RPC response once, bypassing FastAPI's re-encoding"""
+    if payload is None:
+        # Notifications, alone or in a batch, get no response body
+        return Response(status_code=204)
+    return Response(content=jsonrpc.dumps(payload), media_type="application/json")
+
+class BodyTooLarge(Exception):
+    pass
+
+async def read_body(request: Request) -> bytes:
+    """The request body, refused once it grows past CONFIG.max_request_bytes"""
+    limit = CONFIG.max_request_bytes
+    length = request.headers.get("content-length")
+    if length is not None and length.isdigit() and int(length) > limit:
+        raise BodyTooLarge()
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise BodyTooLarge()
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+def body_too_large_response(endpoint: str) -> Response:
+    response = jsonrpc.error_response(jsonrpc.INVALID_REQUEST, "Request too large", None,
+                                      {"max_bytes": CONFIG.max_request_bytes})
+    METRICS.count_errors("http", endpoint, response)
+    return Response(content=jsonrpc.dumps(response), media_type="application/json", status_code=413)
+
+def rejected_response(error: Rejected, data: Any) -> Response:
+    """429 for a client over its rate, 503 when the server sheds load"""
+    status_code = 429 if error.reason == REASON_RATE_LIMITED else 503
+    headers = {}
+    if error.retry_after is not None:
+        headers["Retry-After"] = str(max(1, math.ceil(error.retry_after)))
+    payload = error.response(data)
+    if payload is None:
+        return Response(status_code=status_code, headers=headers)
+    return Response(content=jsonrpc.dumps(payload), media_type="application/json", status_code=status_code,
+                    headers=headers)
+
+def client_key(connection: Union[Request, WebSocket]) -> str:
+    """Rate limits apply per peer address"""
+    return connection.client.host if connection.client else "unknown"
+
+def requests_initialize(data: Any) -> bool:
+    """Whether a message (or any member of a batch) is an initialize request"""
+    if isinstance(data, list):
+        return any(isinstance(member, dict) and member.get("method") == "initialize" for member in data)
+    return isinstance(data, dict) and data.get("method") == "initialize"
+
+def http_session(request: Request, data: Any) -> Session:
+    """The session named by the request's header or cookie.
+
+    An initialize request without a known session starts a stored session;
+    any other request without one runs in a throwaway session.
+    """
+    session_id = request.headers.get(SESSION_HEADER) or request.cookies.get(SESSION_COOKIE)
+    session = SESSIONS.get(session_id)
+    if session is None:
+        session = SESSIONS.create() if requests_initialize(data) else Session()
+    return session
+
+def with_session(response: Response, session: Session) -> Response:
+    """Tell the client which stored session served the request"""
+    if session.id is not None:
+        if not session.initialized:
+            # The client shut its session down
+            SESSIONS.remove(session.id)
+        else:
+            response.headers[SESSION_HEADER] = session.id
+            response.set_cookie(SESSION_COOKIE, session.id, httponly=True, samesite="lax")
+    return response
+
+# Standard REST endpoint for Smithery compatibility
+@app.get("/tools")
+async def get_tools(request: Request):
+    """Standard REST endpoint to list available tools"""
+    # In HTTP mode, we don't require initialization for the /tools endpoint
+    catalog = TOOLS.catalog
+    headers = {"ETag": catalog.etag}
+    if catalog.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=catalog.body, media_type="application/json", headers=headers)
+
+@app.get("/health")
+async def health_check():
+    """Health check endpoint"""
+    return {"status": "healthy"}
+
+@app.get("/executor")
+async def executor_stats():
+    """Worker pool occupancy (queue depth, saturation) for sizing the pools"""
+    return TOOL_EXECUTOR.stats()
+
+@app.get("/cache")
+async def cache_stats():
+    """Result cache occupancy and hit/miss/eviction counters for tuning it"""
+    return RESULT_CACHE.stats()
+
+@app.get("/sessions")
+async def session_stats():
+    """Live session counts and churn (created, expired, evicted, closed)"""
+    return SESSIONS.stats()
+
+@app.get("/admission")
+async def admission_stats():
+    """Messages in flight and queued, and the configured limits"""
+    return ADMISSION.stats()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Request, method and tool latencies, error codes and gauges (Prometheus text format)"""
+    return Response(content=METRICS.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.on_event("startup")
+async def start_background_tasks():
+    app.state.background_tasks = [asyncio.create_task(METRICS.monitor_loop_lag("http"))]
+    if METRICS.shared is not None:
+        app.state.background_tasks.append(asyncio.create_task(METRICS.publish_periodically()))
+    # Every worker process watches the plugins directory itself
+    plugin_watcher = watch_plugins()
+    if plugin_watcher is not None:
+        app.state.background_tasks.append(plugin_watcher)
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    for task in app.state.background_tasks:
+        task.cancel()
+    TOOL_EXECUTOR.shutdown(wait=False)
+
+def auto_initialize(session: Session, data: Any, source: str) -> None:
+    # In HTTP mode, allow certain methods without initialization
+    if CONFIG.http_mode and not session.initialized:
+        # Auto-initialize for HTTP mode if this is not an initialize request
+        if not requests_initialize(data):
+            session.initialized = True
+            logger.debug("Auto-initializing session for {} request in HTTP mode", source)
+
+def parse_error_response(endpoint: str, error: Exception) -> Response:
+    response = jsonrpc.error_response(jsonrpc.PARSE_ERROR, "Parse error", None, str(error))
+    METRICS.count_errors("http", endpoint, response)
+    return json_response(response)
+
+async def answer(data: Any, session: Session, endpoint: str, client: str) -> Response:
+    """Handle a message; a streamed `execute` is answered as NDJSON once its first result is ready"""
+    if not wants_stream(data):
+        return json_response(await handle_message(data, Context(session, "http"), endpoint, client))
+
+    # At most ws_send_queue_size encoded results wait for a slow reader
+    lines: asyncio.Queue = asyncio.Queue(maxsize=CONFIG.ws_send_queue_size)
+
+    async def notify(message: Dict[str, Any]) -> None:
+        await lines.put(jsonrpc.dumps(message))
+
+    handling = asyncio.ensure_future(handle_message(data, Context(session, "http", notify), endpoint, client))
+    pending = asyncio.ensure_future(lines.get())
+    # Waiting for the first result keeps a status code available for
+    # rejections and for errors raised before any call ran
+    await asyncio.wait((pending, handling), return_when=asyncio.FIRST_COMPLETED)
+    if not pending.done():
+        pending.cancel()
+        return json_response(handling.result())
+
+    async def body():
+        nonlocal pending
+        try:
+            while True:
+                if pending.done():
+                    yield pending.result() + b"\n"
+                    pending = asyncio.ensure_future(lines.get())
+                    continue
+                await asyncio.wait((pending, handling), return_when=asyncio.FIRST_COMPLETED)
+                if not pending.done():
+                    # Every result is queued by now; the response comes last
+                    pending.cancel()
+                    while not lines.empty():
+                        yield lines.get_nowait() + b"\n"
+                    yield jsonrpc.dumps(handling.result()) + b"\n"
+                    return
+        finally:
+            # The client may have gone away: stop the remaining calls
+            pending.cancel()
+            handling.cancel()
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+@app.post("/")
+async def handle_jsonrpc(request: Request):
+    try:
+        data = jsonrpc.loads(await read_body(request))
+        session = http_session(request, data)
+        auto_initialize(session, data, "JSON-RPC")
+        return with_session(await answer(data, session, "/", client_key(request)), session)
+    except BodyTooLarge:
+        return body_too_large_response("/")
+    except Rejected as e:
+        return rejected_response(e, data)
+    except Exception as e:
+        return parse_error_response("/", e)
+
+# MCP-compatible JSON-RPC endpoint for tool listing
+@app.post("/mcp")
+async def handle_mcp_jsonrpc(request: Request):
+    """Dedicated MCP-compatible JSON-RPC endpoint for Smithery integration"""
+    try:
+        data = jsonrpc.loads(await read_body(request))
+        session = http_session(request, data)
+
+        # Always auto-initialize for MCP endpoint, so list_tools and
+        # initialize always succeed
+        session.initialized = True
+
+        return with_session(await answer(data, session, "/mcp", client_key(request)), session)
+    except BodyTooLarge:
+        return body_too_large_response("/mcp")
+    except Rejected as e:
+        return rejected_response(e, data)
+    except Exception as e:
+        return parse_error_response("/mcp", e)
+
+# WebSocket endpoint for Smithery
+@app.websocket("/")
+async def websocket_endpoint(websocket: WebSocket):
+    await websocket.accept()
+    session = SESSIONS.open()
+    context = Context(session, "websocket")
+    client = client_key(websocket)
+
+    async def handle(data: Any) -> Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        auto_initialize(session, data, "WebSocket")
+        # Process the JSON-RPC request (or batch of requests)
+        try:
+            return await handle_message(data, context, "/", client)
+        except Rejected as e:
+            return e.response(data)
+
+    def on_error(response: Dict[str, Any]) -> None:
+        METRICS.count_errors("websocket", "/", response)
+
+    connection = WebSocketSession(websocket, handle, CONFIG.ws_max_in_flight, CONFIG.ws_send_queue_size,
+                                  on_error=on_error)
+    context.notify = connection.notify
+    try:
+        await connection.serve()
+    except WebSocketDisconnect:
+        logger.debug("Client disconnected")
+    except Exception as e:
+        # Send error response
+        error_response = jsonrpc.error_response(jsonrpc.INTERNAL_ERROR, "Internal error", None, str(e))
+        try:
+            await websocket.send_text(jsonrpc.dumps(error_response).decode("utf-8"))
+        except:
+            pass
+    finally:
+        SESSIONS.release(session)
+
+# MCP-compatible WebSocket endpoint for Smithery
+@app.websocket("/mcp")
+async def mcp_websocket_endpoint(websocket: WebSocket):
+    await websocket.accept()
+    # Auto-initialize for MCP WebSocket
+    session = SESSIONS.open(initialized=True)
+    context = Context(session, "websocket")
+    client = client_key(websocket)
+
+    async def handle(data: Any) -> Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        try:
+            return await handle_message(data, context, "/mcp", client)
+        except Rejected as e:
+            return e.response(data)
+
+    def on_error(response: Dict[str, Any]) -> None:
+        METRICS.count_errors("websocket", "/mcp", response)
+
+    connection = WebSocketSession(websocket, handle, CONFIG.ws_max_in_flight, CONFIG.ws_send_queue_size,
+                                  on_error=on_error)
+    context.notify = connection.notify
+    try:
+        await connection.serve()
+    except WebSocketDisconnect:
+        logger.debug("Client disconnected from MCP WebSocket")
+    except Exception as e:
+        # Send error response
+        error_response = jsonrpc.error_response(jsonrpc.INTERNAL_ERROR, "Internal error", None, str(e))
+        try:
+            await websocket.send_text(jsonrpc.dumps(error_response).decode("utf-8"))
+        except:
+            pass
+    finally:
+        SESSIONS.release(session)
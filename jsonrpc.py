@@ -0,0 +1,188 @@
+"""
+JSON-RPC 2.0 wire codec for the MCP server.
+Requests are parsed from the raw message bytes once and validated by hand;
+responses are plain dicts encoded straight to bytes; a result that is
+already encoded (an `Encoded`, such as the tool catalog) is spliced into the
+response as is. orjson is used when it
+is installed, with the standard library json module as the fallback for
+everything orjson does not round-trip exactly (integers beyond 64 bits,
+NaN/Infinity literals) or when orjson is missing.
+
+A message may also be a batch (a JSON array of requests); `dispatch_batch`
+runs its members concurrently and collects one response per non-notification.
+"""
+
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional speed-up
+    orjson = None
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+SERVER_OVERLOADED = -32000
+SERVER_NOT_INITIALIZED = -32002
+REQUEST_CANCELLED = -32800
+
+# orjson reads integers wider than 64 bits as floats; any run of 19 digits
+# may be such an integer, so those messages are parsed by the json module.
+# Runs are found by mapping every digit to "0" and searching for 19 zeros,
+# both done in C (a regex tries each digit of a number-heavy message in turn).
+_DIGITS_TO_ZERO = bytes.maketrans(b"123456789", b"000000000")
+_LONG_RUN = b"0" * 19
+
+
+def _has_long_integer(data: bytes) -> bool:
+    """Whether a run of 19+ digits starts an integer rather than continuing a
+    fraction or an exponent (as in 0.000123... or 1e-0...)"""
+    digits = data.translate(_DIGITS_TO_ZERO)
+    start = digits.find(_LONG_RUN)
+    while start != -1:
+        # find() returns the first digit of the run
+        before = data[start - 1:start]
+        if before == b"-":
+            if data[start - 2:start - 1] not in (b"e", b"E"):
+                return True
+        elif not before or before not in b".eE+":
+            return True
+        end = start + len(_LONG_RUN)
+        while digits[end:end + 1] == b"0":
+            end += 1
+        start = digits.find(_LONG_RUN, end)
+    return False
+
+
+def loads(raw: Union[bytes, str]) -> Any:
+    """Parse one JSON message; raises ValueError on malformed input"""
+    if orjson is not None:
+        data = raw.encode("utf-8") if isinstance(raw, str) else raw
+        if not _has_long_integer(data):
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                pass  # Let the json module decide (it accepts NaN/Infinity)
+    return json.loads(raw)
+
+
+class Encoded:
+    """A result that is already JSON: `value` is the object, `data` its bytes"""
+
+    __slots__ = ("value", "data")
+
+    def __init__(self, value: Any, data: bytes):
+        self.value = value
+        self.data = data
+
+
+def _has_encoded(obj: Any) -> bool:
+    return type(obj) is dict and type(obj.get("result")) is Encoded
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode a message (or a batch of them) to compact UTF-8 JSON bytes"""
+    if _has_encoded(obj):
+        return (b'{"jsonrpc":"2.0","result":' + obj["result"].data + b',"error":null,"id":'
+                + dumps(obj["id"]) + b"}")
+    if type(obj) is list and any(_has_encoded(member) for member in obj):
+        return b"[" + b",".join(dumps(member) for member in obj) + b"]"
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+class JsonRpcError(Exception):
+    """A JSON-RPC error to be returned to the client"""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+class Request:
+    """A validated JSON-RPC request"""
+
+    __slots__ = ("method", "params", "id")
+
+    def __init__(self, method: str, params: Optional[Dict[str, Any]], request_id: Optional[Union[int, str]]):
+        self.method = method
+        self.params = params
+        self.id = request_id
+
+
+def parse_request(data: Any) -> Request:
+    """Validate a decoded message as a JSON-RPC 2.0 request"""
+    if not isinstance(data, dict):
+        raise JsonRpcError(PARSE_ERROR, "Parse error", "Request must be a JSON object")
+    if data.get("jsonrpc") != "2.0":
+        raise JsonRpcError(PARSE_ERROR, "Parse error", "jsonrpc: must be \"2.0\"")
+    method = data.get("method")
+    if not isinstance(method, str):
+        raise JsonRpcError(PARSE_ERROR, "Parse error", "method: must be a string")
+    params = data.get("params")
+    if params is not None and not isinstance(params, dict):
+        raise JsonRpcError(PARSE_ERROR, "Parse error", "params: must be an object")
+    request_id = data.get("id")
+    if request_id is not None and (type(request_id) is not int and not isinstance(request_id, str)):
+        raise JsonRpcError(PARSE_ERROR, "Parse error", "id: must be an integer, a string or null")
+    return Request(method, params, request_id)
+
+
+def result_response(result: Any, request_id: Optional[Union[int, str]]) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "result": result, "error": None, "id": request_id}
+
+
+def error_response(code: int, message: str, request_id: Optional[Union[int, str]] = None,
+                   data: Any = None) -> Dict[str, Any]:
+    error = {"code": code, "message": message}
+    if data is not None:
+        error["data"] = data
+    return {"jsonrpc": "2.0", "result": None, "error": error, "id": request_id}
+
+
+def is_notification(data: Any) -> bool:
+    """A request without an "id" member expects no response"""
+    return isinstance(data, dict) and "id" not in data
+
+
+def extract_id(message: Any) -> Optional[Union[int, str]]:
+    """The id of a possibly invalid request, or None if it has no valid id"""
+    request_id = message.get("id") if isinstance(message, dict) else None
+    return request_id if type(request_id) is int or isinstance(request_id, str) else None
+
+
+async def dispatch_batch(batch: List[Any],
+                         handler: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+                         ) -> Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+    """Dispatch the members of a batch concurrently.
+
+    Returns the responses in request order, leaving out notifications, or
+    None when every member was a notification. An empty batch is answered
+    with a single Invalid Request error, as JSON-RPC 2.0 requires.
+    """
+    if not batch:
+        return error_response(INVALID_REQUEST, "Invalid Request", None, "Batch must not be empty")
+
+    async def run_member(member: Any) -> Optional[Dict[str, Any]]:
+        try:
+            parse_request(member)
+        except JsonRpcError as e:
+            return error_response(INVALID_REQUEST, "Invalid Request", extract_id(member), e.data)
+        try:
+            response = await handler(member)
+        except Exception as e:
+            response = error_response(INTERNAL_ERROR, "Internal error", extract_id(member), str(e))
+        return None if is_notification(member) else response
+
+    responses = await asyncio.gather(*(run_member(member) for member in batch))
+    return [response for response in responses if response is not None] or None
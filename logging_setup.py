@@ -0,0 +1,158 @@
+"""
+Logging pipeline of the MCP server.
+Every loguru sink is added with enqueue=True: code on the request path only
+formats a record and puts it on a queue, and loguru's writer thread does the
+blocking stderr and file writes (and file rotation).
+
+Records are written as one JSON object per line (time, level, message,
+logger, function, line, process, bound extra fields and the exception, if
+any). Log files under logs/ are always JSON; stderr is JSON in HTTP mode and
+plain text in stdio mode, where a person reads it in the client's log.
+MCP_LOG_FORMAT ("json" or "text") overrides the stderr format.
+
+Debug records are rate limited by a token bucket of MCP_LOG_DEBUG_RATE
+records per second (default 100; 0 drops them all). Dropped records are
+counted, and the next debug record that is kept carries the count in its
+`suppressed` field.
+
+Standard library logging (uvicorn's server and access logs) is routed into
+the same sinks, so it is queued and formatted the same way.
+"""
+
+import inspect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict
+
+from loguru import logger
+
+from config import ServerConfig
+
+LOG_DIR = "logs"
+FORMAT_JSON = "json"
+FORMAT_TEXT = "text"
+
+DEBUG_LEVEL = logger.level("DEBUG").no
+
+_TEXT_FORMATS = {
+    "stdio": "{message}",
+    "worker": "[{process}] {time:YYYY-MM-DD HH:mm:ss.SSS} | {level} | {message}",
+    "http": None  # loguru's default format
+}
+_MODE_NAMES = {"stdio": "stdio mode", "worker": "HTTP worker process", "http": "HTTP mode"}
+
+
+def _record_json(record: Dict[str, Any]) -> str:
+    entry = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "message": record["message"],
+        "logger": record["extra"].get("logger_name", record["name"]),
+        "function": record["function"],
+        "line": record["line"],
+        "process": record["process"].id
+    }
+    for key, value in record["extra"].items():
+        if key not in ("json", "logger_name"):
+            entry[key] = value
+    exception = record["exception"]
+    if exception is not None:
+        entry["exception"] = "".join(traceback.format_exception(exception.type, exception.value,
+                                                                exception.traceback))
+    return json.dumps(entry, default=str)
+
+
+def json_format(record: Dict[str, Any]) -> str:
+    """loguru format callable writing the record as one JSON line"""
+    # The template is formatted again by loguru, so the JSON goes in extra
+    record["extra"]["json"] = _record_json(record)
+    return "{extra[json]}\n"
+
+
+class DebugRateLimit:
+    """Token bucket over debug (and trace) records, shared by every sink"""
+
+    def __init__(self, rate: int):
+        self.rate = rate
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self.suppressed = 0
+        self._lock = threading.Lock()
+        self._last_record = None
+        self._last_decision = True
+
+    def __call__(self, record: Dict[str, Any]) -> bool:
+        if record["level"].no > DEBUG_LEVEL:
+            return True
+        with self._lock:
+            # Each sink filters the same record object; decide it only once
+            if record is self._last_record:
+                return self._last_decision
+            self._last_record = record
+            now = time.monotonic()
+            self.tokens = min(float(self.rate), self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                self.suppressed += 1
+                self._last_decision = False
+                return False
+            self.tokens -= 1
+            if self.suppressed:
+                record["extra"]["suppressed"] = self.suppressed
+                self.suppressed = 0
+            self._last_decision = True
+            return True
+
+
+class InterceptHandler(logging.Handler):
+    """Hand standard library log records to loguru"""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+        # Report the caller of the logging call, not this handler
+        frame, depth = inspect.currentframe(), 0
+        while frame and (depth == 0 or frame.f_code.co_filename == logging.__file__):
+            frame = frame.f_back
+            depth += 1
+        logger.opt(depth=depth, exception=record.exc_info).bind(logger_name=record.name).log(
+            level, record.getMessage()
+        )
+
+
+def configure_logging(config: ServerConfig) -> None:
+    """Replace loguru's default sink with the queued sinks for this mode"""
+    logger.remove()  # Remove default handlers
+    os.makedirs(LOG_DIR, exist_ok=True)
+
+    if config.stdio_mode:
+        mode, log_file = "stdio", "stdio-server.log"
+    elif config.multi_worker:
+        # Every worker process (and the supervisor) rotates its own file,
+        # since several processes cannot safely rotate one
+        mode, log_file = "worker", f"server-{os.getpid()}.log"
+    else:
+        mode, log_file = "http", "server.log"
+
+    debug_filter = DebugRateLimit(config.log_debug_rate)
+    stderr_format = config.log_format
+    if stderr_format not in (FORMAT_JSON, FORMAT_TEXT):
+        stderr_format = FORMAT_TEXT if mode == "stdio" else FORMAT_JSON
+    stderr_options: Dict[str, Any] = {"level": "INFO", "enqueue": True}
+    if stderr_format == FORMAT_JSON:
+        stderr_options["format"] = json_format
+    elif _TEXT_FORMATS[mode] is not None:
+        stderr_options["format"] = _TEXT_FORMATS[mode]
+    logger.add(sys.stderr, **stderr_options)
+    logger.add(os.path.join(LOG_DIR, log_file), level="DEBUG", rotation="10 MB", format=json_format,
+               filter=debug_filter, enqueue=True)
+
+    logging.basicConfig(handlers=[InterceptHandler()], level=logging.INFO, force=True)
+    logger.info(f"Configuring logging for {_MODE_NAMES[mode]}")
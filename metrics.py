@@ -0,0 +1,382 @@
+"""
+Runtime metrics for the MCP server, served at GET /metrics in the Prometheus
+text exposition format.
+
+Recording is meant for the hot path: every metric keeps one shard per thread
+(each event loop records into its own), so counters and histograms are
+updated without locks, and a histogram series is a preallocated list of
+bucket counts. Shards are only merged when the metrics are scraped. Values
+that other components already track (worker pool occupancy) are read at
+scrape time through callback gauges instead of being recorded.
+
+Label values are bounded: methods are only recorded for registered routes
+and tools only for registered tools, so clients cannot grow the series set.
+
+With several HTTP worker processes, every worker publishes a JSON snapshot of
+its metrics to a shared directory (MCP_METRICS_DIR) once a second, and the
+worker answering GET /metrics merges the latest snapshot of every worker with
+its own live values: counters and histograms are summed, gauges are summed
+or maxed. Gauges of a worker that stopped publishing are left out.
+"""
+
+import asyncio
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import jsonrpc
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOOP_LAG_INTERVAL = 0.5
+PUBLISH_INTERVAL = 1.0
+# Gauges in a snapshot this old are no longer current
+STALE_SNAPSHOT_SECONDS = 10.0
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class: a named family of labelled series, sharded per thread"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[Labels, Any]] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> Dict[Labels, Any]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            # First record from this thread: the only time a lock is taken
+            shard: Dict[Labels, Any] = {}
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def collect(self) -> Dict[Labels, Any]:
+        """Merge the shards of every thread into one value per series"""
+        merged: Dict[Labels, Any] = {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for labels, value in list(shard.items()):
+                merged[labels] = self._merge(merged.get(labels), value)
+        return merged
+
+    def _merge(self, total: Any, value: Any) -> Any:
+        return value if total is None else total + value
+
+    def samples(self, values: Dict[Labels, Any]) -> Iterable[str]:
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    """A gauge moved up and down with inc/dec, or set to a value.
+
+    `aggregate` says how the values of several worker processes combine:
+    "sum" (e.g. requests in flight) or "max" (e.g. event loop lag).
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), aggregate: str = "sum"):
+        super().__init__(name, documentation, labelnames)
+        self.aggregate = aggregate
+
+    def _merge(self, total: Any, value: Any) -> Any:
+        if total is None:
+            return value
+        return max(total, value) if self.aggregate == "max" else total + value
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) - amount
+
+    def set(self, labels: Labels, value: float) -> None:
+        # A set value belongs to one series owner, so it replaces any deltas
+        with self._lock:
+            for shard in self._shards:
+                shard.pop(labels, None)
+        self._shard()[labels] = value
+
+
+class CallbackGauge(Gauge):
+    """A gauge whose series are read from a callback at scrape time"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 callback: Callable[[], Dict[Labels, float]]):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def collect(self) -> Dict[Labels, Any]:
+        return dict(self.callback())
+
+
+class Histogram(Metric):
+    """Latency histogram; each series is [bucket counts..., +Inf count, sum]"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, labels: Labels, value: float) -> None:
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            series = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def _merge(self, total: Any, value: Any) -> Any:
+        return list(value) if total is None else [a + b for a, b in zip(total, value)]
+
+    def samples(self, values: Dict[Labels, Any]) -> Iterable[str]:
+        names = self.labelnames + ("le",)
+        for labels, series in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                yield f"{self.name}_bucket{_format_labels(names, labels + (le,))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(series[-1])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Registry:
+    """The set of metrics rendered at one endpoint"""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def collect(self) -> Dict[str, Dict[Labels, Any]]:
+        return {metric.name: metric.collect() for metric in self._metrics}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """This process's values as JSON-encodable data, for other workers to merge"""
+        return {
+            "pid": os.getpid(),
+            "time": time.time(),
+            "metrics": {
+                name: [[list(labels), value] for labels, value in values.items()]
+                for name, values in self.collect().items()
+            }
+        }
+
+    def merge(self, snapshots: Iterable[Dict[str, Any]]) -> Dict[str, Dict[Labels, Any]]:
+        """Live values of this process combined with other workers' snapshots"""
+        merged = self.collect()
+        now = time.time()
+        for snapshot in snapshots:
+            stale = now - snapshot.get("time", 0) > STALE_SNAPSHOT_SECONDS
+            metrics = snapshot.get("metrics", {})
+            for metric in self._metrics:
+                if stale and metric.kind == "gauge":
+                    continue
+                values = merged[metric.name]
+                for labels, value in metrics.get(metric.name, ()):
+                    labels = tuple(labels)
+                    values[labels] = metric._merge(values.get(labels), value)
+        return merged
+
+    def render(self, values: Optional[Dict[str, Dict[Labels, Any]]] = None) -> bytes:
+        if values is None:
+            values = self.collect()
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples(values.get(metric.name, {})))
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class SnapshotDirectory:
+    """Directory through which worker processes exchange metric snapshots"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._own = os.path.join(path, f"worker-{os.getpid()}.json")
+
+    def clear(self) -> None:
+        """Remove the snapshots of an earlier run (called before workers start)"""
+        for name in glob.glob(os.path.join(self.path, "worker-*.json")):
+            os.remove(name)
+
+    def write(self, snapshot: Dict[str, Any]) -> None:
+        # Write then rename, so readers never see a partial file
+        temporary = self._own + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(temporary, self._own)
+
+    def read_others(self) -> List[Dict[str, Any]]:
+        snapshots = []
+        for name in glob.glob(os.path.join(self.path, "worker-*.json")):
+            if name == self._own:
+                continue
+            try:
+                with open(name) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # Being replaced or removed right now
+        return snapshots
+
+
+class ServerMetrics:
+    """The metrics the server records, by transport, endpoint, method and tool"""
+
+    def __init__(self, registry: Optional[Registry] = None, shared_dir: Optional[str] = None):
+        self.registry = registry or Registry()
+        self.shared = SnapshotDirectory(shared_dir) if shared_dir else None
+        register = self.registry.register
+        self.request_duration = register(Histogram(
+            "mcp_request_duration_seconds", "Time to answer one message (a batch counts once)",
+            ("transport", "endpoint")
+        ))
+        self.requests_in_flight = register(Gauge(
+            "mcp_requests_in_flight", "Messages being handled", ("transport", "endpoint")
+        ))
+        self.errors = register(Counter(
+            "mcp_errors_total", "JSON-RPC error responses by error code", ("transport", "endpoint", "code")
+        ))
+        self.method_duration = register(Histogram(
+            "mcp_method_duration_seconds", "Handler time per JSON-RPC method", ("transport", "method")
+        ))
+        self.tool_duration = register(Histogram(
+            "mcp_tool_duration_seconds", "Time per tool call", ("tool", "status")
+        ))
+        self.loop_lag = register(Gauge(
+            "mcp_event_loop_lag_seconds", "How late the event loop woke up for its last lag probe", ("loop",),
+            aggregate="max"
+        ))
+        self.admission_rejected = register(Counter(
+            "mcp_admission_rejected_total", "Messages shed before routing, by reason", ("transport", "reason")
+        ))
+        self.admission_wait = register(Histogram(
+            "mcp_admission_wait_seconds", "Time admitted messages spent queued for a slot", ("transport",)
+        ))
+
+    def watch_executor(self, executor: Any) -> None:
+        """Report a ToolExecutor's pool occupancy at scrape time"""
+        def read(field: str) -> Callable[[], Dict[Labels, float]]:
+            def callback() -> Dict[Labels, float]:
+                return {(name.replace("_pool", ""),): pool[field] for name, pool in executor.stats().items()}
+            return callback
+
+        register = self.registry.register
+        register(CallbackGauge("mcp_executor_queue_depth", "Tool calls waiting for a worker", ("pool",),
+                               read("queue_depth")))
+        register(CallbackGauge("mcp_executor_in_flight", "Tool calls submitted and not finished", ("pool",),
+                               read("in_flight")))
+
+    def watch_admission(self, controller: Any) -> None:
+        """Report an AdmissionController's occupancy at scrape time"""
+        register = self.registry.register
+        register(CallbackGauge("mcp_admission_in_flight", "Admitted messages not finished", (),
+                               lambda: {(): controller.in_flight}))
+        register(CallbackGauge("mcp_admission_queued", "Messages waiting to be admitted", (),
+                               lambda: {(): controller.queued}))
+
+    def count_errors(self, transport: str, endpoint: str, response: Any) -> None:
+        """Count the error responses in a response or a batch of responses"""
+        if isinstance(response, list):
+            for member in response:
+                self.count_errors(transport, endpoint, member)
+        elif isinstance(response, dict):
+            error = response.get("error")
+            if error is not None:
+                self.errors.inc((transport, endpoint, str(error.get("code"))))
+
+    async def track(self, transport: str, endpoint: str, handling: Awaitable[Any]) -> Any:
+        """Await the handling of one message, recording its latency and errors"""
+        labels = (transport, endpoint)
+        self.requests_in_flight.inc(labels)
+        start = time.perf_counter()
+        try:
+            response = await handling
+        finally:
+            self.request_duration.observe(labels, time.perf_counter() - start)
+            self.requests_in_flight.dec(labels)
+        self.count_errors(transport, endpoint, response)
+        return response
+
+    async def middleware(self, request: jsonrpc.Request, context: Any,
+                         call_next: Callable[[jsonrpc.Request, Any], Awaitable[Any]]) -> Any:
+        """Router middleware timing each method handler"""
+        start = time.perf_counter()
+        try:
+            return await call_next(request, context)
+        finally:
+            self.method_duration.observe((context.transport, request.method), time.perf_counter() - start)
+
+    async def monitor_loop_lag(self, loop_name: str, interval: float = LOOP_LAG_INTERVAL) -> None:
+        """Probe the running loop until cancelled: sleep, and see how late it wakes"""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.loop_lag.set((loop_name,), max(0.0, loop.time() - start - interval))
+
+    def publish(self) -> None:
+        """Write this worker's snapshot for the other workers"""
+        if self.shared is not None:
+            self.shared.write(self.registry.snapshot())
+
+    async def publish_periodically(self, interval: float = PUBLISH_INTERVAL) -> None:
+        """Publish snapshots until cancelled, writing files off the event loop"""
+        while True:
+            await asyncio.to_thread(self.publish)
+            await asyncio.sleep(interval)
+
+    def render(self) -> bytes:
+        if self.shared is None:
+            return self.registry.render()
+        return self.registry.render(self.registry.merge(self.shared.read_others()))
@@ -0,0 +1,286 @@
+"""
+Numeric modes of the calculator tool, selected per call with `mode`:
+- "auto" (the default): integers stay exact Python ints and any float makes
+  the result a float64, as the calculator always did (see calculator.py).
+- "float": every operand is a float64. add, subtract, mean, sum_of_squares
+  and dot are summed with math.fsum, so they are correctly rounded however
+  many terms there are and whatever their magnitudes.
+- "decimal": decimal.Decimal arithmetic at `precision` significant digits
+  (default 28, at most MCP_CALC_MAX_PRECISION). Sums are accumulated
+  exactly and rounded once; multiply and divide round after every step.
+- "fraction": exact rational arithmetic (fractions.Fraction). Sums are taken
+  over the common denominator and products over numerators and denominators
+  separately, normalized once at the end.
+
+Operands may be JSON numbers, read by their shortest decimal representation
+(so 0.1 is exactly 1/10 in the exact modes), or strings such as "0.10",
+"-2.5e-30" or, in fraction mode, "1/3", for values JSON numbers would round.
+Decimal and fraction results are returned as strings for the same reason.
+
+Guards bound the work a single call can cause. They are held by a Limits
+object, which the server builds from its ServerConfig and the calculator
+carries into its worker processes:
+- max_operand_bits (MCP_CALC_MAX_OPERAND_BITS, default 8192): largest
+  integer operand, or numerator and denominator, in bits; decimal strings
+  may carry at most the same number of digits and exponents of that size.
+- max_result_bits (MCP_CALC_MAX_RESULT_BITS, default 262144): largest exact
+  product (and common denominator of a fraction sum) a call may build,
+  estimated from the operands' bit lengths before any multiplication happens.
+"""
+
+import decimal
+import math
+import operator
+import re
+from fractions import Fraction
+from functools import reduce
+from itertools import chain, islice
+from typing import Any, List, Optional, Sequence
+
+MODE_AUTO = "auto"
+MODE_FLOAT = "float"
+MODE_DECIMAL = "decimal"
+MODE_FRACTION = "fraction"
+MODES = [MODE_AUTO, MODE_FLOAT, MODE_DECIMAL, MODE_FRACTION]
+
+DEFAULT_PRECISION = 28
+DEFAULT_MAX_PRECISION = 1000
+DEFAULT_MAX_OPERAND_BITS = 8192
+DEFAULT_MAX_RESULT_BITS = 1 << 18
+
+_NUMBER_STRING = re.compile(r"\s*[+-]?(\d+\.?\d*|\.\d+)(?:[eE]([+-]?\d+))?\s*\Z")
+_FRACTION_STRING = re.compile(r"\s*[+-]?\d+\s*/\s*\d+\s*\Z")
+
+# Sums in decimal mode are accumulated without rounding: the operand caps
+# bound the digits an exact sum can need
+_EXACT = decimal.Context(prec=decimal.MAX_PREC, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN,
+                         traps=[decimal.InvalidOperation, decimal.DivisionByZero, decimal.Overflow])
+
+class Limits:
+    """The guards of one calculator: operand and result sizes, decimal precision"""
+
+    __slots__ = ("max_precision", "max_operand_bits", "max_result_bits", "max_operand_digits")
+
+    def __init__(self, max_precision: int = DEFAULT_MAX_PRECISION, max_operand_bits: int = DEFAULT_MAX_OPERAND_BITS,
+                 max_result_bits: int = DEFAULT_MAX_RESULT_BITS):
+        self.max_precision = max(1, max_precision)
+        self.max_operand_bits = max(64, max_operand_bits)
+        self.max_result_bits = max(self.max_operand_bits, max_result_bits)
+        # Decimal digits and exponents matching max_operand_bits
+        self.max_operand_digits = int(self.max_operand_bits * math.log10(2)) + 1
+
+    @classmethod
+    def from_config(cls, config: Any) -> "Limits":
+        return cls(max_precision=config.calc_max_precision, max_operand_bits=config.calc_max_operand_bits,
+                   max_result_bits=config.calc_max_result_bits)
+
+    def check_int(self, value: int) -> int:
+        if value.bit_length() > self.max_operand_bits:
+            raise ValueError(f"Operands may have at most {self.max_operand_bits} bits")
+        return value
+
+    def check_product_bits(self, bits: int, what: str = "multiply result") -> None:
+        if bits > self.max_result_bits:
+            raise ValueError(f"The {what} would exceed {self.max_result_bits} bits")
+
+    def check_int_operands(self, operation: str, numbers: Sequence[Any]) -> None:
+        """Guards of the default mode, where exact int products grow without bound"""
+        if operation == "multiply":
+            self.check_product_bits(sum(n.bit_length() for n in numbers if type(n) is int))
+        elif operation in ("sum_of_squares", "dot"):
+            if max((n.bit_length() for n in numbers if type(n) is int), default=0) > self.max_operand_bits:
+                raise ValueError(f"Operands may have at most {self.max_operand_bits} bits")
+
+    def check_string(self, value: str, fraction: bool) -> str:
+        digits = self.max_operand_digits
+        if fraction and _FRACTION_STRING.match(value):
+            numerator, _, denominator = value.partition("/")
+            if len(numerator.strip()) > digits or len(denominator.strip()) > digits:
+                raise ValueError(f"Operands may have at most {digits} digits")
+            return value
+        match = _NUMBER_STRING.match(value)
+        if match is None:
+            raise ValueError(f"'{value[:40]}' is not a number")
+        if len(match.group(1)) > digits + 1 or (match.group(2) is not None and abs(int(match.group(2))) > digits):
+            raise ValueError(f"Operands may have at most {digits} digits and exponents")
+        return value
+
+
+DEFAULT_LIMITS = Limits()
+
+
+class Arithmetic:
+    """Conversions and folds of one numeric mode (float, decimal or fraction)"""
+
+    def __init__(self, mode: str, precision: Optional[int] = None, limits: Limits = DEFAULT_LIMITS):
+        if mode not in (MODE_FLOAT, MODE_DECIMAL, MODE_FRACTION):
+            raise ValueError(f"Unknown mode: {mode}")
+        self.mode = mode
+        self.limits = limits
+        self.context: Optional[decimal.Context] = None
+        if mode == MODE_DECIMAL:
+            precision = DEFAULT_PRECISION if precision is None else precision
+            if not isinstance(precision, int) or not 1 <= precision <= limits.max_precision:
+                raise ValueError(f"precision must be an integer from 1 to {limits.max_precision}")
+            self.context = decimal.Context(prec=precision, traps=[decimal.InvalidOperation,
+                                                                  decimal.DivisionByZero, decimal.Overflow])
+        elif precision is not None:
+            raise ValueError("precision only applies to decimal mode")
+
+    # --- operands -------------------------------------------------------------
+
+    def convert(self, numbers: Sequence[Any]) -> List[Any]:
+        """Operands of this mode, rejecting values beyond the operand guards"""
+        if type(numbers) is not list:  # a decoded numbers_b64 payload
+            numbers = numbers.tolist() if hasattr(numbers, "tolist") else list(numbers)
+        if self.mode == MODE_FLOAT:
+            return self._to_floats(numbers)
+        convert = self._to_decimal if self.mode == MODE_DECIMAL else self._to_fraction
+        return [convert(value) for value in numbers]
+
+    def _to_floats(self, numbers: List[Any]) -> List[float]:
+        try:
+            values = list(map(float, numbers))
+        except OverflowError:
+            raise ValueError("Operands must be within the float64 range")
+        except ValueError:
+            raise ValueError(f"'{next(v for v in numbers if type(v) is str)[:40]}' is not a number")
+        if not all(map(math.isfinite, values)):
+            raise ValueError("Operands must be finite and within the float64 range")
+        return values
+
+    def _to_decimal(self, value: Any) -> decimal.Decimal:
+        kind = type(value)
+        if kind is int:
+            return decimal.Decimal(self.limits.check_int(value))
+        if kind is float:
+            if not math.isfinite(value):
+                raise ValueError("Operands must be finite")
+            return decimal.Decimal(repr(value))
+        return decimal.Decimal(self.limits.check_string(value, fraction=False))
+
+    def _to_fraction(self, value: Any) -> Fraction:
+        kind = type(value)
+        if kind is int:
+            return Fraction(self.limits.check_int(value))
+        if kind is float:
+            if not math.isfinite(value):
+                raise ValueError("Operands must be finite")
+            # Parsed by decimal, which is several times faster than Fraction(str)
+            return Fraction(*decimal.Decimal(repr(value)).as_integer_ratio())
+        if "/" not in value:
+            return Fraction(*decimal.Decimal(self.limits.check_string(value, fraction=False)).as_integer_ratio())
+        result = Fraction(self.limits.check_string(value, fraction=True))
+        self.limits.check_int(result.numerator)
+        self.limits.check_int(result.denominator)
+        return result
+
+    def output(self, value: Any) -> Any:
+        """JSON form of a result: floats as numbers, exact values as strings"""
+        if self.mode == MODE_FLOAT:
+            return value
+        if self.mode == MODE_DECIMAL:
+            return str(self.context.plus(value))
+        try:
+            return str(value)
+        except ValueError:  # beyond sys.get_int_max_str_digits()
+            raise ValueError("The result has too many digits to return") from None
+
+    # --- folds ------------------------------------------------------------------
+
+    def fold(self, operation: str, values: List[Any]) -> Any:
+        if operation in ("min", "max"):
+            return (min if operation == "min" else max)(values)
+        if self.mode == MODE_FLOAT:
+            return self._fold_float(operation, values)
+        if self.mode == MODE_DECIMAL:
+            return self._fold_decimal(operation, values)
+        return self._fold_fraction(operation, values)
+
+    def dot(self, numbers: List[Any], vector: List[Any]) -> Any:
+        if len(numbers) != len(vector):
+            raise ValueError("vector must have one entry per column of numbers")
+        if self.mode == MODE_FLOAT:
+            return math.fsum(map(operator.mul, numbers, vector))
+        if self.mode == MODE_DECIMAL:
+            return self._exact_sum(map(_EXACT.multiply, numbers, vector))
+        return self._fraction_sum(list(map(operator.mul, numbers, vector)))
+
+    def _fold_float(self, operation: str, values: List[float]) -> float:
+        if operation == "add":
+            return math.fsum(values)
+        elif operation == "subtract":
+            return math.fsum(chain(values[:1], map(operator.neg, islice(values, 1, None))))
+        elif operation == "mean":
+            return math.fsum(values) / len(values)
+        elif operation == "sum_of_squares":
+            return math.fsum(map(operator.mul, values, values))
+        elif operation == "multiply":
+            return math.prod(values)
+        elif operation == "divide":
+            _check_divisors(values)
+            return reduce(operator.truediv, values)
+        raise ValueError(f"Unknown operation: {operation}")
+
+    def _exact_sum(self, terms: Any) -> decimal.Decimal:
+        with decimal.localcontext(_EXACT):
+            return sum(terms, decimal.Decimal(0))
+
+    def _fold_decimal(self, operation: str, values: List[decimal.Decimal]) -> decimal.Decimal:
+        context = self.context
+        if operation == "add":
+            return context.plus(self._exact_sum(values))
+        elif operation == "subtract":
+            return context.subtract(values[0], self._exact_sum(islice(values, 1, None)))
+        elif operation == "mean":
+            return context.divide(self._exact_sum(values), len(values))
+        elif operation == "sum_of_squares":
+            return context.plus(self._exact_sum(map(_EXACT.multiply, values, values)))
+        elif operation == "multiply":
+            return reduce(context.multiply, values)
+        elif operation == "divide":
+            _check_divisors(values)
+            return reduce(context.divide, values)
+        raise ValueError(f"Unknown operation: {operation}")
+
+    def _fraction_sum(self, values: List[Fraction]) -> Fraction:
+        return self._ratio_sum([value.numerator for value in values], [value.denominator for value in values])
+
+    def _fold_fraction(self, operation: str, values: List[Fraction]) -> Fraction:
+        if operation == "add":
+            return self._fraction_sum(values)
+        elif operation == "subtract":
+            return values[0] - self._fraction_sum(values[1:])
+        elif operation == "mean":
+            return self._fraction_sum(values) / len(values)
+        elif operation == "sum_of_squares":
+            return self._ratio_sum([v.numerator * v.numerator for v in values],
+                                   [v.denominator * v.denominator for v in values])
+        elif operation in ("multiply", "divide"):
+            self.limits.check_product_bits(sum(v.numerator.bit_length() + v.denominator.bit_length() for v in values))
+            if operation == "divide":
+                _check_divisors(values)
+                # a / b / c == (a.numerator * b.denominator * c.denominator) / (a.denominator * b.numerator * ...)
+                rest = values[1:]
+                numerator = values[0].numerator * math.prod(v.denominator for v in rest)
+                denominator = values[0].denominator * math.prod(v.numerator for v in rest)
+            else:
+                numerator = math.prod(v.numerator for v in values)
+                denominator = math.prod(v.denominator for v in values)
+            return Fraction(numerator, denominator)
+        raise ValueError(f"Unknown operation: {operation}")
+
+    def _ratio_sum(self, numerators: List[int], denominators: List[int]) -> Fraction:
+        distinct = set(denominators)
+        if len(distinct) == 1:
+            return Fraction(sum(numerators), denominators[0])
+        # The common denominator divides the product of the distinct ones
+        self.limits.check_product_bits(sum(d.bit_length() for d in distinct), "common denominator")
+        common = reduce(lambda a, b: a // math.gcd(a, b) * b, distinct, 1)
+        return Fraction(sum(n * (common // d) for n, d in zip(numerators, denominators)), common)
+
+
+def _check_divisors(values: Sequence[Any]) -> None:
+    if any(value == 0 for value in islice(values, 1, None)):
+        raise ValueError("Division by zero is not allowed")
+
@@ -0,0 +1,318 @@
+"""
+Tool plugins for the MCP server.
+A plugin is a Python module declaring its tools in a module-level MANIFEST:
+a dict literal (or a list of them) with the tool's "name", "description"
+and "parameters" schema, the module attribute holding the tool ("tool": a
+class, instantiated without arguments, or an instance), and optionally
+"deterministic": true to let the result cache serve it and "timeout": the
+seconds a call may take (see executor.py).
+
+Manifests are read from the module's source with `ast`, without executing
+it, so discovering a plugin costs neither import time nor memory: the
+registry holds a PluginTool built from the manifest, and the module (with
+its dependencies) is only imported the first time one of its tools is
+called. How a tool runs (its `execution` kind) is taken from the loaded
+tool. PluginTools pickle to their manifest and source, so process pool
+workers import the module themselves.
+
+Plugins are discovered in two places:
+- MCP_PLUGINS_DIR: every `*.py` file not starting with "_". The directory
+  is rescanned every MCP_PLUGINS_POLL_SECONDS (default 2, 0 disables):
+  new files are registered, changed files re-registered (their module is
+  imported again on the next call and their cached results dropped) and
+  removed files unregistered, without restarting the server or its workers.
+- The "mcp_server.tools" entry point group, when MCP_PLUGIN_ENTRY_POINTS=1,
+  read once at startup. An entry point names a module (and optionally the
+  tool attribute); modules without a MANIFEST are imported right away.
+
+Each scan applies all of its changes to the registry at once, so clients
+see one new catalog version per scan. A tool name already provided by
+another source is not replaced.
+"""
+
+import ast
+import asyncio
+import importlib
+import importlib.util
+import os
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+ENTRY_POINT_GROUP = "mcp_server.tools"
+MANIFEST_NAME = "MANIFEST"
+MODULE_PREFIX = "mcp_plugin_"
+DEFAULT_PARAMETERS = {"type": "object", "properties": {}}
+
+# source -> (version, module) and (source, attribute) -> (version, tool), per process
+_modules: Dict[str, Tuple[Any, Any]] = {}
+_tools: Dict[Tuple[str, str], Tuple[Any, Any]] = {}
+_load_lock = threading.Lock()
+
+
+class PluginError(Exception):
+    """A plugin module whose manifest cannot be read"""
+
+
+def _manifest(entry: Any, source: str) -> Dict[str, Any]:
+    if not isinstance(entry, dict):
+        raise PluginError(f"{source}: {MANIFEST_NAME} entries must be dicts")
+    for key in ("name", "tool"):
+        if not isinstance(entry.get(key), str) or not entry[key]:
+            raise PluginError(f"{source}: {MANIFEST_NAME} entry needs a '{key}' string")
+    parameters = entry.get("parameters", DEFAULT_PARAMETERS)
+    if not isinstance(parameters, dict):
+        raise PluginError(f"{source}: parameters of tool '{entry['name']}' must be a dict")
+    timeout = entry.get("timeout")
+    if timeout is not None and (type(timeout) not in (int, float) or not timeout > 0):
+        raise PluginError(f"{source}: timeout of tool '{entry['name']}' must be a positive number of seconds")
+    return {
+        "name": entry["name"],
+        "tool": entry["tool"],
+        "description": str(entry.get("description", "")),
+        "parameters": parameters,
+        "deterministic": entry.get("deterministic") is True,
+        "timeout": timeout
+    }
+
+
+def read_manifests(path: str) -> Optional[List[Dict[str, Any]]]:
+    """The MANIFEST entries of a module's source, or None if it declares none"""
+    try:
+        with open(path, "rb") as source:
+            tree = ast.parse(source.read(), filename=path)
+    except (OSError, SyntaxError, ValueError) as e:
+        raise PluginError(f"{path}: {e}")
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+                isinstance(target, ast.Name) and target.id == MANIFEST_NAME for target in node.targets):
+            try:
+                value = ast.literal_eval(node.value)
+            except ValueError:
+                raise PluginError(f"{path}: {MANIFEST_NAME} must be a literal")
+            entries = value if isinstance(value, list) else [value]
+            return [_manifest(entry, path) for entry in entries]
+    return None
+
+
+def _import(source: str, module_name: str, version: Any, from_file: bool) -> Any:
+    cached = _modules.get(source)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    if from_file:
+        spec = importlib.util.spec_from_file_location(module_name, source)
+        module = importlib.util.module_from_spec(spec)
+        # Registered so the module's classes can be pickled by name
+        sys.modules[module_name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            sys.modules.pop(module_name, None)
+            raise
+    else:
+        module = importlib.import_module(source)
+    _modules[source] = (version, module)
+    return module
+
+
+def unload(source: str, module_name: str) -> None:
+    """Forget a plugin module and its tools in this process"""
+    with _load_lock:
+        _modules.pop(source, None)
+        for key in [key for key in _tools if key[0] == source]:
+            del _tools[key]
+        if module_name.startswith(MODULE_PREFIX):
+            sys.modules.pop(module_name, None)
+
+
+class PluginTool:
+    """Registry entry for a plugin tool; imports the plugin on first use"""
+
+    def __init__(self, manifest: Dict[str, Any], source: str, module_name: str, version: Any = None,
+                 from_file: bool = True):
+        self.name = manifest["name"]
+        self.description = manifest["description"]
+        self.parameters = manifest["parameters"]
+        self.deterministic = manifest["deterministic"]
+        self.timeout = manifest.get("timeout")
+        self.attribute = manifest["tool"]
+        self.source = source
+        self.module_name = module_name
+        self.version = version
+        self.from_file = from_file
+
+    @property
+    def loaded(self) -> bool:
+        cached = _tools.get((self.source, self.attribute))
+        return cached is not None and cached[0] == self.version
+
+    def load(self) -> Any:
+        """The tool object, importing the plugin module if this process has not yet"""
+        key = (self.source, self.attribute)
+        cached = _tools.get(key)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        with _load_lock:
+            cached = _tools.get(key)
+            if cached is not None and cached[0] == self.version:
+                return cached[1]
+            module = _import(self.source, self.module_name, self.version, self.from_file)
+            target = getattr(module, self.attribute, None)
+            if target is None:
+                raise PluginError(f"Plugin {self.source} has no attribute '{self.attribute}'")
+            tool = target() if isinstance(target, type) else target
+            _tools[key] = (self.version, tool)
+        logger.info(f"Loaded plugin tool '{self.name}' from {self.source}")
+        return tool
+
+    def execution_for(self, params: Dict[str, Any]) -> str:
+        tool = self.load()
+        if asyncio.iscoroutinefunction(tool.execute):
+            return "async"
+        execution_for = getattr(tool, "execution_for", None)
+        return execution_for(params) if execution_for is not None else getattr(tool, "execution", "io")
+
+    def validate(self, params: Dict[str, Any]) -> None:
+        # Requests are validated on the event loop, where importing the plugin
+        # would stall the server: until the executor has loaded it off-loop,
+        # only the manifest schema applies (see BatchExecutor.call)
+        if not self.loaded:
+            return
+        validate = getattr(self.load(), "validate", None)
+        if callable(validate):
+            validate(params)
+
+    def execute(self, params: Dict[str, Any]) -> Any:
+        return self.load().execute(params)
+
+
+class PluginManager:
+    """Discovers plugin tools and keeps the registry in step with the plugins directory"""
+
+    def __init__(self, registry: Any, cache: Optional[Any] = None, directory: Optional[str] = None):
+        self.registry = registry
+        self.cache = cache
+        self.directory = directory
+        # path -> (mtime, size) stamp and the names of the tools it provides
+        self._files: Dict[str, Tuple[Tuple[int, int], List[str]]] = {}
+        self._scan_lock = threading.Lock()
+
+    def load_entry_points(self, group: str = ENTRY_POINT_GROUP) -> List[str]:
+        """Register the tools of installed packages' entry points"""
+        from importlib.metadata import entry_points
+
+        found = entry_points()
+        # Python 3.9 returns a dict of groups
+        found = found.get(group, []) if isinstance(found, dict) else found.select(group=group)
+        tools = []
+        for entry_point in found:
+            module_name, _, attribute = entry_point.value.partition(":")
+            module_name, attribute = module_name.strip(), attribute.strip()
+            dist = getattr(entry_point, "dist", None)
+            version = getattr(dist, "version", None)
+            try:
+                spec = importlib.util.find_spec(module_name)
+                origin = spec.origin if spec is not None else None
+                manifests = read_manifests(origin) if origin and origin.endswith(".py") else None
+                if manifests is None:
+                    logger.warning(f"Entry point '{entry_point.name}' has no {MANIFEST_NAME}; importing it now")
+                    tool = entry_point.load()
+                    tools.append(tool() if isinstance(tool, type) else tool)
+                    continue
+                tools.extend(PluginTool(manifest, module_name, module_name, version, from_file=False)
+                             for manifest in manifests if not attribute or manifest["tool"] == attribute)
+            except Exception as e:
+                logger.warning(f"Skipping tool entry point '{entry_point.name}': {e}")
+        names = self._apply(self._unclaimed(tools), [])
+        if names:
+            logger.info(f"Registered {len(names)} tool(s) from entry points: {', '.join(names)}")
+        return names
+
+    def _unclaimed(self, tools: List[Any], replacing: Tuple[str, ...] = ()) -> List[Any]:
+        kept, seen = [], set()
+        for tool in tools:
+            if (tool.name in self.registry and tool.name not in replacing) or tool.name in seen:
+                logger.warning(f"Tool '{tool.name}' is already registered; ignoring the plugin's")
+                continue
+            seen.add(tool.name)
+            kept.append(tool)
+        return kept
+
+    def _apply(self, register: List[Any], unregister: List[str]) -> List[str]:
+        changed = set(unregister) | {tool.name for tool in register}
+        for name in changed:
+            previous = self.registry.get(name)
+            if isinstance(previous, PluginTool):
+                # A re-registered tool's module is imported afresh on its next call
+                unload(previous.source, previous.module_name)
+        self.registry.update(register=register, unregister=unregister)
+        if self.cache is not None:
+            for name in changed:
+                self.cache.clear(name)
+        return [tool.name for tool in register]
+
+    def _plugin_files(self) -> Dict[str, Tuple[int, int]]:
+        files = {}
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return files
+        for entry in entries:
+            if entry.name.endswith(".py") and not entry.name.startswith("_") and entry.is_file():
+                stat = entry.stat()
+                files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def scan(self) -> Dict[str, List[str]]:
+        """Bring the registry in line with the plugins directory; returns the tool names changed"""
+        changes: Dict[str, List[str]] = {"added": [], "updated": [], "removed": []}
+        if not self.directory:
+            return changes
+        with self._scan_lock:
+            files = self._plugin_files()
+            register: List[Any] = []
+            unregister: List[str] = []
+            for path in [path for path in self._files if path not in files]:
+                unregister.extend(self._files.pop(path)[1])
+                logger.info(f"Plugin {path} was removed")
+            for path, stamp in files.items():
+                previous = self._files.get(path)
+                if previous is not None and previous[0] == stamp:
+                    continue
+                old_names = previous[1] if previous is not None else []
+                try:
+                    manifests = read_manifests(path)
+                    if manifests is None:
+                        raise PluginError(f"{path}: no {MANIFEST_NAME} found")
+                except PluginError as e:
+                    # Keep serving the last good version until the file is fixed
+                    logger.warning(f"Skipping plugin: {e}")
+                    self._files[path] = (stamp, old_names)
+                    continue
+                module_name = MODULE_PREFIX + os.path.splitext(os.path.basename(path))[0]
+                tools = self._unclaimed(
+                    [PluginTool(manifest, path, module_name, stamp) for manifest in manifests],
+                    replacing=tuple(old_names) + tuple(unregister)
+                )
+                names = [tool.name for tool in tools]
+                unregister.extend(name for name in old_names if name not in names)
+                register.extend(tools)
+                changes["updated" if previous is not None else "added"].extend(names)
+                self._files[path] = (stamp, names)
+            changes["removed"] = [name for name in unregister if name not in {t.name for t in register}]
+            if register or unregister:
+                self._apply(register, unregister)
+                logger.info(f"Plugins rescanned (catalog version {self.registry.version}): "
+                            + ", ".join(f"{kind} {names}" for kind, names in changes.items() if names))
+        return changes
+
+    async def watch(self, interval: float) -> None:
+        """Rescan the plugins directory every `interval` seconds"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.scan)
+            except Exception as e:
+                logger.exception(f"Error rescanning plugins: {e}")
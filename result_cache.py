@@ -0,0 +1,222 @@
+"""
+Result cache for deterministic tool calls.
+Tools opt in by declaring `deterministic = True`: their result depends only
+on the parameters and calling them has no side effects. Calls to such tools
+are keyed by the tool name and a hash of the canonically encoded parameters
+(keys sorted, compact separators), so the same call always maps to the same
+entry however its JSON object was ordered.
+
+Entries are kept in LRU order and bounded three ways: at most
+MCP_RESULT_CACHE_SIZE entries (0, the default, disables the cache), at most
+MCP_RESULT_CACHE_BYTES of encoded results, and at most MCP_RESULT_CACHE_TTL
+seconds old (0 keeps entries until they are evicted). Failed calls are never
+cached.
+
+Concurrent identical calls are coalesced: the first one computes the result
+in a task of its own and every later caller awaits that same task, so a
+result is computed once however many requests ask for it at the same time.
+Cancelling one caller (e.g. a fail_fast batch) does not cancel the shared
+computation for the others; once every caller has been cancelled, the
+computation is cancelled too, which stops its worker (see executor.py).
+Each caller waits under its own timeout, so a caller that joins a running
+computation still gives up at its own deadline.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional speed-up
+    orjson = None
+
+DEFAULT_MAX_ENTRIES = 0
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL = 300.0
+
+Key = Tuple[str, bytes]
+
+
+def _canonical(params: Any) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(params, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits
+    return json.dumps(params, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def _size(result: Any) -> int:
+    if orjson is not None:
+        try:
+            return len(orjson.dumps(result))
+        except TypeError:
+            pass
+    return len(json.dumps(result, separators=(",", ":")))
+
+
+def is_deterministic(tool: Any) -> bool:
+    return getattr(tool, "deterministic", False) is True
+
+
+class _Entry:
+    __slots__ = ("result", "size", "expires")
+
+    def __init__(self, result: Any, size: int, expires: float):
+        self.result = result
+        self.size = size
+        self.expires = expires
+
+
+class ResultCache:
+    """Bounded LRU/TTL store of tool results with single-flight computation"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl: float = DEFAULT_TTL):
+        self.max_entries = max(0, max_entries)
+        self.max_bytes = max(0, max_bytes)
+        self.ttl = ttl
+        self._entries: "OrderedDict[Key, _Entry]" = OrderedDict()
+        self._in_flight: Dict[Key, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.uncacheable = 0
+
+    @classmethod
+    def from_config(cls, config: Any) -> "ResultCache":
+        return cls(max_entries=config.result_cache_size, max_bytes=config.result_cache_bytes,
+                   ttl=config.result_cache_ttl)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    @staticmethod
+    def key(tool_name: str, params: Any) -> Key:
+        return tool_name, hashlib.blake2b(_canonical(params), digest_size=16).digest()
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """(True, result) for a fresh entry, marking it used; else (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry.expires and time.monotonic() > entry.expires:
+                self._drop_locked(key)
+                self.expirations += 1
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry.result
+
+    def put(self, key: Hashable, result: Any) -> bool:
+        """Store a result; False if it alone exceeds the byte budget"""
+        size = _size(result)
+        with self._lock:
+            if size > self.max_bytes:
+                self.uncacheable += 1
+                return False
+            if key in self._entries:
+                self._drop_locked(key)
+            expires = time.monotonic() + self.ttl if self.ttl > 0 else 0.0
+            self._entries[key] = _Entry(result, size, expires)
+            self.bytes += size
+            # Oldest first, until both the entry and the byte budget fit
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._drop_locked(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def _drop_locked(self, key: Hashable) -> None:
+        self.bytes -= self._entries.pop(key).size
+
+    def clear(self, tool_name: Optional[str] = None) -> None:
+        """Drop every entry, or only the entries of one tool"""
+        with self._lock:
+            if tool_name is None:
+                self._entries.clear()
+                self.bytes = 0
+                return
+            for key in [key for key in self._entries if key[0] == tool_name]:
+                self._drop_locked(key)
+
+    async def get_or_compute(self, tool_name: str, params: Any, compute: Callable[[], Awaitable[Any]],
+                             timeout: Optional[float] = None) -> Any:
+        """The cached result of a call, computing it (once) on a miss.
+
+        `timeout` (seconds) bounds this caller's wait only: the shared
+        computation runs until its last caller gives up, so each caller
+        keeps its own deadline. Raises asyncio.TimeoutError when it passes.
+        """
+        try:
+            key = self.key(tool_name, params)
+        except (TypeError, ValueError):
+            # Not JSON-encodable, so it has no canonical key
+            return await asyncio.wait_for(compute(), timeout)
+
+        found, result = self.get(key)
+        if found:
+            with self._lock:
+                self.hits += 1
+            return result
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._in_flight.get(key)
+            # Tasks cannot be awaited across event loops (dual mode runs two)
+            if task is not None and task.get_loop() is loop:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                task = loop.create_task(compute())
+                self._in_flight[key] = task
+                task.add_done_callback(lambda done: self._finish(key, done))
+            self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        finally:
+            with self._lock:
+                waiters = self._waiters.pop(task) - 1
+                if waiters:
+                    self._waiters[task] = waiters
+            if not waiters and not task.done():
+                # Every caller was cancelled: nobody needs the result any more
+                task.cancel()
+
+    def _finish(self, key: Key, task: asyncio.Task) -> None:
+        with self._lock:
+            if self._in_flight.get(key) is task:
+                del self._in_flight[key]
+        # Reading the exception also marks it retrieved when every caller left
+        if not task.cancelled() and task.exception() is None:
+            self.put(key, task.result())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.coalesced + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "in_flight": len(self._in_flight),
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_ratio": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "uncacheable": self.uncacheable
+            }
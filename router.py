@@ -0,0 +1,139 @@
+"""
+JSON-RPC method router for the MCP server.
+Every transport (POST / and /mcp, both WebSockets, stdio) hands decoded
+messages to one Router, which looks the method up in a dict, checks that the
+session is initialized and runs the handler through the middleware chain.
+
+Handlers are registered with `@router.method(name)` and receive the parsed
+jsonrpc.Request and a Context; they return the result or raise
+jsonrpc.JsonRpcError. Middleware registered with `router.use(middleware)`
+wraps every handler call as `await middleware(request, context, call_next)`,
+which is the place for cross-cutting concerns such as timing, caching or
+auth. The chain is composed once when a handler or middleware is added.
+
+Requests with an id are registered in their session while they are handled,
+so `Session.cancel(id)` can cancel one; it is then answered with a
+-32800 Request cancelled error. A request without an id is a notification:
+it is handled but never answered, alone or inside a batch, unless it is not a
+valid request at all.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+import jsonrpc
+from sessions import Session
+
+Handler = Callable[[jsonrpc.Request, "Context"], Awaitable[Any]]
+Middleware = Callable[[jsonrpc.Request, "Context", Handler], Awaitable[Any]]
+
+
+class Context:
+    """Per-message context: the client's session and the transport it used.
+
+    `notify`, when the transport can send messages before the response
+    (WebSockets, stdio, a streamed HTTP response), sends a notification to
+    the client.
+    """
+
+    __slots__ = ("session", "transport", "notify")
+
+    def __init__(self, session: Session, transport: str,
+                 notify: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None):
+        self.session = session
+        self.transport = transport
+        self.notify = notify
+
+
+class Route:
+    __slots__ = ("name", "handler", "requires_init", "call")
+
+    def __init__(self, name: str, handler: Handler, requires_init: bool):
+        self.name = name
+        self.handler = handler
+        self.requires_init = requires_init
+        self.call = handler
+
+
+def _chain(middleware: Middleware, call_next: Handler) -> Handler:
+    async def call(request: jsonrpc.Request, context: Context) -> Any:
+        return await middleware(request, context, call_next)
+    return call
+
+
+class Router:
+    """Dispatch table from method name to handler, shared by all transports"""
+
+    def __init__(self):
+        self._routes: Dict[str, Route] = {}
+        self._middleware: List[Middleware] = []
+
+    def method(self, name: str, requires_init: bool = True) -> Callable[[Handler], Handler]:
+        """Register the decorated coroutine as the handler for `name`"""
+        def register(handler: Handler) -> Handler:
+            route = Route(name, handler, requires_init)
+            route.call = self._wrap(handler)
+            self._routes[name] = route
+            return handler
+        return register
+
+    def use(self, middleware: Middleware) -> None:
+        """Add a middleware; the first one added is the outermost"""
+        self._middleware.append(middleware)
+        for route in self._routes.values():
+            route.call = self._wrap(route.handler)
+
+    def _wrap(self, handler: Handler) -> Handler:
+        call = handler
+        for middleware in reversed(self._middleware):
+            call = _chain(middleware, call)
+        return call
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._routes
+
+    async def dispatch(self, data: Any, context: Context) -> Optional[Dict[str, Any]]:
+        """Handle one request and return its response (None for a notification)"""
+        try:
+            request = jsonrpc.parse_request(data)
+        except jsonrpc.JsonRpcError as e:
+            return jsonrpc.error_response(e.code, e.message, None, e.data)
+        response = await self._respond(request, context)
+        return None if jsonrpc.is_notification(data) else response
+
+    async def _respond(self, request: jsonrpc.Request, context: Context) -> Dict[str, Any]:
+        route = self._routes.get(request.method)
+        if (route is None or route.requires_init) and not context.session.initialized:
+            return jsonrpc.error_response(jsonrpc.SERVER_NOT_INITIALIZED, "Server not initialized", request.id)
+        if route is None:
+            return jsonrpc.error_response(
+                jsonrpc.METHOD_NOT_FOUND, f"Method '{request.method}' not found", request.id
+            )
+
+        session, task = context.session, None
+        if request.id is not None:
+            task = asyncio.current_task()
+            session.requests[request.id] = task
+        try:
+            result = await route.call(request, context)
+        except jsonrpc.JsonRpcError as e:
+            return jsonrpc.error_response(e.code, e.message, request.id, e.data)
+        except asyncio.CancelledError:
+            if task is None or request.id not in session.cancelled:
+                raise  # The transport is going away, not a cancel request
+            if hasattr(task, "uncancel"):  # Python 3.11+
+                task.uncancel()
+            return jsonrpc.error_response(jsonrpc.REQUEST_CANCELLED, "Request cancelled", request.id)
+        except Exception as e:
+            return jsonrpc.error_response(jsonrpc.INTERNAL_ERROR, "Internal error", request.id, str(e))
+        finally:
+            if task is not None and session.requests.get(request.id) is task:
+                del session.requests[request.id]
+                session.cancelled.discard(request.id)
+        return jsonrpc.result_response(result, request.id)
+
+    async def handle(self, data: Any, context: Context) -> Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        """Handle a request or a batch; None when a batch needs no response"""
+        if isinstance(data, list):
+            return await jsonrpc.dispatch_batch(data, lambda member: self.dispatch(member, context))
+        return await self.dispatch(data, context)
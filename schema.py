@@ -0,0 +1,377 @@
+"""
+JSON Schema validation of tool parameters.
+`compile_schema` turns a tool's `parameters` schema into a tree of closures
+once, when the tool is registered, so validating a call walks no schema
+dicts and looks up no keywords. The supported keywords are the ones tool
+schemas use: type, enum, const, minimum, maximum, exclusiveMinimum,
+exclusiveMaximum, minLength, maxLength, pattern, items, minItems, maxItems,
+properties, required, additionalProperties, anyOf, allOf and oneOf. Other
+keywords (description, default, contentEncoding, ...) are annotations and
+are ignored.
+
+Values are checked by exact Python type as decoded from JSON, so booleans
+are not numbers. Every compiled node knows which types it accepts with no
+further checks; an array whose elements all have such types is accepted
+after one pass of `set(map(type, items))`, so an array of 100k numbers costs
+a few milliseconds, not one Python call per element. Arrays of arrays (a
+batch of rows) are settled the same way over all their elements at once.
+anyOf and oneOf pick their candidate branches by the value's type before
+trying them.
+
+A failed check raises ValidationError with the JSON Pointer of the offending
+value, e.g. "/numbers/3".
+"""
+
+import re
+from itertools import chain
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+NoneType = type(None)
+_ALL_TYPES = frozenset((str, int, float, bool, list, dict, NoneType))
+_TYPES = {
+    "string": frozenset((str,)),
+    "integer": frozenset((int, float)),  # integral floats such as 1.0 are integers
+    "number": frozenset((int, float)),
+    "boolean": frozenset((bool,)),
+    "array": frozenset((list,)),
+    "object": frozenset((dict,)),
+    "null": frozenset((NoneType,))
+}
+_JSON_NAMES = {str: "string", int: "integer", float: "number", bool: "boolean", list: "array", dict: "object",
+               NoneType: "null"}
+_NUMBERS = frozenset((int, float))
+
+Check = Callable[[Any], None]
+# Tells whether every value of a list is valid, without raising; False means
+# "not proven", after which the values are checked one by one
+Batch = Callable[[List[Any]], bool]
+
+
+class ValidationError(ValueError):
+    """A value that does not match its schema, with the path to it"""
+
+    def __init__(self, message: str, path: Optional[List[Any]] = None):
+        super().__init__(message)
+        self.message = message
+        self.path = path if path is not None else []
+
+    @property
+    def pointer(self) -> str:
+        """JSON Pointer (RFC 6901) of the offending value"""
+        return "".join("/" + str(part).replace("~", "~0").replace("/", "~1") for part in self.path)
+
+    def __str__(self) -> str:
+        return f"{self.pointer or '/'}: {self.message}"
+
+
+class _Node:
+    """A compiled schema: `check` raises on mismatch; values of a type in
+    `accepts` always pass; values of a type not in `possible` never do;
+    `batch`, if any, validates many values at once"""
+
+    __slots__ = ("check", "accepts", "possible", "names", "batch")
+
+    def __init__(self, check: Check, accepts: FrozenSet[type], possible: FrozenSet[type], names: str,
+                 batch: Optional[Batch] = None):
+        self.check = check
+        self.accepts = accepts
+        self.possible = possible
+        self.names = names
+        self.batch = batch
+
+
+def _type_name(value: Any) -> str:
+    return _JSON_NAMES.get(type(value), type(value).__name__)
+
+
+def _within(path_part: Any, check: Check, value: Any) -> None:
+    try:
+        check(value)
+    except ValidationError as e:
+        e.path.insert(0, path_part)
+        raise
+
+
+def _enum_key(value: Any) -> Any:
+    # Keeps True apart from 1 and 1.0 apart from True, as JSON does
+    kind = bool if isinstance(value, bool) else (float if type(value) in _NUMBERS else type(value))
+    return kind, value
+
+
+def _check_all(checks: Tuple[Check, ...]) -> Check:
+    if len(checks) == 1:
+        return checks[0]
+
+    def check(value: Any) -> None:
+        for each in checks:
+            each(value)
+    return check
+
+
+def _compile_type(schema: Dict[str, Any]) -> Tuple[Optional[Check], FrozenSet[type], FrozenSet[type], str]:
+    """The type check, the types it lets through, those it needs no more checks for, and their names"""
+    declared = schema.get("type")
+    if declared is None:
+        return None, _ALL_TYPES, _ALL_TYPES, "any"
+    names = [declared] if isinstance(declared, str) else list(declared)
+    allowed = frozenset().union(*(_TYPES[name] for name in names if name in _TYPES))
+    integer_only = "integer" in names and "number" not in names
+    expected = " or ".join(names)
+
+    def check(value: Any) -> None:
+        kind = type(value)
+        if kind not in allowed:
+            raise ValidationError(f"expected {expected}, got {_type_name(value)}")
+        if integer_only and kind is float and not value.is_integer():
+            raise ValidationError(f"expected {expected}, got number")
+    return check, allowed, allowed - {float} if integer_only else allowed, expected
+
+
+def _compile_numeric(schema: Dict[str, Any]) -> Optional[Check]:
+    bounds = []
+    for keyword, fails, relation in (("minimum", lambda v, b: v < b, ">="),
+                                     ("maximum", lambda v, b: v > b, "<="),
+                                     ("exclusiveMinimum", lambda v, b: v <= b, ">"),
+                                     ("exclusiveMaximum", lambda v, b: v >= b, "<")):
+        if type(schema.get(keyword)) in _NUMBERS:
+            bounds.append((fails, schema[keyword], relation))
+    if not bounds:
+        return None
+
+    def check(value: Any) -> None:
+        if type(value) in _NUMBERS:
+            for fails, bound, relation in bounds:
+                if fails(value, bound):
+                    raise ValidationError(f"must be {relation} {bound}")
+    return check
+
+
+def _compile_string(schema: Dict[str, Any]) -> Optional[Check]:
+    min_length, max_length = schema.get("minLength"), schema.get("maxLength")
+    pattern = re.compile(schema["pattern"]) if isinstance(schema.get("pattern"), str) else None
+    if min_length is None and max_length is None and pattern is None:
+        return None
+
+    def check(value: Any) -> None:
+        if type(value) is str:
+            if min_length is not None and len(value) < min_length:
+                raise ValidationError(f"must be at least {min_length} characters long")
+            if max_length is not None and len(value) > max_length:
+                raise ValidationError(f"must be at most {max_length} characters long")
+            if pattern is not None and not pattern.search(value):
+                raise ValidationError(f"must match pattern {pattern.pattern!r}")
+    return check
+
+
+def _compile_array(schema: Dict[str, Any]) -> Tuple[Optional[Check], Optional[Batch]]:
+    min_items, max_items = schema.get("minItems"), schema.get("maxItems")
+    items = _compile(schema["items"]) if isinstance(schema.get("items"), dict) else None
+    if min_items is None and max_items is None and items is None:
+        return None, None
+    item_check = items.check if items is not None else None
+    item_batch = items.batch if items is not None else None
+    accepts = items.accepts if items is not None else _ALL_TYPES
+
+    def check(value: Any) -> None:
+        if type(value) is not list:
+            return
+        if min_items is not None and len(value) < min_items:
+            raise ValidationError(f"must have at least {min_items} item(s), got {len(value)}")
+        if max_items is not None and len(value) > max_items:
+            raise ValidationError(f"must have at most {max_items} item(s), got {len(value)}")
+        # One C-level pass settles arrays whose element types need no checks
+        if item_check is None or set(map(type, value)) <= accepts:
+            return
+        if item_batch is not None and item_batch(value):
+            return
+        for index, item in enumerate(value):
+            if type(item) not in accepts:
+                _within(index, item_check, item)
+
+    def batch(values: List[Any]) -> bool:
+        if not values:
+            return True
+        if set(map(type, values)) != {list}:
+            return False
+        lengths = list(map(len, values))
+        if min_items is not None and min(lengths) < min_items:
+            return False
+        if max_items is not None and max(lengths) > max_items:
+            return False
+        if item_check is None:
+            return True
+        flat = list(chain.from_iterable(values))
+        return set(map(type, flat)) <= accepts or (item_batch is not None and item_batch(flat))
+    return check, batch
+
+
+def _compile_object(schema: Dict[str, Any]) -> Optional[Check]:
+    properties = {name: _compile(sub).check for name, sub in (schema.get("properties") or {}).items()
+                  if isinstance(sub, dict)}
+    required = tuple(schema.get("required") or ())
+    additional = schema.get("additionalProperties", True)
+    additional_check = _compile(additional).check if isinstance(additional, dict) else None
+    if not properties and not required and additional is True:
+        return None
+
+    def check(value: Any) -> None:
+        if type(value) is not dict:
+            return
+        for name in required:
+            if name not in value:
+                raise ValidationError(f"missing required property '{name}'")
+        for name, item in value.items():
+            property_check = properties.get(name)
+            if property_check is not None:
+                _within(name, property_check, item)
+            elif additional is False:
+                raise ValidationError(f"unexpected property '{name}'")
+            elif additional_check is not None:
+                _within(name, additional_check, item)
+    return check
+
+
+def _compile_combinations(schema: Dict[str, Any]) -> Tuple[List[Check], List[Optional[Batch]], FrozenSet[type],
+                                                           FrozenSet[type]]:
+    checks: List[Check] = []
+    batches: List[Optional[Batch]] = []
+    accepts, possible = _ALL_TYPES, _ALL_TYPES
+
+    for sub in schema.get("allOf") or ():
+        node = _compile(sub)
+        checks.append(node.check)
+        batches.append(None)
+        accepts, possible = accepts & node.accepts, possible & node.possible
+
+    for keyword in ("anyOf", "oneOf"):
+        branches = [_compile(sub) for sub in schema.get(keyword) or ()]
+        if not branches:
+            continue
+        one = keyword == "oneOf"
+        # For each type, the branches that can accept it at all
+        by_type = {kind: tuple(b for b in branches if kind in b.possible) for kind in _ALL_TYPES}
+        expected = " or ".join(dict.fromkeys(b.names for b in branches))
+
+        def check(value: Any, by_type=by_type, one=one, expected=expected) -> None:
+            candidates = by_type.get(type(value), ())
+            if not candidates:
+                raise ValidationError(f"expected {expected}, got {_type_name(value)}")
+            if len(candidates) == 1 and not one:
+                # Only one branch can match, so its error is the precise one
+                candidates[0].check(value)
+                return
+            errors, matched = [], 0
+            for branch in candidates:
+                try:
+                    branch.check(value)
+                except ValidationError as e:
+                    errors.append(e)
+                    continue
+                matched += 1
+                if not one:
+                    return
+            if matched == 1:
+                return
+            if matched > 1:
+                raise ValidationError(f"matches {matched} schemas, expected exactly one")
+            if len(errors) == 1:
+                raise errors[0]
+            reasons = "; ".join(str(e) if e.path else e.message for e in errors)
+            raise ValidationError(f"does not match any allowed schema ({reasons})")
+
+        branch_possible = frozenset().union(*(b.possible for b in branches))
+        branch_accepts = frozenset() if one else frozenset().union(*(b.accepts for b in branches))
+
+        def batch(values: List[Any], by_type=by_type, branch_accepts=branch_accepts) -> bool:
+            kinds = set(map(type, values))
+            for kind in kinds - branch_accepts:
+                candidates = by_type.get(kind, ())
+                if len(candidates) != 1 or candidates[0].batch is None:
+                    return False
+                subset = values if len(kinds) == 1 else [value for value in values if type(value) is kind]
+                if not candidates[0].batch(subset):
+                    return False
+            return True
+
+        checks.append(check)
+        batches.append(None if one else batch)
+        accepts, possible = accepts & branch_accepts, possible & branch_possible
+    return checks, batches, accepts, possible
+
+
+def _compile(schema: Dict[str, Any]) -> _Node:
+    type_check, possible, accepts, names = _compile_type(schema)
+    checks: List[Check] = [type_check] if type_check is not None else []
+    # The batch forms of the checks after the type check; None where there is none
+    batches: List[Optional[Batch]] = []
+    type_accepts = accepts
+
+    if "enum" in schema or "const" in schema:
+        values = list(schema["enum"]) if "enum" in schema else [schema["const"]]
+        try:
+            keys = frozenset(_enum_key(value) for value in values)
+            member = lambda value: _enum_key(value) in keys
+        except TypeError:  # unhashable members
+            member = lambda value: any(_enum_key(value) == _enum_key(v) and value == v for v in values)
+
+        def check_enum(value: Any) -> None:
+            try:
+                found = member(value)
+            except TypeError:
+                found = False
+            if not found:
+                raise ValidationError(f"must be one of {values}")
+        checks.append(check_enum)
+        batches.append(None)
+        accepts = frozenset()
+
+    for compile_keywords, constrained in ((_compile_numeric, _NUMBERS), (_compile_string, {str}),
+                                          (_compile_object, {dict})):
+        check = compile_keywords(schema)
+        if check is not None:
+            checks.append(check)
+            batches.append(None)
+            accepts = accepts - constrained
+    array_check, array_batch = _compile_array(schema)
+    if array_check is not None:
+        checks.append(array_check)
+        batches.append(array_batch)
+        accepts = accepts - {list}
+
+    combination_checks, combination_batches, combination_accepts, combination_possible = \
+        _compile_combinations(schema)
+    checks.extend(combination_checks)
+    batches.extend(combination_batches)
+    accepts, possible = accepts & combination_accepts, possible & combination_possible
+
+    if not checks:
+        return _Node(lambda value: None, accepts, possible, names)
+    batch = None
+    if batches and all(part is not None for part in batches):
+        parts = tuple(batches)
+
+        def batch(values: List[Any]) -> bool:
+            if type_check is not None and not set(map(type, values)) <= type_accepts:
+                return False
+            return all(part(values) for part in parts)
+    return _Node(_check_all(tuple(checks)), accepts, possible, names, batch)
+
+
+class Validator:
+    """A schema compiled once; calling it raises ValidationError on a mismatch"""
+
+    __slots__ = ("schema", "_check")
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self._check = _compile(schema).check
+
+    def __call__(self, value: Any) -> None:
+        self._check(value)
+
+
+def compile_schema(schema: Optional[Dict[str, Any]]) -> Optional[Validator]:
+    """Compile a tool's parameters schema, or None when there is nothing to check"""
+    if not isinstance(schema, dict) or not schema:
+        return None
+    return Validator(schema)
@@ -1,533 +1,68 @@
-from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
-from pydantic import BaseModel, Field
-from typing import Dict, Any, List, Optional, Union, Literal
-import json
-import sys
+"""
+Entry point of the MCP server: stdio mode, HTTP mode (uvicorn) or both.
+The transport-independent core lives in service.py and the FastAPI routes in
+http_app.py. `app` is imported from http_app on first access (`uvicorn
+server:app` still works), so running in stdio mode never imports the web
+stack.
+"""
+
 import asyncio
-import threading
-import signal
+import importlib.util
 import os
-import logging
-from loguru import logger
-
-# Configure logging based on environment variables
-LOGGING_CONFIG = os.environ.get("LOGGING_CONFIG", "default")
-logger.remove()  # Remove default handlers
-
-# Create logs directory if it doesn't exist
-os.makedirs("logs", exist_ok=True)
-
-# Configure logging based on mode
-if os.environ.get("MCP_STDIO_MODE") == "1":
-    # Stdio mode logging - minimal output to stderr
-    logger.add(sys.stderr, level="INFO", format="{message}")
-    logger.add("logs/stdio-server.log", rotation="10 MB", level="DEBUG")
-    logger.info("Configuring logging for stdio mode")
-else:
-    # HTTP mode logging - more detailed output
-    logger.add(sys.stderr, level="INFO")
-    logger.add("logs/server.log", rotation="10 MB", level="DEBUG")
-    logger.info("Configuring logging for HTTP mode")
-
-# Log startup information
-logger.info("Initializing MCP Calculator Server")
-logger.debug(f"Python version: {sys.version}")
-logger.debug(f"Environment variables: MCP_STDIO_MODE={os.environ.get('MCP_STDIO_MODE')}, MCP_HTTP_MODE={os.environ.get('MCP_HTTP_MODE')}")
-
-try:
-    app = FastAPI()
-    
-    # Log FastAPI initialization
-    logger.info("FastAPI application initialized")
-except Exception as e:
-    logger.exception(f"Error initializing FastAPI application: {e}")
-    sys.exit(1)
-
-class CalculatorTool:
-    def __init__(self):
-        self.name = "calculator"
-        self.description = "A basic calculator that can perform arithmetic operations"
-        self.parameters = {
-            "type": "object",
-            "properties": {
-                "operation": {
-                    "type": "string",
-                    "enum": ["add", "subtract", "multiply", "divide"],
-                    "description": "The arithmetic operation to perform"
-                },
-                "numbers": {
-                    "type": "array",
-                    "items": {"type": "number"},
-                    "description": "List of numbers to perform the operation on",
-                    "minItems": 2
-                }
-            },
-            "required": ["operation", "numbers"]
-        }
-
-    def execute(self, params: Dict[str, Any]) -> Any:
-        operation = params["operation"]
-        numbers = params["numbers"]
-
-        if len(numbers) < 2:
-            raise ValueError("At least two numbers are required")
-
-        if operation == "add":
-            return sum(numbers)
-        elif operation == "subtract":
-            return numbers[0] - sum(numbers[1:])
-        elif operation == "multiply":
-            result = 1
-            for num in numbers:
-                result *= num
-            return result
-        elif operation == "divide":
-            if 0 in numbers[1:]:
-                raise ValueError("Division by zero is not allowed")
-            result = numbers[0]
-            for num in numbers[1:]:
-                result /= num
-            return result
-        else:
-            raise ValueError(f"Unknown operation: {operation}")
-
-# Initialize tools
-calculator = CalculatorTool()
-TOOLS = {
-    calculator.name: calculator
-}
-
-class JsonRpcRequest(BaseModel):
-    jsonrpc: Literal["2.0"]
-    method: str
-    params: Optional[Dict[str, Any]] = None
-    id: Optional[Union[int, str]] = None
-
-class JsonRpcResponse(BaseModel):
-    jsonrpc: Literal["2.0"] = "2.0"
-    result: Optional[Any] = None
-    error: Optional[Dict[str, Any]] = None
-    id: Optional[Union[int, str]] = None
-
-class MCPServerState:
-    def __init__(self):
-        self.initialized = False
-        self.client_info = None
-
-server_state = MCPServerState()
-
-# Auto-initialize the server in HTTP mode
-if os.environ.get("MCP_HTTP_MODE") == "1":
-    server_state.initialized = True
-    print("Auto-initializing server in HTTP mode", file=sys.stderr)
-
-# Standard REST endpoint for Smithery compatibility
-@app.get("/tools")
-async def get_tools():
-    """Standard REST endpoint to list available tools"""
-    # In HTTP mode, we don't require initialization for the /tools endpoint
-    tool_schemas = {}
-    for name, tool in TOOLS.items():
-        tool_schemas[name] = {
-            "name": tool.name,
-            "description": tool.description,
-            "parameters": tool.parameters
-        }
-    return tool_schemas
-
-@app.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy"}
-
-# Helper function to process JSON-RPC requests
-async def process_jsonrpc_request(request_data: Dict[str, Any]) -> Dict[str, Any]:
-    try:
-        request_model = JsonRpcRequest(**request_data)
-    except Exception as e:
-        return JsonRpcResponse(
-            error={
-                "code": -32700,
-                "message": "Parse error",
-                "data": str(e)
-            },
-            id=None
-        ).dict()
-
-    if request_model.method == "initialize" and not server_state.initialized:
-        server_state.initialized = True
-        server_state.client_info = request_model.params
-        
-        # Build tool capabilities
-        tool_capabilities = {}
-        for name, tool in TOOLS.items():
-            tool_capabilities[name] = {
-                "name": tool.name,
-                "description": tool.description,
-                "parameters": tool.parameters
-            }
-        
-        return JsonRpcResponse(
-            result={
-                "name": "Python MCP Calculator Server",
-                "version": "1.0.0",
-                "capabilities": {
-                    "tools": tool_capabilities
-                }
-            },
-            id=request_model.id
-        ).dict()
-    
-    if not server_state.initialized:
-        return JsonRpcResponse(
-            error={
-                "code": -32002,
-                "message": "Server not initialized"
-            },
-            id=request_model.id
-        ).dict()
-
-    if request_model.method == "shutdown":
-        server_state.initialized = False
-        return JsonRpcResponse(result=None, id=request_model.id).dict()
-
-    if request_model.method == "list_tools":
-        # In HTTP mode, allow list_tools without initialization
-        if not server_state.initialized and os.environ.get("MCP_HTTP_MODE") != "1":
-            return JsonRpcResponse(
-                error={
-                    "code": -32002,
-                    "message": "Server not initialized"
-                },
-                id=request_model.id
-            ).dict()
-            
-        tool_schemas = {}
-        for name, tool in TOOLS.items():
-            tool_schemas[name] = {
-                "name": tool.name,
-                "description": tool.description,
-                "parameters": tool.parameters
-            }
-        return JsonRpcResponse(result=tool_schemas, id=request_model.id).dict()
-
-    if request_model.method == "execute":
-        # In HTTP mode, allow execute without initialization
-        if not server_state.initialized and os.environ.get("MCP_HTTP_MODE") != "1":
-            return JsonRpcResponse(
-                error={
-                    "code": -32002,
-                    "message": "Server not initialized"
-                },
-                id=request_model.id
-            ).dict()
-            
-        if not request_model.params or "function_calls" not in request_model.params:
-            return JsonRpcResponse(
-                error={
-                    "code": -32602,
-                    "message": "Invalid params: function_calls required"
-                },
-                id=request_model.id
-            ).dict()
-
-        results = []
-        for call in request_model.params["function_calls"]:
-            if call["name"] not in TOOLS:
-                results.append({
-                    "status": "error",
-                    "error": f"Tool '{call['name']}' not found"
-                })
-                continue
-
-            try:
-                tool = TOOLS[call["name"]]
-                result = tool.execute(call["parameters"])
-                results.append({
-                    "status": "success",
-                    "result": result
-                })
-            except Exception as e:
-                results.append({
-                    "status": "error",
-                    "error": str(e)
-                })
-
-        return JsonRpcResponse(result=results, id=request_model.id).dict()
-
-    # For unknown methods, check if we're in HTTP mode and initialized
-    if not server_state.initialized and os.environ.get("MCP_HTTP_MODE") != "1":
-        return JsonRpcResponse(
-            error={
-                "code": -32002,
-                "message": "Server not initialized"
-            },
-            id=request_model.id
-        ).dict()
-    
-    return JsonRpcResponse(
-        error={
-            "code": -32601,
-            "message": f"Method '{request_model.method}' not found"
-        },
-        id=request_model.id
-    ).dict()
-
-@app.post("/")
-async def handle_jsonrpc(request: Request):
-    try:
-        data = await request.json()
-        
-        # In HTTP mode, allow certain methods without initialization
-        if os.environ.get("MCP_HTTP_MODE") == "1" and not server_state.initialized:
-            # Auto-initialize for HTTP mode if this is not an initialize request
-            if data.get("method") != "initialize":
-                server_state.initialized = True
-                print("Auto-initializing server for JSON-RPC request in HTTP mode", file=sys.stderr)
-        
-        return await process_jsonrpc_request(data)
-    except Exception as e:
-        return JsonRpcResponse(
-            error={
-                "code": -32700,
-                "message": "Parse error",
-                "data": str(e)
-            },
-            id=None
-        ).dict()
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Union
 
-# MCP-compatible JSON-RPC endpoint for tool listing
-@app.post("/mcp")
-async def handle_mcp_jsonrpc(request: Request):
-    """Dedicated MCP-compatible JSON-RPC endpoint for Smithery integration"""
-    try:
-        data = await request.json()
-        
-        # Always auto-initialize for MCP endpoint
-        if not server_state.initialized:
-            server_state.initialized = True
-            print("Auto-initializing server for MCP endpoint", file=sys.stderr)
-        
-        # Special handling for list_tools to ensure compatibility with Smithery
-        if data.get("method") == "list_tools":
-            tool_schemas = {}
-            for name, tool in TOOLS.items():
-                tool_schemas[name] = {
-                    "name": tool.name,
-                    "description": tool.description,
-                    "parameters": tool.parameters
-                }
-            return JsonRpcResponse(
-                jsonrpc="2.0",
-                result=tool_schemas,
-                id=data.get("id")
-            ).dict()
-            
-        # Handle initialize requests
-        if data.get("method") == "initialize":
-            # Build tool capabilities
-            tool_capabilities = {}
-            for name, tool in TOOLS.items():
-                tool_capabilities[name] = {
-                    "name": tool.name,
-                    "description": tool.description,
-                    "parameters": tool.parameters
-                }
-            
-            return JsonRpcResponse(
-                jsonrpc="2.0",
-                result={
-                    "name": "Python MCP Calculator Server",
-                    "version": "1.0.0",
-                    "capabilities": {
-                        "tools": tool_capabilities
-                    }
-                },
-                id=data.get("id")
-            ).dict()
-        
-        # For other methods, use the standard JSON-RPC handler
-        return await process_jsonrpc_request(data)
-    except Exception as e:
-        return JsonRpcResponse(
-            error={
-                "code": -32700,
-                "message": "Parse error",
-                "data": str(e)
-            },
-            id=None
-        ).dict()
+from loguru import logger
 
-# WebSocket endpoint for Smithery
-@app.websocket("/")
-async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    try:
-        while True:
-            # Receive message from client
-            data = await websocket.receive_json()
-            
-            # In HTTP mode, allow certain methods without initialization
-            if os.environ.get("MCP_HTTP_MODE") == "1" and not server_state.initialized:
-                # Auto-initialize for HTTP mode if this is not an initialize request
-                if data.get("method") != "initialize":
-                    server_state.initialized = True
-                    print("Auto-initializing server for WebSocket request in HTTP mode", file=sys.stderr)
-            
-            # Process the JSON-RPC request
-            response = await process_jsonrpc_request(data)
-            
-            # Send response back to client
-            await websocket.send_json(response)
-    except WebSocketDisconnect:
-        print("Client disconnected")
-    except Exception as e:
-        # Send error response
-        error_response = JsonRpcResponse(
-            error={
-                "code": -32603,
-                "message": "Internal error",
-                "data": str(e)
-            },
-            id=None
-        ).dict()
-        try:
-            await websocket.send_json(error_response)
-        except:
-            pass
+from admission import Rejected
+from metrics import SnapshotDirectory
+from router import Context
+from service import CONFIG, METRICS, SESSIONS, handle_message, watch_plugins
+from stdio_transport import StdioServer
 
-# MCP-compatible WebSocket endpoint for Smithery
-@app.websocket("/mcp")
-async def mcp_websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    try:
-        # Auto-initialize for MCP WebSocket
-        server_state.initialized = True
-        print("Auto-initializing server for MCP WebSocket connection", file=sys.stderr)
-        
-        while True:
-            # Receive message from client
-            data = await websocket.receive_json()
-            
-            # Special handling for list_tools to ensure compatibility with Smithery
-            if data.get("method") == "list_tools":
-                tool_schemas = {}
-                for name, tool in TOOLS.items():
-                    tool_schemas[name] = {
-                        "name": tool.name,
-                        "description": tool.description,
-                        "parameters": tool.parameters
-                    }
-                response = JsonRpcResponse(
-                    jsonrpc="2.0",
-                    result=tool_schemas,
-                    id=data.get("id")
-                ).dict()
-                await websocket.send_json(response)
-                continue
-                
-            # Handle initialize requests
-            if data.get("method") == "initialize":
-                # Build tool capabilities
-                tool_capabilities = {}
-                for name, tool in TOOLS.items():
-                    tool_capabilities[name] = {
-                        "name": tool.name,
-                        "description": tool.description,
-                        "parameters": tool.parameters
-                    }
-                
-                response = JsonRpcResponse(
-                    jsonrpc="2.0",
-                    result={
-                        "name": "Python MCP Calculator Server",
-                        "version": "1.0.0",
-                        "capabilities": {
-                            "tools": tool_capabilities
-                        }
-                    },
-                    id=data.get("id")
-                ).dict()
-                await websocket.send_json(response)
-                continue
-            
-            # Process the JSON-RPC request
-            response = await process_jsonrpc_request(data)
-            
-            # Send response back to client
-            await websocket.send_json(response)
-    except WebSocketDisconnect:
-        print("Client disconnected from MCP WebSocket")
-    except Exception as e:
-        # Send error response
-        error_response = JsonRpcResponse(
-            error={
-                "code": -32603,
-                "message": "Internal error",
-                "data": str(e)
-            },
-            id=None
-        ).dict()
-        try:
-            await websocket.send_json(error_response)
-        except:
-            pass
+def __getattr__(name: str) -> Any:
+    # Module attribute hook: build the FastAPI app only when it is asked for
+    if name == "app":
+        from http_app import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Function to handle JSON-RPC over stdio
 async def handle_stdio_jsonrpc():
     """Process JSON-RPC messages from stdin and write responses to stdout"""
-    # Set up non-blocking stdin reading
-    loop = asyncio.get_event_loop()
-    reader = asyncio.StreamReader()
-    protocol = asyncio.StreamReaderProtocol(reader)
-    await loop.connect_read_pipe(lambda: protocol, sys.stdin)
-    
-    # Buffer for incomplete JSON
-    buffer = ""
-    
-    while True:
-        # Read from stdin
-        line = await reader.readline()
-        if not line:  # EOF
-            break
-            
+    session = SESSIONS.open()
+    context = Context(session, "stdio")
+
+    async def handle(data: Any) -> Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]:
         try:
-            # Add to buffer and try to parse
-            buffer += line.decode('utf-8')
-            
-            # Try to parse as JSON
-            try:
-                request_data = json.loads(buffer)
-                buffer = ""  # Reset buffer on successful parse
-                
-                # Process the request
-                response = await process_jsonrpc_request(request_data)
-                
-                # Write response to stdout
-                sys.stdout.write(json.dumps(response) + "\n")
-                sys.stdout.flush()
-                
-                # Exit if shutdown was called
-                if request_data.get("method") == "shutdown":
-                    if os.environ.get("MCP_STDIO_MODE") == "1":
-                        # Only exit in stdio mode
-                        sys.exit(0)
-            except json.JSONDecodeError:
-                # Incomplete JSON, continue reading
-                pass
-        except Exception as e:
-            # Handle any errors
-            error_response = JsonRpcResponse(
-                error={
-                    "code": -32603,
-                    "message": "Internal error",
-                    "data": str(e)
-                },
-                id=None
-            ).dict()
-            sys.stdout.write(json.dumps(error_response) + "\n")
-            sys.stdout.flush()
-            buffer = ""  # Reset buffer on error
+            return await handle_message(data, context, "stdio", "stdio")
+        except Rejected as e:
+            return e.response(data)
+
+    def on_error(response: Dict[str, Any]) -> None:
+        METRICS.count_errors("stdio", "stdio", response)
+
+    # Requests are pipelined; a shutdown request only ends the session in
+    # stdio mode, after the requests in flight have been answered
+    server = StdioServer(
+        handle,
+        max_in_flight=CONFIG.stdio_max_in_flight,
+        exit_on_shutdown=CONFIG.stdio_mode,
+        framing=CONFIG.stdio_framing,
+        max_message_size=CONFIG.stdio_max_message_bytes,
+        send_queue_size=CONFIG.stdio_send_queue_size,
+        on_error=on_error
+    )
+    context.notify = server.notify
+    background_tasks = [asyncio.create_task(METRICS.monitor_loop_lag("stdio")), watch_plugins()]
+    try:
+        await server.serve()
+    finally:
+        for task in background_tasks:
+            if task is not None:
+                task.cancel()
+        SESSIONS.release(session)
 
 def start_stdio_mode():
     """Start the server in stdio mode"""
@@ -546,22 +81,111 @@ def start_stdio_mode():
         logger.exception(f"Failed to start stdio mode: {e}")
         sys.exit(1)
 
+def prepare_metrics_dir() -> str:
+    """Give the worker processes an empty directory to exchange metrics through"""
+    import tempfile
+    path = CONFIG.metrics_dir or tempfile.mkdtemp(prefix="mcp-metrics-")
+    # Workers read their configuration from the environment they inherit
+    os.environ["MCP_METRICS_DIR"] = path
+    SnapshotDirectory(path).clear()
+    return path
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+def http_loop() -> str:
+    """The event loop HTTP is served on: "auto" picks uvloop when it is installed"""
+    if CONFIG.http_loop != "auto":
+        return CONFIG.http_loop
+    return "uvloop" if sys.platform != "win32" and _installed("uvloop") else "asyncio"
+
+def http_parser() -> str:
+    """uvicorn's HTTP/1.1 parser: "auto" picks httptools when it is installed"""
+    if CONFIG.http_parser != "auto":
+        return CONFIG.http_parser
+    return "httptools" if _installed("httptools") else "h11"
+
+def uvicorn_options() -> Dict[str, Any]:
+    return dict(
+        host=CONFIG.http_host,
+        port=CONFIG.http_port,
+        reload=False,
+        loop=http_loop(),
+        http=http_parser(),
+        timeout_keep_alive=CONFIG.http_keep_alive,
+        backlog=CONFIG.http_backlog,
+        log_level="info",
+        # One log record per request; off on the hot path with MCP_HTTP_ACCESS_LOG=0
+        access_log=CONFIG.http_access_log,
+        # uvicorn's records propagate to the queued loguru sinks instead
+        # of uvicorn's own synchronous stderr handlers
+        log_config=None,
+        # permessage-deflate shrinks large results; it costs CPU on every message
+        ws_per_message_deflate=CONFIG.ws_per_message_deflate,
+        # Larger WebSocket messages close the connection (code 1009)
+        ws_max_size=CONFIG.max_request_bytes,
+        ssl_certfile=CONFIG.http_certfile,
+        ssl_keyfile=CONFIG.http_keyfile
+    )
+
+def start_hypercorn() -> None:
+    """Serve HTTP/1.1 and HTTP/2 (h2 over TLS, h2c in the clear) with Hypercorn"""
+    import logging
+    from hypercorn.config import Config
+    from hypercorn.run import run
+
+    config = Config()
+    config.application_path = "http_app:app"
+    config.bind = [f"{CONFIG.http_host}:{CONFIG.http_port}"]
+    # 0 serves from this process; otherwise each worker imports http_app:app
+    config.workers = CONFIG.http_workers if CONFIG.multi_worker else 0
+    config.worker_class = http_loop()
+    config.keep_alive_timeout = CONFIG.http_keep_alive
+    # Hypercorn closes a connection after 1000 requests by default, which
+    # breaks up the long-lived connections HTTP/2 clients multiplex over
+    config.keep_alive_max_requests = sys.maxsize
+    config.backlog = CONFIG.http_backlog
+    config.websocket_max_message_size = CONFIG.max_request_bytes
+    # Loggers (rather than file names) propagate to the queued loguru sinks
+    config.accesslog = logging.getLogger("hypercorn.access") if CONFIG.http_access_log else None
+    config.errorlog = logging.getLogger("hypercorn.error")
+    config.certfile = CONFIG.http_certfile
+    config.keyfile = CONFIG.http_keyfile
+    run(config)
+
 def start_http_mode():
-    """Start the server in HTTP mode with uvicorn"""
+    """Start the server in HTTP mode with uvicorn (or Hypercorn, for HTTP/2)"""
     try:
-        # Ensure the server is initialized in HTTP mode
-        server_state.initialized = True
         logger.info("Starting in HTTP mode with auto-initialization")
-        
+        if CONFIG.multi_worker:
+            # Pre-forked, shared-nothing workers: each process imports the
+            # app and builds its own pools, sessions and caches
+            metrics_dir = prepare_metrics_dir()
+            logger.info(f"Starting {CONFIG.http_workers} workers on {CONFIG.http_host}:{CONFIG.http_port} "
+                        f"(metrics shared through {metrics_dir})")
+        elif CONFIG.http_workers > 1:
+            logger.warning("MCP_HTTP_WORKERS is only used in HTTP mode (MCP_HTTP_MODE=1); using one worker")
+
+        hypercorn = CONFIG.http_server == "hypercorn"
+        if hypercorn and threading.current_thread() is not threading.main_thread():
+            # Hypercorn installs signal handlers, which only the main thread can
+            logger.warning("Hypercorn needs the main thread (not dual mode); serving with uvicorn")
+            hypercorn = False
+        if hypercorn:
+            logger.info(f"Serving HTTP/1.1 and HTTP/2 with Hypercorn (loop: {http_loop()}, "
+                        f"keep-alive: {CONFIG.http_keep_alive} s)")
+            start_hypercorn()
+            return
+
         import uvicorn
-        uvicorn.run(
-            app, 
-            host="0.0.0.0", 
-            port=8000, 
-            reload=False,
-            log_level="info",
-            access_log=True
-        )
+        options = uvicorn_options()
+        logger.info(f"Serving HTTP/1.1 with uvicorn (loop: {options['loop']}, parser: {options['http']}, "
+                    f"keep-alive: {CONFIG.http_keep_alive} s, access log: {'on' if CONFIG.http_access_log else 'off'})")
+        if CONFIG.multi_worker:
+            uvicorn.run("server:app", workers=CONFIG.http_workers, **options)
+        else:
+            from http_app import app
+            uvicorn.run(app, **options)
     except Exception as e:
         logger.exception(f"Failed to start HTTP mode: {e}")
         sys.exit(1)
@@ -570,11 +194,11 @@ def start_http_mode():
 if __name__ == "__main__":
     try:
         # Check if we should run in stdio mode (for Smithery)
-        if os.environ.get("MCP_STDIO_MODE") == "1":
+        if CONFIG.stdio_mode:
             # Run only stdio mode when MCP_STDIO_MODE is set
             logger.info("Starting in exclusive stdio mode (MCP_STDIO_MODE=1)")
             start_stdio_mode()
-        elif os.environ.get("MCP_HTTP_MODE") == "1":
+        elif CONFIG.http_mode:
             # Run only HTTP mode when MCP_HTTP_MODE is set
             logger.info("Starting in exclusive HTTP mode (MCP_HTTP_MODE=1)")
             start_http_mode()
@@ -0,0 +1,176 @@
+"""
+Transport-independent core of the MCP server: configuration, logging, the
+tools and their executors, sessions, metrics and the JSON-RPC router with its
+methods. Importing it pulls in no web framework, so the stdio entry path
+starts without FastAPI, pydantic or uvicorn; the HTTP and WebSocket routes
+live in http_app.py and are only imported when HTTP is served.
+"""
+
+import asyncio
+import sys
+from typing import Any, Dict, List, Optional, Union
+
+from loguru import logger
+
+import jsonrpc
+from admission import AdmissionController, Rejected
+from calculator import CalculatorTool
+from config import ServerConfig
+from executor import BatchExecutor, ToolExecutor
+from logging_setup import configure_logging
+from metrics import ServerMetrics
+from plugins import PluginManager
+from result_cache import ResultCache
+from router import Context, Router
+from schema import ValidationError
+from sessions import SessionManager
+from tool_registry import ToolRegistry
+
+# Environment configuration is resolved once, here
+CONFIG = ServerConfig.from_env()
+
+# Configure logging based on environment variables; sinks are written by a
+# background thread, so logging never blocks request handling
+configure_logging(CONFIG)
+
+# Log startup information
+logger.info("Initializing MCP Calculator Server")
+logger.debug(f"Python version: {sys.version}")
+logger.debug(f"Configuration: {CONFIG}")
+
+# Initialize tools
+calculator = CalculatorTool.from_config(CONFIG)
+TOOLS = ToolRegistry()
+TOOLS.register(calculator)
+TOOL_EXECUTOR = ToolExecutor.from_config(CONFIG)
+RESULT_CACHE = ResultCache.from_config(CONFIG)
+# Plugin tools are registered from their manifests; their modules are only
+# imported when first called
+PLUGINS = PluginManager(TOOLS, RESULT_CACHE, CONFIG.plugins_dir)
+if CONFIG.plugin_entry_points:
+    PLUGINS.load_entry_points()
+PLUGINS.scan()
+# Worker processes merge their metrics through snapshots in CONFIG.metrics_dir
+METRICS = ServerMetrics(shared_dir=CONFIG.metrics_dir if CONFIG.multi_worker else None)
+METRICS.watch_executor(TOOL_EXECUTOR)
+BATCH_EXECUTOR = BatchExecutor(TOOLS, TOOL_EXECUTOR, max_concurrency=CONFIG.batch_concurrency, cache=RESULT_CACHE,
+                               metrics=METRICS, timeout_ms=CONFIG.tool_timeout_ms)
+# Rate limits and the in-flight cap, applied to every transport
+ADMISSION = AdmissionController.from_config(CONFIG)
+METRICS.watch_admission(ADMISSION)
+
+# Each client gets its own Session; HTTP sessions are kept by SESSIONS
+SESSIONS = SessionManager(max_sessions=CONFIG.max_sessions, ttl=CONFIG.session_ttl)
+
+def watch_plugins() -> Optional[asyncio.Task]:
+    """Start rescanning the plugins directory on the running loop, if configured"""
+    if not CONFIG.plugins_dir or not CONFIG.plugins_poll_seconds:
+        return None
+    return asyncio.create_task(PLUGINS.watch(CONFIG.plugins_poll_seconds))
+
+# Method of the notifications that carry streamed `execute` results
+RESULT_NOTIFICATION = "notifications/result"
+
+# JSON-RPC methods, shared by every transport
+ROUTER = Router()
+ROUTER.use(METRICS.middleware)
+
+async def handle_message(data: Any, context: Context, endpoint: str,
+                         client: str) -> Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+    """Route one decoded message (or batch) once ADMISSION lets it in.
+
+    Raises Rejected, after counting it, when the message is shed; the
+    transport answers with `Rejected.response` in its own way.
+    """
+    transport = context.transport
+    if ADMISSION.exempt(data):
+        return await METRICS.track(transport, endpoint, ROUTER.handle(data, context))
+    try:
+        waited = await ADMISSION.admit(client, data)
+    except Rejected as e:
+        METRICS.admission_rejected.inc((transport, e.reason))
+        METRICS.count_errors(transport, endpoint, e.response(data))
+        raise
+    METRICS.admission_wait.observe((transport,), waited)
+    try:
+        return await METRICS.track(transport, endpoint, ROUTER.handle(data, context))
+    finally:
+        ADMISSION.release()
+
+@ROUTER.method("initialize", requires_init=False)
+async def initialize(request: jsonrpc.Request, context: Context) -> jsonrpc.Encoded:
+    context.session.initialized = True
+    context.session.client_info = request.params
+    return TOOLS.catalog.initialize_result
+
+@ROUTER.method("shutdown")
+async def shutdown(request: jsonrpc.Request, context: Context) -> None:
+    context.session.initialized = False
+    return None
+
+@ROUTER.method("notifications/cancelled", requires_init=False)
+async def cancel_request(request: jsonrpc.Request, context: Context) -> None:
+    # Cancelling a request that already finished (or never existed) is not an error
+    request_id = (request.params or {}).get("requestId")
+    if type(request_id) is int or isinstance(request_id, str):
+        context.session.cancel(request_id)
+    return None
+
+@ROUTER.method("list_tools")
+async def list_tools(request: jsonrpc.Request, context: Context) -> jsonrpc.Encoded:
+    return TOOLS.catalog.tools_result
+
+@ROUTER.method("execute")
+async def execute(request: jsonrpc.Request, context: Context) -> List[Dict[str, Any]]:
+    if not request.params or "function_calls" not in request.params:
+        raise jsonrpc.JsonRpcError(jsonrpc.INVALID_PARAMS, "Invalid params: function_calls required")
+    calls = request.params["function_calls"]
+    if not isinstance(calls, list):
+        raise jsonrpc.JsonRpcError(jsonrpc.INVALID_PARAMS, "Invalid params: function_calls must be an array")
+
+    timeout_ms = request.params.get("timeout_ms")
+    if timeout_ms is not None and (type(timeout_ms) not in (int, float) or not timeout_ms > 0):
+        raise jsonrpc.JsonRpcError(jsonrpc.INVALID_PARAMS, "Invalid params: timeout_ms must be a positive number")
+    concurrency = request.params.get("concurrency")
+    if concurrency is not None and (type(concurrency) is not int or concurrency < 1):
+        raise jsonrpc.JsonRpcError(jsonrpc.INVALID_PARAMS, "Invalid params: concurrency must be a positive integer")
+
+    # Every call is checked against its tool's schema before any of them runs;
+    # unknown tools are reported per call by the executor
+    for index, call in enumerate(calls):
+        if isinstance(call, dict) and isinstance(call.get("name"), str):
+            try:
+                TOOLS.validate(call["name"], call.get("parameters"))
+            except ValidationError as e:
+                raise jsonrpc.JsonRpcError(
+                    jsonrpc.INVALID_PARAMS,
+                    f"Invalid params: function_calls[{index}] ({call['name']}) {e}",
+                    {"call": index, "tool": call["name"], "path": e.pointer, "error": e.message}
+                )
+
+    options = dict(
+        concurrency=concurrency,
+        fail_fast=bool(request.params.get("fail_fast", False)),
+        timeout=None if timeout_ms is None else timeout_ms / 1000
+    )
+    if request.params.get("stream") and context.notify is not None and request.id is not None:
+        # Each entry goes out as a notification when its call finishes; the
+        # response only carries the counts
+        notify = context.notify
+
+        async def send_result(index: int, entry: Dict[str, Any]) -> None:
+            await notify(result_notification(request.id, index, entry))
+
+        return await BATCH_EXECUTOR.stream(calls, send_result, **options)
+    # Independent calls are dispatched concurrently; results keep call order
+    return await BATCH_EXECUTOR.run(calls, **options)
+
+def result_notification(request_id: Any, index: int, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """The notification carrying one streamed `execute` result"""
+    return {"jsonrpc": "2.0", "method": RESULT_NOTIFICATION, "params": {"requestId": request_id, "index": index,
+                                                                       **entry}}
+
+def wants_stream(data: Any) -> bool:
+    """Whether a message is a single `execute` request asking for streamed results"""
+    return (isinstance(data, dict) and data.get("method") == "execute" and "id" in data
+            and isinstance(data.get("params"), dict) and bool(data["params"].get("stream")))
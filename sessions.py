@@ -0,0 +1,138 @@
+"""
+Per-client session state for the MCP server.
+Every WebSocket connection and the stdio loop own one Session for their
+lifetime. HTTP clients get a stored session when they send `initialize`; its
+id is returned in the Mcp-Session-Id header (and an mcp_session cookie) and
+is looked up again on later requests. HTTP requests without a known session
+id run in a throwaway session, so stateless clients cost no memory.
+
+Stored sessions are kept in LRU order: a session idle for longer than
+MCP_SESSION_TTL seconds expires, and once MCP_MAX_SESSIONS are stored the
+least recently used one is evicted to make room.
+
+A session also tracks the requests it is handling by id, so a client can
+cancel one of them (see the notifications/cancelled method in service.py).
+"""
+
+import asyncio
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Union
+
+DEFAULT_MAX_SESSIONS = 10000
+DEFAULT_SESSION_TTL = 1800.0
+
+SESSION_HEADER = "Mcp-Session-Id"
+SESSION_COOKIE = "mcp_session"
+
+
+class Session:
+    """State of one client: whether it initialized, what it told us, and what it is waiting for"""
+
+    __slots__ = ("id", "initialized", "client_info", "created", "last_seen", "requests", "cancelled")
+
+    def __init__(self, session_id: Optional[str] = None, initialized: bool = False):
+        self.id = session_id
+        self.initialized = initialized
+        self.client_info = None
+        self.created = self.last_seen = time.monotonic()
+        # Request id -> the task handling it, and the ids the client cancelled
+        self.requests: Dict[Union[int, str], asyncio.Task] = {}
+        self.cancelled: Set[Union[int, str]] = set()
+
+    def cancel(self, request_id: Union[int, str]) -> bool:
+        """Cancel the request with this id; False if it is not being handled"""
+        task = self.requests.get(request_id)
+        if task is None or task.done():
+            return False
+        self.cancelled.add(request_id)
+        task.cancel()
+        return True
+
+
+class SessionManager:
+    """Bounded LRU/TTL store of HTTP sessions plus counters for all sessions"""
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS, ttl: float = DEFAULT_SESSION_TTL):
+        self.max_sessions = max(1, max_sessions)
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.connections = 0
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+        self.closed = 0
+
+    def _expire(self, now: float) -> None:
+        # Oldest first, so stop at the first session that is still fresh
+        sessions = self._sessions
+        while sessions:
+            session = next(iter(sessions.values()))
+            if now - session.last_seen <= self.ttl:
+                break
+            sessions.popitem(last=False)
+            self.expired += 1
+
+    def create(self) -> Session:
+        """Create and store a new HTTP session"""
+        now = time.monotonic()
+        session = Session(secrets.token_urlsafe(16))
+        with self._lock:
+            self._expire(now)
+            while len(self._sessions) >= self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+            self._sessions[session.id] = session
+            self.created += 1
+        return session
+
+    def get(self, session_id: Optional[str]) -> Optional[Session]:
+        """Look up a stored session and mark it used; None if unknown or expired"""
+        if not session_id:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if now - session.last_seen > self.ttl:
+                del self._sessions[session_id]
+                self.expired += 1
+                return None
+            session.last_seen = now
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def remove(self, session_id: str) -> None:
+        with self._lock:
+            if self._sessions.pop(session_id, None) is not None:
+                self.closed += 1
+
+    def open(self, initialized: bool = False) -> Session:
+        """Session owned by a connection (WebSocket, stdio) for its lifetime"""
+        with self._lock:
+            self.connections += 1
+            self.created += 1
+        return Session(initialized=initialized)
+
+    def release(self, session: Session) -> None:
+        with self._lock:
+            self.connections -= 1
+            self.closed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire(time.monotonic())
+            return {
+                "http_sessions": len(self._sessions),
+                "connections": self.connections,
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl,
+                "created": self.created,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "closed": self.closed
+            }
@@ -13,10 +13,9 @@ initiates both HTTP and stdio modes simultaneously.
 import os
 import sys
 import asyncio
-import threading
 import select
-import time
-from server import handle_stdio_jsonrpc, app
+# server is imported once the mode is chosen: its configuration (shutdown
+# handling, log sinks) is read from the environment at import time
 
 def is_stdin_available():
     """Check if stdin has data available or is connected to a pipe/terminal"""
@@ -33,14 +32,17 @@ def is_stdin_available():
         return False
 
 def start_http_server():
-    """Start the HTTP server"""
-    import uvicorn
+    """Start the HTTP server, with the same serving settings as server.py"""
     print("No stdin detected. Starting in HTTP mode...", file=sys.stderr)
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=False)
+    from server import start_http_mode
+    start_http_mode()
 
 def start_stdio_mode():
     """Start in stdio mode"""
     print("Stdin detected. Starting in EXCLUSIVE stdio mode...", file=sys.stderr)
+    # Set the environment variable for stdio mode, before server reads it
+    os.environ["MCP_STDIO_MODE"] = "1"
+    from server import handle_stdio_jsonrpc
     # Create a new event loop
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
@@ -52,9 +54,6 @@ def start_stdio_mode():
         loop.close()
 
 if __name__ == "__main__":
-    # Set the environment variable for stdio mode
-    os.environ["MCP_STDIO_MODE"] = "1"
-    
     # Check if stdin is available
     if is_stdin_available():
         # Start in stdio mode
@@ -0,0 +1,526 @@
+"""
+Stdio transport helpers for the MCP server.
+Framers split the raw stdin byte stream into decoded JSON-RPC messages
+without ever re-parsing buffered input:
+- NdjsonFramer: newline-delimited JSON. A line holding exactly one message
+  is decoded directly; otherwise (pretty-printed messages spanning several
+  lines, several messages on one line) messages are delimited by tracking
+  bracket depth and string state over the new bytes only, so the cost is
+  linear in the input and every message is decoded once.
+- ContentLengthFramer: "Content-Length: N" headers followed by N bytes.
+Both enforce a maximum message size and resynchronize after bad input (for
+NDJSON: at the next line starting with "{" or "[") instead of letting one
+broken fragment poison the stream. NDJSON message boundaries come from depth
+and string state, so newlines inside a message are never mistaken for one.
+A truncated message is detected at the first line that starts with "{" or
+"[" and cannot continue it: after anything but "[", ":" or an array's ",",
+or inside a string, where JSON allows no raw newline. Where such a line
+could continue it, it still starts a new message if it is a complete
+JSON-RPC message on its own, unless the pending value is a batch (whose
+members are written one per line). Either way the broken message is
+reported and the line is read as the next message.
+
+The framing mode is "auto", "ndjson" or "content-length" (auto picks
+content-length when the stream starts with a header); the server takes it
+from MCP_STDIO_FRAMING and the size limit from MCP_STDIO_MAX_MESSAGE_BYTES.
+
+StdioServer pipelines requests: every message becomes a task, at most
+MCP_STDIO_MAX_IN_FLIGHT at a time, and responses are written as soon as they
+are ready (clients match them by id) by a single writer task. Setting the
+limit to 1 answers strictly in order; cancel notifications never wait for a
+slot, so they reach the requests they cancel. A shutdown request waits for the
+in-flight requests to finish before it is answered.
+
+Responses and notifications go through a bounded outbox
+(MCP_STDIO_SEND_QUEUE_SIZE encoded messages). When stdout is read slower
+than results are produced, the outbox fills and senders wait for room while
+holding their in-flight slot, so reading stops until the client catches up.
+Errors the server raises
+itself (unreadable input, failing handlers) are also passed to `on_error`,
+e.g. to count them.
+"""
+
+import asyncio
+import re
+import sys
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+import jsonrpc
+from admission import AdmissionController
+
+FRAMING_AUTO = "auto"
+FRAMING_NDJSON = "ndjson"
+FRAMING_CONTENT_LENGTH = "content-length"
+
+DEFAULT_MAX_MESSAGE_BYTES = 32 * 1024 * 1024
+DEFAULT_MAX_IN_FLIGHT = 64
+DEFAULT_SEND_QUEUE_SIZE = 256
+READ_CHUNK_SIZE = 64 * 1024
+
+_NON_WHITESPACE = re.compile(rb"[^ \t\r\n]")
+_STRUCTURAL = re.compile(rb'[{}\[\]"\n]')
+_STRING_SPECIAL = re.compile(rb'["\\\n]')
+_RESYNC = re.compile(rb"\n(?=[{\[])")
+_WHITESPACE = b" \t\r\n"
+# Longest line checked for being a complete message of its own
+_RESYNC_LINE_LIMIT = 64 * 1024
+_HEADER_END = re.compile(rb"\r?\n\r?\n")
+_CONTENT_LENGTH = re.compile(rb"^content-length[ \t]*:[ \t]*(\d+)[ \t]*$", re.IGNORECASE | re.MULTILINE)
+
+
+class FramingError:
+    """Input that could not be framed or decoded, reported as a parse error"""
+
+    __slots__ = ("reason",)
+
+    def __init__(self, reason: str):
+        self.reason = reason
+
+
+# A decoded message, or the reason the input could not be read as one
+Frame = Union[Any, FramingError]
+
+
+def _decode(body: bytes) -> Frame:
+    try:
+        return jsonrpc.loads(body)
+    except ValueError as e:
+        return FramingError(str(e))
+
+
+class NdjsonFramer:
+    """Incremental framer for newline-delimited (or concatenated) JSON values"""
+
+    mode = FRAMING_NDJSON
+
+    def __init__(self, max_message_size: int = DEFAULT_MAX_MESSAGE_BYTES):
+        self.max_message_size = max_message_size
+        self._buffer = bytearray()
+        self._pos = 0          # next byte to scan
+        self._start = -1       # start of the current value, -1 between values
+        self._open = bytearray()  # the brackets the current value has open
+        self._in_string = False
+        self._skip_line = False  # discarding bad input up to the next message
+
+    def feed(self, data: bytes) -> List[Frame]:
+        buffer = self._buffer
+        buffer += data
+        frames: List[Frame] = []
+        pos = self._pos
+
+        while pos < len(buffer):
+            if self._skip_line:
+                # Resume at the next line that starts a new message
+                match = _RESYNC.search(buffer, pos)
+                if match is None:
+                    pos = max(pos, len(buffer) - 1)
+                    break
+                self._skip_line = False
+                pos = match.end()
+                continue
+
+            if self._start < 0:
+                match = _NON_WHITESPACE.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                pos = match.start()
+                if buffer[pos] not in b"{[":
+                    frames.append(FramingError("Expected a JSON object or array"))
+                    self._skip_line = True
+                    continue
+                # Fast path: the rest of the line is exactly one message
+                newline = buffer.find(b"\n", pos)
+                if newline != -1 and newline - pos <= self.max_message_size:
+                    try:
+                        frames.append(jsonrpc.loads(bytes(buffer[pos:newline])))
+                        pos = newline + 1
+                        continue
+                    except ValueError:
+                        pass  # Multi-line or several values: scan it
+                self._start = pos
+                self._open = bytearray(buffer[pos:pos + 1])
+                pos += 1
+                continue
+
+            match = (_STRING_SPECIAL if self._in_string else _STRUCTURAL).search(buffer, pos)
+            if match is None:
+                pos = len(buffer)
+            else:
+                char = buffer[match.start()]
+                pos = match.end()
+                if char == 0x0A:  # \n
+                    next_message = self._next_message(buffer, match.start())
+                    if next_message is None:
+                        # Wait for the rest of the next line to decide
+                        pos = match.start()
+                        break
+                    if next_message:
+                        frames.append(FramingError("Incomplete JSON message"))
+                        self._reset_value()
+                        continue
+                elif self._in_string:
+                    if char == 0x5C:  # backslash escapes the next byte
+                        pos += 1
+                    else:
+                        self._in_string = False
+                elif char == 0x22:  # "
+                    self._in_string = True
+                elif char in b"{[":
+                    self._open.append(char)
+                else:
+                    self._open.pop()
+                    if not self._open:
+                        frames.append(_decode(bytes(buffer[self._start:pos])))
+                        self._start = -1
+                        continue
+
+            if pos - self._start > self.max_message_size:
+                frames.append(FramingError(f"Message exceeds {self.max_message_size} bytes"))
+                self._reset_value()
+                self._skip_line = True
+
+        # Drop everything before the current value (or everything scanned)
+        keep = self._start if self._start >= 0 else min(pos, len(buffer))
+        if keep:
+            del buffer[:keep]
+            pos -= keep
+            if self._start >= 0:
+                self._start = 0
+        self._pos = pos
+        return frames
+
+    def _next_message(self, buffer: bytearray, newline: int) -> Optional[bool]:
+        """Whether the line after a newline inside the current value starts a
+        new message, so the current one was cut off; None until it is known"""
+        first = newline + 1
+        if first == len(buffer):
+            return None
+        if buffer[first] not in b"{[":
+            return False
+        if self._in_string:
+            return True  # JSON strings hold no raw newline
+        prev = newline - 1
+        while buffer[prev] in _WHITESPACE:
+            prev -= 1
+        innermost = self._open[-1]
+        if not (buffer[prev] in b"[:" or buffer[prev] == 0x2C and innermost == 0x5B):  # , in [
+            return True  # No value can follow here
+        if len(self._open) == 1 and innermost == 0x5B:
+            return False  # A batch member
+        end = buffer.find(b"\n", first, first + _RESYNC_LINE_LIMIT)
+        if end == -1:
+            return None if len(buffer) - first < _RESYNC_LINE_LIMIT else False
+        try:
+            line = jsonrpc.loads(bytes(buffer[first:end]))
+        except ValueError:
+            return False
+        members = line if isinstance(line, list) else [line]
+        return bool(members) and all(isinstance(member, dict) and "jsonrpc" in member for member in members)
+
+    def _reset_value(self) -> None:
+        self._start = -1
+        self._open = bytearray()
+        self._in_string = False
+
+    @property
+    def pending(self) -> bool:
+        """Whether a partial message is buffered"""
+        return self._start >= 0
+
+
+class ContentLengthFramer:
+    """Incremental framer for "Content-Length: N" header framing"""
+
+    mode = FRAMING_CONTENT_LENGTH
+
+    def __init__(self, max_message_size: int = DEFAULT_MAX_MESSAGE_BYTES):
+        self.max_message_size = max_message_size
+        self._buffer = bytearray()
+        self._body_length: Optional[int] = None
+        self._discard = 0
+
+    def feed(self, data: bytes) -> List[Frame]:
+        buffer = self._buffer
+        buffer += data
+        frames: List[Frame] = []
+
+        while True:
+            if self._discard:
+                dropped = min(self._discard, len(buffer))
+                del buffer[:dropped]
+                self._discard -= dropped
+                if self._discard:
+                    break
+
+            if self._body_length is None:
+                match = _HEADER_END.search(buffer)
+                if match is None:
+                    if len(buffer) > self.max_message_size:
+                        frames.append(FramingError("Header block too large"))
+                        buffer.clear()
+                    break
+                headers = bytes(buffer[:match.start()])
+                del buffer[:match.end()]
+                length = _CONTENT_LENGTH.search(headers)
+                if length is None:
+                    frames.append(FramingError("Missing Content-Length header"))
+                    continue
+                body_length = int(length.group(1))
+                if body_length > self.max_message_size:
+                    frames.append(FramingError(f"Message exceeds {self.max_message_size} bytes"))
+                    self._discard = body_length
+                    continue
+                self._body_length = body_length
+
+            if len(buffer) < self._body_length:
+                break
+            frames.append(_decode(bytes(buffer[:self._body_length])))
+            del buffer[:self._body_length]
+            self._body_length = None
+
+        return frames
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._buffer) or self._body_length is not None
+
+
+class AutoFramer:
+    """Pick content-length framing if the stream starts with a header"""
+
+    def __init__(self, max_message_size: int = DEFAULT_MAX_MESSAGE_BYTES):
+        self.max_message_size = max_message_size
+        self.framer: Optional[Union[NdjsonFramer, ContentLengthFramer]] = None
+        self._head = bytearray()
+
+    @property
+    def mode(self) -> Optional[str]:
+        return self.framer.mode if self.framer is not None else None
+
+    def feed(self, data: bytes) -> List[Frame]:
+        if self.framer is not None:
+            return self.framer.feed(data)
+        self._head += data
+        head = bytes(self._head).lstrip()
+        if not head:
+            return []
+        if head[:1] in (b"{", b"[") or len(head) >= 15:
+            if head[:15].lower() == b"content-length:":
+                self.framer = ContentLengthFramer(self.max_message_size)
+            else:
+                self.framer = NdjsonFramer(self.max_message_size)
+            return self.framer.feed(bytes(self._head))
+        if not b"content-length:".startswith(head.lower()):
+            self.framer = NdjsonFramer(self.max_message_size)
+            return self.framer.feed(bytes(self._head))
+        return []
+
+    @property
+    def pending(self) -> bool:
+        return self.framer.pending if self.framer is not None else bool(self._head.strip())
+
+
+def create_framer(mode: str = FRAMING_AUTO, max_message_size: int = DEFAULT_MAX_MESSAGE_BYTES):
+    mode = mode.lower()
+    if mode == FRAMING_NDJSON:
+        return NdjsonFramer(max_message_size)
+    if mode == FRAMING_CONTENT_LENGTH:
+        return ContentLengthFramer(max_message_size)
+    if mode == FRAMING_AUTO:
+        return AutoFramer(max_message_size)
+    raise ValueError(f"Unknown MCP_STDIO_FRAMING mode: {mode}")
+
+
+def encode_frame(body: bytes, mode: Optional[str]) -> bytes:
+    """Frame an outgoing message the same way the client frames its input"""
+    if mode == FRAMING_CONTENT_LENGTH:
+        return b"Content-Length: " + str(len(body)).encode("ascii") + b"\r\n\r\n" + body
+    return body + b"\n"
+
+
+class StdioWriter:
+    """Buffered, non-blocking writer for stdout.
+
+    Uses an asyncio pipe transport when stdout is a pipe, socket or terminal;
+    otherwise (e.g. stdout redirected to a file) writes happen on a worker
+    thread so the event loop never blocks.
+    """
+
+    def __init__(self, writer: Optional[asyncio.StreamWriter], stream=None):
+        self._writer = writer
+        self._stream = stream
+
+    @classmethod
+    async def open(cls, stream=None) -> "StdioWriter":
+        stream = stream or sys.stdout
+        loop = asyncio.get_running_loop()
+        try:
+            stream.flush()
+            transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, stream)
+        except (ValueError, OSError):
+            return cls(None, getattr(stream, "buffer", stream))
+        return cls(asyncio.StreamWriter(transport, protocol, None, loop))
+
+    async def write(self, data: bytes) -> None:
+        if self._writer is not None:
+            self._writer.write(data)
+            await self._writer.drain()
+        else:
+            await asyncio.get_running_loop().run_in_executor(None, self._write_blocking, data)
+
+    def _write_blocking(self, data: bytes) -> None:
+        self._stream.write(data)
+        self._stream.flush()
+
+    async def drain(self) -> None:
+        if self._writer is not None:
+            await self._writer.drain()
+
+
+class StdinReader:
+    """Chunked reader for stdin; uses a worker thread when stdin is a regular file"""
+
+    def __init__(self, reader: Optional[asyncio.StreamReader], stream=None):
+        self._reader = reader
+        self._stream = stream
+
+    @classmethod
+    async def open(cls, stream=None) -> "StdinReader":
+        stream = stream or sys.stdin
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=READ_CHUNK_SIZE)
+        try:
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), stream)
+        except (ValueError, OSError):
+            return cls(None, getattr(stream, "buffer", stream))
+        return cls(reader)
+
+    async def read(self) -> bytes:
+        """Next chunk of input, or b"" at EOF"""
+        if self._reader is not None:
+            return await self._reader.read(READ_CHUNK_SIZE)
+        read = getattr(self._stream, "read1", self._stream.read)
+        return await asyncio.get_running_loop().run_in_executor(None, read, READ_CHUNK_SIZE)
+
+
+def is_shutdown(message: Any) -> bool:
+    """Whether a message (or any member of a batch) is a shutdown request"""
+    members = message if isinstance(message, list) else [message]
+    return any(isinstance(member, dict) and member.get("method") == "shutdown" for member in members)
+
+
+class StdioServer:
+    """Pipelined JSON-RPC over stdin/stdout"""
+
+    def __init__(self, handler: Callable[[Any], Awaitable[Optional[Any]]],
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT, exit_on_shutdown: bool = True,
+                 framing: str = FRAMING_AUTO, max_message_size: int = DEFAULT_MAX_MESSAGE_BYTES,
+                 send_queue_size: int = DEFAULT_SEND_QUEUE_SIZE,
+                 on_error: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.handler = handler
+        self.max_in_flight = max(1, max_in_flight)
+        self.exit_on_shutdown = exit_on_shutdown
+        self.framing = framing
+        self.max_message_size = max_message_size
+        self.send_queue_size = max(1, send_queue_size)
+        self.on_error = on_error
+        self._framer = None
+        self._outbox: Optional[asyncio.Queue] = None
+
+    async def _send(self, response: Any) -> None:
+        """Queue a message, waiting while the outbox is full"""
+        await self._outbox.put(encode_frame(jsonrpc.dumps(response), self._framer.mode))
+
+    async def notify(self, message: Dict[str, Any]) -> None:
+        """Write a message ahead of the response, e.g. a streamed result"""
+        await self._send(message)
+
+    async def _send_error(self, code: int, message: str, request_id: Any = None, data: Any = None) -> None:
+        response = jsonrpc.error_response(code, message, request_id, data)
+        if self.on_error is not None:
+            self.on_error(response)
+        await self._send(response)
+
+    async def _write_loop(self, writer: Optional[StdioWriter]) -> None:
+        """Single writer: coalesces queued responses into one write"""
+        outbox = self._outbox
+        while True:
+            parts = [await outbox.get()]
+            while not outbox.empty():
+                parts.append(outbox.get_nowait())
+            done = parts[-1] is None
+            if done:
+                parts.pop()
+            if parts and writer is not None:
+                try:
+                    await writer.write(b"".join(parts))
+                except (BrokenPipeError, ConnectionResetError):
+                    # Nobody reads stdout any more: keep draining the outbox
+                    # so senders never wait on it
+                    writer = None
+            if done:
+                return
+
+    async def _run(self, message: Any, slots: Optional[asyncio.Semaphore]) -> None:
+        try:
+            response = await self.handler(message)
+            if response is not None:
+                await self._send(response)
+        except Exception as e:
+            await self._send_error(jsonrpc.INTERNAL_ERROR, "Internal error", jsonrpc.extract_id(message), str(e))
+        finally:
+            if slots is not None:
+                slots.release()
+
+    async def serve(self) -> None:
+        reader = await StdinReader.open()
+        writer = await StdioWriter.open()
+        self._framer = create_framer(self.framing, self.max_message_size)
+        self._outbox = asyncio.Queue(maxsize=self.send_queue_size)
+        writer_task = asyncio.create_task(self._write_loop(writer))
+        slots = asyncio.Semaphore(self.max_in_flight)
+        in_flight = set()
+
+        try:
+            stopping = False
+            while not stopping:
+                chunk = await reader.read()
+                if not chunk:  # EOF
+                    if self._framer.pending:
+                        await self._send_error(
+                            jsonrpc.PARSE_ERROR, "Parse error", None, "Incomplete JSON message at end of input"
+                        )
+                    break
+
+                for message in self._framer.feed(chunk):
+                    if isinstance(message, FramingError):
+                        await self._send_error(jsonrpc.PARSE_ERROR, "Parse error", None, message.reason)
+                        continue
+
+                    if is_shutdown(message) and self.exit_on_shutdown:
+                        # Finish everything already accepted, then answer and stop
+                        if in_flight:
+                            await asyncio.gather(*in_flight, return_exceptions=True)
+                        await slots.acquire()
+                        await self._run(message, slots)
+                        stopping = True
+                        break
+
+                    if AdmissionController.exempt(message):
+                        # Cancel notifications take no slot: they must reach
+                        # the requests holding every slot
+                        task = asyncio.create_task(self._run(message, None))
+                    else:
+                        # Waits here once max_in_flight requests are running
+                        await slots.acquire()
+                        task = asyncio.create_task(self._run(message, slots))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+        finally:
+            await self._outbox.put(None)
+            await writer_task
+            await writer.drain()
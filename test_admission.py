@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+import asyncio
+
+import jsonrpc
+from admission import AdmissionController, REASON_QUEUE_FULL, REASON_QUEUE_TIMEOUT, REASON_RATE_LIMITED, Rejected
+
+
+def rejection(coroutine):
+    try:
+        asyncio.run(coroutine)
+    except Rejected as e:
+        return e
+    raise AssertionError("expected Rejected")
+
+
+def test_rate_limit_per_client():
+    """Each client has its own bucket; a batch costs one token per member"""
+    controller = AdmissionController(rate=10, burst=3, max_in_flight=0)
+
+    async def admit_all(client, messages):
+        for message in messages:
+            await controller.admit(client, message)
+            controller.release()
+
+    asyncio.run(admit_all("a", [{"id": 1}, [{"id": 2}, {"id": 3}]]))
+    e = rejection(admit_all("a", [{"id": 4}]))
+    assert e.reason == REASON_RATE_LIMITED and 0 < e.retry_after <= 0.1
+    # Another client is not affected
+    asyncio.run(admit_all("b", [[{"id": 1}, {"id": 2}, {"id": 3}]]))
+    assert controller.stats()["clients"] == 2 and controller.in_flight == 0
+
+
+def test_in_flight_cap_queues_then_sheds():
+    """Messages over the cap wait in order; a full queue or a long wait sheds them"""
+    controller = AdmissionController(max_in_flight=1, max_queued=1, max_queue_ms=200)
+    order = []
+
+    async def run(name, hold):
+        await controller.admit("c", {"id": name})
+        order.append(name)
+        await asyncio.sleep(hold)
+        controller.release()
+
+    async def scenario():
+        first = asyncio.create_task(run(1, 0.05))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(run(2, 0.3))
+        await asyncio.sleep(0.01)
+        assert controller.queued == 1
+        # The queue is full: shed at once
+        try:
+            await controller.admit("c", {"id": 3})
+            raise AssertionError("expected Rejected")
+        except Rejected as e:
+            assert e.reason == REASON_QUEUE_FULL
+        await first
+        await asyncio.sleep(0.01)
+        # The second holds the slot for longer than a third may wait
+        try:
+            await controller.admit("c", {"id": 4})
+            raise AssertionError("expected Rejected")
+        except Rejected as e:
+            assert e.reason == REASON_QUEUE_TIMEOUT
+        await second
+
+    asyncio.run(scenario())
+    assert order == [1, 2]
+    assert controller.in_flight == 0 and controller.queued == 0
+
+
+def test_rejected_response():
+    """Rejections answer every request of a batch with -32000, and notifications not at all"""
+    e = Rejected(REASON_QUEUE_FULL, 0.25)
+    response = e.response({"jsonrpc": "2.0", "method": "list_tools", "id": 7})
+    assert response["id"] == 7 and response["error"] == {
+        "code": jsonrpc.SERVER_OVERLOADED, "message": "Server overloaded",
+        "data": {"reason": "queue_full", "retry_after_ms": 250}
+    }
+    batch = [{"jsonrpc": "2.0", "method": "a", "id": 1}, {"jsonrpc": "2.0", "method": "b"}]
+    assert [member["id"] for member in e.response(batch)] == [1]
+    assert e.response({"jsonrpc": "2.0", "method": "b"}) is None
+    assert Rejected(REASON_RATE_LIMITED).response({"id": 1})["error"]["message"] == "Rate limit exceeded"
+    assert AdmissionController.exempt({"method": "notifications/cancelled"})
+
+
+if __name__ == "__main__":
+    test_rate_limit_per_client()
+    test_in_flight_cap_queues_then_sheds()
+    test_rejected_response()
+    print("All tests passed!")
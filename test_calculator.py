@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+import base64
+import math
+import pickle
+import random
+import struct
+from decimal import Decimal
+from fractions import Fraction
+
+import numeric
+import vectorized
+from calculator import CalculatorTool
+
+
+def reference(operation, numbers):
+    """The original loop-based calculator semantics"""
+    if operation == "add":
+        return sum(numbers)
+    if operation == "subtract":
+        return numbers[0] - sum(numbers[1:])
+    result = 1 if operation == "multiply" else numbers[0]
+    for num in numbers if operation == "multiply" else numbers[1:]:
+        result = result * num if operation == "multiply" else result / num
+    return result
+
+
+def encode(numbers):
+    return base64.b64encode(struct.pack(f"<{len(numbers)}d", *numbers)).decode("ascii")
+
+
+def test_pure_path_matches_reference_exactly():
+    """Integer and float inputs give the same results as the original loops"""
+    calculator = CalculatorTool()
+    rng = random.Random(4)
+    inputs = [
+        [1, 2, 3],
+        [2 ** 70, 3, -5],
+        [rng.uniform(-1e3, 1e3) for _ in range(500)],
+        [rng.randint(1, 10 ** 6) for _ in range(500)],
+    ]
+    for numbers in inputs:
+        for operation in ("add", "subtract", "multiply", "divide"):
+            result = calculator.execute({"operation": operation, "numbers": numbers})
+            assert result == reference(operation, numbers)
+            assert type(result) is type(reference(operation, numbers))
+
+
+def test_binary_payload_matches_pure_path_within_tolerance():
+    """numbers_b64 agrees with the list path, with and without NumPy"""
+    calculator = CalculatorTool()
+    rng = random.Random(7)
+    numbers = [rng.uniform(0.5, 1.5) for _ in range(max(4096, vectorized.DEFAULT_VECTOR_THRESHOLD * 2))]
+    payload = encode(numbers)
+    bound = len(numbers) * 2 ** -53 * sum(abs(x) for x in numbers)
+
+    saved = vectorized.np
+    try:
+        for np_module in (saved, None):
+            vectorized.np = np_module
+            for operation in ("add", "subtract", "multiply", "divide"):
+                expected = calculator.execute({"operation": operation, "numbers": numbers})
+                result = calculator.execute({"operation": operation, "numbers_b64": payload})
+                if operation in ("add", "subtract"):
+                    assert abs(result - expected) <= bound
+                else:
+                    assert result == expected
+    finally:
+        vectorized.np = saved
+
+
+def test_binary_payload_errors():
+    """Malformed payloads and zero divisors raise ValueError"""
+    calculator = CalculatorTool()
+    for params, message in (
+        ({"operation": "add", "numbers_b64": "not base64!"}, "not valid base64"),
+        ({"operation": "add", "numbers_b64": base64.b64encode(b"abc").decode()}, "8 bytes each"),
+        ({"operation": "divide", "numbers_b64": encode([1.0] + [0.0] * 5000)}, "Division by zero"),
+        ({"operation": "add", "numbers_b64": encode([1.0])}, "At least two numbers"),
+    ):
+        try:
+            calculator.execute(params)
+        except ValueError as e:
+            assert message in str(e)
+        else:
+            raise AssertionError(f"expected ValueError for {params['numbers_b64'][:16]}")
+
+
+def test_batched_operations_match_per_row_results():
+    """2-D numbers reduce per row (axis 1) or element-wise (axis 0), vectorized or not"""
+    calculator = CalculatorTool()
+    rng = random.Random(11)
+    int_rows = [[rng.randint(-1000, 1000) or 1 for _ in range(4)] for _ in range(vectorized.DEFAULT_VECTOR_THRESHOLD)]
+    float_rows = [[rng.uniform(0.5, 1.5) for _ in range(4)] for _ in range(vectorized.DEFAULT_VECTOR_THRESHOLD)]
+    operations = ("add", "subtract", "multiply", "divide", "mean", "min", "max", "sum_of_squares")
+
+    saved = vectorized.np
+    try:
+        for np_module in (saved, None):
+            vectorized.np = np_module
+            for rows in (int_rows, float_rows):
+                for operation in operations:
+                    by_row = calculator.execute({"operation": operation, "numbers": rows})
+                    by_column = calculator.execute({"operation": operation, "numbers": rows, "axis": 0})
+                    single = {"operation": operation}
+                    expected_rows = [calculator.execute(dict(single, numbers=row)) for row in rows]
+                    expected_columns = [calculator.execute(dict(single, numbers=list(col))) for col in zip(*rows)]
+                    for result, expected in zip(by_row + by_column, expected_rows + expected_columns):
+                        if isinstance(expected, int):
+                            assert result == expected
+                        else:
+                            assert abs(result - expected) <= 1e-9 * max(1, abs(expected))
+                    if rows is int_rows and operation in ("add", "subtract", "min", "max", "sum_of_squares"):
+                        assert by_row == expected_rows and all(type(r) is int for r in by_row)
+    finally:
+        vectorized.np = saved
+
+
+def test_dot_and_aggregates():
+    """dot works on a vector or a batch; aggregates fold a single vector"""
+    calculator = CalculatorTool()
+    assert calculator.execute({"operation": "dot", "numbers": [1, 2, 3], "vector": [4, 5, 6]}) == 32
+    assert calculator.execute({"operation": "dot", "numbers": [[1, 2, 3], [1, 1, 1]], "vector": [4, 5, 6]}) == [32, 15]
+    assert calculator.execute({"operation": "mean", "numbers": [1, 2, 6]}) == 3.0
+    assert calculator.execute({"operation": "min", "numbers": [3, -1, 2]}) == -1
+    assert calculator.execute({"operation": "max", "numbers": [3, -1, 2]}) == 3
+    assert calculator.execute({"operation": "sum_of_squares", "numbers": [1, 2, 3]}) == 14
+    assert calculator.execute({"operation": "add", "numbers": [[1, 2], [3, 4]], "axis": 0}) == [4, 6]
+
+    for params, message in (
+        ({"operation": "add", "numbers": [[1, 2], [3]]}, "equal-length rows"),
+        ({"operation": "dot", "numbers": [1, 2], "vector": [1]}, "one entry per column"),
+        ({"operation": "dot", "numbers": [1, 2]}, "requires a vector"),
+        ({"operation": "add", "numbers": [[1, 2]], "axis": 2}, "axis must be 0 or 1"),
+    ):
+        try:
+            calculator.execute(params)
+        except ValueError as e:
+            assert message in str(e)
+        else:
+            raise AssertionError(f"expected ValueError for {params}")
+
+
+def test_float_mode_sums_are_correctly_rounded():
+    """float mode uses compensated sums where the default accumulates rounding error"""
+    calculator = CalculatorTool()
+    rng = random.Random(5)
+    numbers = [rng.uniform(-1, 1) * 10 ** rng.randint(-8, 8) for _ in range(2000)]
+    exact = sum(Fraction(x) for x in numbers)
+    for params, expected in (
+        ({"operation": "add", "numbers": numbers}, float(exact)),
+        ({"operation": "subtract", "numbers": numbers}, float(2 * Fraction(numbers[0]) - exact)),
+        ({"operation": "mean", "numbers": numbers}, float(exact) / len(numbers)),
+        ({"operation": "add", "numbers": [1e16, 1.0, -1e16]}, 1.0),
+        ({"operation": "add", "numbers_b64": encode([0.1] * 10)}, 1.0),
+        ({"operation": "dot", "numbers": [1e20, 1.0, -1e20], "vector": [1.0, 1.0, 1.0]}, 1.0),
+        ({"operation": "add", "numbers": [[0.1] * 10, ["0.5"] + [0.25] * 9], "axis": 1}, [1.0, 2.75]),
+    ):
+        assert calculator.execute(dict(params, mode="float")) == expected
+    assert calculator.execute({"operation": "add", "numbers": [0.1] * 10}) == sum([0.1] * 10) != 1.0
+
+
+def test_decimal_and_fraction_modes_are_exact():
+    """Exact modes read JSON floats by their shortest repr and return strings"""
+    calculator = CalculatorTool()
+    for params, expected in (
+        ({"operation": "add", "numbers": [0.1, 0.2], "mode": "decimal"}, "0.3"),
+        ({"operation": "add", "numbers": [0.1, 0.2], "mode": "fraction"}, "3/10"),
+        ({"operation": "divide", "numbers": [1, 3], "mode": "decimal", "precision": 5}, "0.33333"),
+        ({"operation": "divide", "numbers": ["1/3", "2/7", 3], "mode": "fraction"}, "7/18"),
+        ({"operation": "mean", "numbers": ["1/3", "1/6"], "mode": "fraction"}, "1/4"),
+        ({"operation": "sum_of_squares", "numbers": ["1/2", "1/3"], "mode": "fraction"}, "13/36"),
+        ({"operation": "multiply", "numbers": ["1.5", "2.25e-3"], "mode": "decimal"}, "0.003375"),
+        ({"operation": "subtract", "numbers": ["1e30", 1, "-1e30"], "mode": "decimal", "precision": 40},
+         "1999999999999999999999999999999"),
+        ({"operation": "max", "numbers": ["1/3", 0.3], "mode": "fraction"}, "1/3"),
+        ({"operation": "add", "numbers": [[1, "0.5"], [2, 3]], "axis": 0, "mode": "decimal"}, ["3", "3.5"]),
+        ({"operation": "dot", "numbers": [[1, "1/2"], [2, 3]], "vector": [0.1, 2], "mode": "fraction"},
+         ["11/10", "31/5"]),
+    ):
+        assert calculator.execute(params) == expected, params
+
+    # Rows of one number fold to themselves in every mode
+    for operation in ("add", "subtract", "mean", "sum_of_squares", "multiply", "divide"):
+        results = [calculator.execute({"operation": operation, "numbers": [[1], [2]], "mode": mode})
+                   for mode in ("auto", "float", "decimal", "fraction")]
+        assert all([Fraction(value) for value in result] == [1, 4 if operation == "sum_of_squares" else 2]
+                   for result in results), (operation, results)
+
+    # Decimal sums round once, so the precision bounds the error of the whole sum
+    numbers = [f"{i}.{i % 7}1" for i in range(1, 3000)]
+    result = calculator.execute({"operation": "add", "numbers": numbers, "mode": "decimal", "precision": 8})
+    assert Decimal(result) == round(sum(map(Decimal, numbers)), 8 - 7)
+    exact = calculator.execute({"operation": "add", "numbers": numbers, "mode": "fraction"})
+    assert Fraction(exact) == sum(map(Fraction, numbers))
+
+
+def test_numeric_guards_and_mode_errors():
+    """Oversized operands and products are rejected before doing the work"""
+    calculator = CalculatorTool()
+    huge = 2 ** numeric.DEFAULT_MAX_OPERAND_BITS
+    too_many_factors = [2 ** (numeric.DEFAULT_MAX_OPERAND_BITS - 1)] * (numeric.DEFAULT_MAX_RESULT_BITS // numeric.DEFAULT_MAX_OPERAND_BITS + 1)
+    for params, message in (
+        ({"operation": "multiply", "numbers": too_many_factors}, "would exceed"),
+        ({"operation": "multiply", "numbers": too_many_factors, "mode": "fraction"}, "would exceed"),
+        ({"operation": "sum_of_squares", "numbers": [huge, 1]}, "at most"),
+        ({"operation": "add", "numbers": [huge, 1], "mode": "fraction"}, "at most"),
+        ({"operation": "add", "numbers": ["1e999999", 1], "mode": "decimal"}, "at most"),
+        ({"operation": "add", "numbers": ["1" * 100000, 1], "mode": "fraction"}, "at most"),
+        ({"operation": "add", "numbers": [f"1/{p}" for p in range(2, 40000)], "mode": "fraction"}, "would exceed"),
+        ({"operation": "add", "numbers": ["1e400", 1], "mode": "float"}, "float64 range"),
+        ({"operation": "add", "numbers": ["nan", 1], "mode": "decimal"}, "not a number"),
+        ({"operation": "add", "numbers": ["1/3", 1], "mode": "decimal"}, "not a number"),
+        ({"operation": "divide", "numbers": [1, "0.0"], "mode": "decimal"}, "Division by zero"),
+        ({"operation": "divide", "numbers": ["1/2", 0], "mode": "fraction"}, "Division by zero"),
+        ({"operation": "add", "numbers": [1, "2"]}, "require mode"),
+        ({"operation": "add", "numbers": [1, 2], "precision": 3}, "only applies to decimal"),
+        ({"operation": "add", "numbers": [1, 2], "mode": "decimal", "precision": numeric.DEFAULT_MAX_PRECISION + 1},
+         "precision must be"),
+        ({"operation": "add", "numbers": [1], "mode": "fraction"}, "At least two numbers"),
+    ):
+        try:
+            calculator.execute(params)
+        except ValueError as e:
+            assert message in str(e), (str(e), params["operation"])
+        else:
+            raise AssertionError(f"expected ValueError for {params['operation']} in {params.get('mode')}")
+
+    # Exact arithmetic runs inline only for a handful of operands
+    assert calculator.execution_for({"operation": "add", "numbers": [1] * 32, "mode": "fraction"}) == "inline"
+    assert calculator.execution_for({"operation": "add", "numbers": [1] * 33, "mode": "fraction"}) == "cpu"
+    assert calculator.execution_for({"operation": "add", "numbers": [1] * 33, "mode": "float"}) == "inline"
+    assert math.isclose(calculator.execute({"operation": "add", "numbers": [2.5, "1e3"], "mode": "float"}), 1002.5)
+
+
+def test_limits_are_passed_in_and_travel_with_the_tool():
+    """Configured limits shape the schema and the checks, also in a worker process"""
+    calculator = pickle.loads(pickle.dumps(CalculatorTool(max_numbers=3, limits=numeric.Limits(max_operand_bits=64))))
+    assert calculator.parameters["properties"]["numbers"]["maxItems"] == 3
+    for params, message in (
+        ({"operation": "add", "numbers": [1, 2, 3, 4]}, "At most 3 numbers"),
+        ({"operation": "sum_of_squares", "numbers": [2 ** 64, 1]}, "at most 64 bits"),
+        ({"operation": "add", "numbers": [2 ** 64, 1], "mode": "fraction"}, "at most 64 bits"),
+    ):
+        try:
+            calculator.execute(params)
+        except ValueError as e:
+            assert message in str(e), str(e)
+        else:
+            raise AssertionError(f"expected ValueError for {params}")
+    assert CalculatorTool().execute({"operation": "sum_of_squares", "numbers": [2 ** 64, 1]}) == 2 ** 128 + 1
+
+
+if __name__ == "__main__":
+    test_pure_path_matches_reference_exactly()
+    test_binary_payload_matches_pure_path_within_tolerance()
+    test_binary_payload_errors()
+    test_batched_operations_match_per_row_results()
+    test_dot_and_aggregates()
+    test_float_mode_sums_are_correctly_rounded()
+    test_decimal_and_fraction_modes_are_exact()
+    test_numeric_guards_and_mode_errors()
+    test_limits_are_passed_in_and_travel_with_the_tool()
+    print("All tests passed!")
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+import asyncio
+import os
+import time
+
+from calculator import CalculatorTool
+from executor import BatchExecutor, ToolExecutor
+from result_cache import ResultCache
+
+
+class SleepTool:
+    name = "sleep"
+    description = "Sleeps and echoes a value"
+    parameters = {"type": "object", "properties": {}}
+
+    async def execute(self, params):
+        await asyncio.sleep(params["delay"])
+        if params.get("fail"):
+            raise ValueError("boom")
+        return params["value"]
+
+
+class SyncTool:
+    name = "sync"
+    description = "Blocking sleep"
+    parameters = {"type": "object", "properties": {}}
+
+    def execute(self, params):
+        time.sleep(params["delay"])
+        return params["value"]
+
+
+class SpinTool:
+    name = "spin"
+    description = "Busy-loops in a worker process"
+    parameters = {"type": "object", "properties": {}}
+    execution = "cpu"
+
+    def execute(self, params):
+        deadline = time.perf_counter() + params["seconds"]
+        while time.perf_counter() < deadline:
+            pass
+        return os.getpid()
+
+
+TOOLS = {SleepTool.name: SleepTool(), SyncTool.name: SyncTool()}
+
+
+def test_batch_runs_concurrently_and_keeps_order():
+    """Async and sync calls overlap and results come back in call order"""
+    executor = BatchExecutor(TOOLS)
+    calls = [
+        {"name": "sleep" if i % 2 else "sync", "parameters": {"delay": 0.05 * (i % 3), "value": i}}
+        for i in range(20)
+    ]
+    start = time.perf_counter()
+    results = asyncio.run(executor.run(calls))
+    elapsed = time.perf_counter() - start
+
+    assert [r["result"] for r in results] == list(range(20))
+    assert all(r["status"] == "success" and "duration_ms" in r for r in results)
+    assert elapsed < 0.5
+
+
+def test_batch_concurrency_cap_and_unknown_tool():
+    """A per-batch cap serializes calls; unknown tools become error entries"""
+    executor = BatchExecutor(TOOLS)
+    calls = [{"name": "sleep", "parameters": {"delay": 0.02, "value": i}} for i in range(5)]
+    calls.append({"name": "missing", "parameters": {}})
+    start = time.perf_counter()
+    results = asyncio.run(executor.run(calls, concurrency=1))
+
+    assert time.perf_counter() - start >= 0.1
+    assert results[-1] == {"status": "error", "error": "Tool 'missing' not found", "duration_ms": results[-1]["duration_ms"]}
+
+    # Malformed entries fail on their own
+    results = asyncio.run(executor.run(["sleep", {"name": ["sleep"]}, {"name": "sleep", "parameters": {"delay": 0, "value": 1}}]))
+    assert [r.get("error") for r in results] == [
+        "Invalid params: a function call must be an object", "Invalid params: name must be a string", None
+    ]
+    assert results[2]["result"] == 1
+
+
+def test_batch_fail_fast_cancels_pending_calls():
+    """With fail_fast the first error cancels calls that have not finished"""
+    executor = BatchExecutor(TOOLS)
+    calls = [
+        {"name": "sleep", "parameters": {"delay": 0.0, "value": 0, "fail": True}},
+        {"name": "sleep", "parameters": {"delay": 1.0, "value": 1}},
+    ]
+    start = time.perf_counter()
+    results = asyncio.run(executor.run(calls, fail_fast=True))
+
+    assert time.perf_counter() - start < 0.5
+    assert results[0]["error"] == "boom"
+    assert results[1]["status"] == "error" and "Cancelled" in results[1]["error"]
+
+
+def test_batch_stream_emits_results_as_they_finish():
+    """Streamed entries arrive in completion order, tagged with their index"""
+    executor = BatchExecutor(TOOLS)
+    calls = [{"name": "sleep", "parameters": {"delay": delay, "value": i}} for i, delay in enumerate([0.1, 0.0, 0.05])]
+    calls.append({"name": "missing", "parameters": {}})
+    received = []
+
+    async def on_result(index, entry):
+        received.append((index, entry.get("result")))
+
+    counts = asyncio.run(executor.stream(calls, on_result))
+    assert sorted(received[:2]) == [(1, 1), (3, None)] and received[2:] == [(2, 2), (0, 0)]
+    assert counts == {"calls": 4, "succeeded": 3, "failed": 1}
+
+    # Cancelled calls are still reported once, after the rest
+    received.clear()
+    calls = [{"name": "sleep", "parameters": {"delay": 0.0, "value": 0, "fail": True}},
+             {"name": "sleep", "parameters": {"delay": 1.0, "value": 1}}]
+    counts = asyncio.run(executor.stream(calls, on_result, fail_fast=True))
+    assert [index for index, _ in received] == [0, 1] and counts["failed"] == 2
+
+
+def test_tool_executor_routes_by_execution_kind():
+    """Small calculator calls run inline, large ones go to the process pool"""
+    calculator = CalculatorTool()
+    executor = ToolExecutor(thread_workers=2, process_workers=1)
+    small = {"operation": "add", "numbers": [1, 2, 3]}
+    large = {"operation": "add", "numbers": list(range(10000))}
+    assert executor.execution_kind(calculator, small) == "inline"
+    assert executor.execution_kind(calculator, large) == "cpu"
+    assert executor.execution_kind(SyncTool(), {}) == "io"
+    assert executor.execution_kind(SleepTool(), {}) == "async"
+
+    async def run():
+        return [
+            await executor.execute(calculator, small),
+            await executor.execute(calculator, large),
+            await executor.execute(SyncTool(), {"delay": 0, "value": 7}),
+        ]
+
+    try:
+        assert asyncio.run(run()) == [6, sum(range(10000)), 7]
+        stats = executor.stats()
+        assert stats["process_pool"]["completed"] == 1
+        assert stats["thread_pool"]["completed"] == 1
+        assert stats["process_pool"]["in_flight"] == 0
+    finally:
+        executor.shutdown()
+
+
+def test_timeouts_bound_calls_and_request_deadlines():
+    """Tool and request timeouts turn slow calls into error entries"""
+    slow = SleepTool()
+    slow.timeout = 0.05
+    executor = BatchExecutor({"sleep": SleepTool(), "slow": slow}, timeout_ms=0)
+    calls = [
+        {"name": "slow", "parameters": {"delay": 1.0, "value": 0}},
+        {"name": "sleep", "parameters": {"delay": 0.01, "value": 1}},
+        {"name": "sleep", "parameters": {"delay": 1.0, "value": 2}},
+    ]
+    start = time.perf_counter()
+    results = asyncio.run(executor.run(calls, timeout=0.2))
+
+    assert time.perf_counter() - start < 0.5
+    assert results[0]["error"] == "Tool 'slow' timed out after 0.05 s"
+    assert results[1]["result"] == 1
+    assert results[2]["status"] == "error" and "timed out" in results[2]["error"]
+    assert BatchExecutor(TOOLS, timeout_ms=0).timeout is None and BatchExecutor(TOOLS, timeout_ms=1500).timeout == 1.5
+
+    # Calls still waiting for a slot when the deadline passes do not start
+    results = asyncio.run(executor.run(calls[1:] * 3, concurrency=1, timeout=0.03))
+    assert results[-1]["error"] == "Request deadline passed before the call started"
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+class CachedSleepTool(SleepTool):
+    name = "cached_sleep"
+    deterministic = True
+
+
+def test_cached_calls_keep_their_own_deadlines():
+    """Callers sharing one cached computation each time out at their own deadline"""
+    executor = BatchExecutor({CachedSleepTool.name: CachedSleepTool()}, cache=ResultCache(max_entries=8))
+    call = {"name": "cached_sleep", "parameters": {"delay": 0.4, "value": 7}}
+
+    async def joined(first_timeout, second_timeout):
+        first = asyncio.ensure_future(executor.run([call], timeout=first_timeout))
+        await asyncio.sleep(0.01)
+        start = time.perf_counter()
+        second = await executor.run([call], timeout=second_timeout)
+        elapsed = time.perf_counter() - start
+        return (await first)[0], second[0], elapsed
+
+    # A short deadline joining a longer computation gives up on time
+    long_entry, short_entry, elapsed = asyncio.run(joined(1.0, 0.1))
+    assert long_entry["result"] == 7
+    assert "timed out" in short_entry["error"] and elapsed < 0.3
+
+    # The computation outlives its first caller's deadline for the others
+    executor.cache.clear()
+    short_entry, long_entry, _ = asyncio.run(joined(0.1, 1.0))
+    assert "timed out" in short_entry["error"] and long_entry["result"] == 7
+
+
+def test_cpu_calls_are_killed_when_abandoned():
+    """A timed-out or cancelled CPU call's worker is killed; other calls are retried"""
+    tool_executor = ToolExecutor(thread_workers=1, process_workers=2)
+    spin = SpinTool()
+    spin.timeout = 0.3
+    executor = BatchExecutor({"spin": spin, "work": SpinTool()}, tool_executor, timeout_ms=0)
+
+    async def run():
+        # Start the workers, and remember which processes they are
+        pids = set(await asyncio.gather(*(tool_executor.execute(SpinTool(), {"seconds": 0.2}) for _ in range(2))))
+        results = await executor.run([
+            {"name": "spin", "parameters": {"seconds": 60}},
+            {"name": "work", "parameters": {"seconds": 0.5}},
+        ])
+
+        cancelled = asyncio.ensure_future(tool_executor.execute(SpinTool(), {"seconds": 60}))
+        await asyncio.sleep(0.3)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        return pids, results
+
+    start = time.perf_counter()
+    try:
+        pids, results = asyncio.run(run())
+        assert time.perf_counter() - start < 10
+        assert results[0]["error"] == "Tool 'spin' timed out after 0.3 s"
+        # The second call lost its worker along with the pool and ran again
+        assert results[1]["status"] == "success" and results[1]["result"] not in pids
+        # The broken pool's workers are all gone (they may take a moment to be reaped)
+        deadline = time.perf_counter() + 5
+        while any(is_alive(pid) for pid in pids) and time.perf_counter() < deadline:
+            time.sleep(0.05)
+        assert not any(is_alive(pid) for pid in pids)
+        # Cancelling the last call killed its worker too, so no pool is left to reuse
+        assert tool_executor._process_pool is None
+        assert tool_executor.stats()["process_pool"]["in_flight"] == 0
+    finally:
+        tool_executor.shutdown()
+
+
+if __name__ == "__main__":
+    test_batch_runs_concurrently_and_keeps_order()
+    test_batch_concurrency_cap_and_unknown_tool()
+    test_batch_fail_fast_cancels_pending_calls()
+    test_batch_stream_emits_results_as_they_finish()
+    test_tool_executor_routes_by_execution_kind()
+    test_timeouts_bound_calls_and_request_deadlines()
+    test_cached_calls_keep_their_own_deadlines()
+    test_cpu_calls_are_killed_when_abandoned()
+    print("All tests passed!")
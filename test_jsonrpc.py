@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+import asyncio
+
+import jsonrpc
+
+
+async def echo_handler(request):
+    await asyncio.sleep(0)
+    if request["method"] == "fail":
+        raise RuntimeError("handler failed")
+    return jsonrpc.result_response(request.get("params"), request.get("id"))
+
+
+def test_codec_round_trip_keeps_big_integers_exact():
+    """Integers wider than 64 bits survive loads and dumps unchanged"""
+    message = {"jsonrpc": "2.0", "result": [2 ** 70, -(2 ** 80), 1.5, "é"], "error": None, "id": 1}
+    assert jsonrpc.loads(jsonrpc.dumps(message)) == message
+    assert jsonrpc.loads(b'{"x": NaN}')["x"] != jsonrpc.loads(b'{"x": NaN}')["x"]
+    # Only integer tokens send a message to the slower exact parser
+    assert jsonrpc._has_long_integer(b'[1, -12345678901234567890]')
+    assert jsonrpc._has_long_integer(b'12345678901234567890')
+    assert not jsonrpc._has_long_integer(b'[0.00012345678901234567, 1e-0000000000000000000001, 1E+0000000000000000000002]')
+
+
+def test_parse_request_validation():
+    """Invalid requests raise JsonRpcError with the offending field"""
+    request = jsonrpc.parse_request({"jsonrpc": "2.0", "method": "list_tools", "id": "a"})
+    assert (request.method, request.params, request.id) == ("list_tools", None, "a")
+    for data, field in (
+        ([], "JSON object"),
+        ({"jsonrpc": "1.0", "method": "x"}, "jsonrpc"),
+        ({"jsonrpc": "2.0", "method": 1}, "method"),
+        ({"jsonrpc": "2.0", "method": "x", "params": [1]}, "params"),
+        ({"jsonrpc": "2.0", "method": "x", "id": 1.5}, "id"),
+    ):
+        try:
+            jsonrpc.parse_request(data)
+        except jsonrpc.JsonRpcError as e:
+            assert e.code == jsonrpc.PARSE_ERROR and field in e.data
+        else:
+            raise AssertionError(f"expected JsonRpcError for {data}")
+
+
+def test_dispatch_batch_mixed_members():
+    """Each member gets its own response in order; notifications get none"""
+    batch = [
+        {"jsonrpc": "2.0", "method": "echo", "params": {"n": 1}, "id": 1},
+        {"jsonrpc": "2.0", "method": "echo", "params": {"n": 2}},
+        1,
+        {"jsonrpc": "2.0", "method": 5, "id": 3},
+        {"jsonrpc": "2.0", "method": "fail", "id": 4},
+        {"jsonrpc": "2.0", "method": "echo", "params": {"n": 5}, "id": "five"},
+    ]
+    responses = asyncio.run(jsonrpc.dispatch_batch(batch, echo_handler))
+
+    assert [r["id"] for r in responses] == [1, None, 3, 4, "five"]
+    assert responses[0]["result"] == {"n": 1}
+    assert responses[1]["error"]["code"] == jsonrpc.INVALID_REQUEST
+    assert responses[2]["error"]["code"] == jsonrpc.INVALID_REQUEST
+    assert responses[3]["error"] == {"code": jsonrpc.INTERNAL_ERROR, "message": "Internal error", "data": "handler failed"}
+    assert responses[4]["result"] == {"n": 5}
+
+
+def test_dispatch_batch_edge_cases():
+    """Empty batches are an error; notification-only batches have no response"""
+    empty = asyncio.run(jsonrpc.dispatch_batch([], echo_handler))
+    assert empty["error"]["code"] == jsonrpc.INVALID_REQUEST
+
+    notifications = [{"jsonrpc": "2.0", "method": "echo"}, {"jsonrpc": "2.0", "method": "echo"}]
+    assert asyncio.run(jsonrpc.dispatch_batch(notifications, echo_handler)) is None
+
+
+if __name__ == "__main__":
+    test_codec_round_trip_keeps_big_integers_exact()
+    test_parse_request_validation()
+    test_dispatch_batch_mixed_members()
+    test_dispatch_batch_edge_cases()
+    print("All tests passed!")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+import json
+import logging
+
+from loguru import logger
+
+from logging_setup import DebugRateLimit, InterceptHandler, json_format
+
+
+def test_debug_records_are_rate_limited_and_json_formatted():
+    """Debug records beyond the budget are dropped and counted; every record is one JSON line"""
+    lines = []
+    limit = DebugRateLimit(2)
+    handler_id = logger.add(lines.append, level="DEBUG", format=json_format, filter=limit)
+    try:
+        for i in range(5):
+            logger.debug("call {}", i)
+        logger.info("kept")
+        limit.tokens = 1
+        logger.bind(request_id=7).debug("after")
+    finally:
+        logger.remove(handler_id)
+
+    records = [json.loads(line) for line in lines]
+    assert [r["message"] for r in records] == ["call 0", "call 1", "kept", "after"]
+    assert records[-1]["suppressed"] == 3 and records[-1]["request_id"] == 7
+    assert records[2]["level"] == "INFO" and "json" not in records[2]
+
+
+def test_standard_logging_is_routed_to_loguru():
+    lines = []
+    handler_id = logger.add(lines.append, format=json_format)
+    stdlib_logger = logging.getLogger("uvicorn.access")
+    stdlib_logger.addHandler(InterceptHandler())
+    stdlib_logger.propagate = False
+    try:
+        stdlib_logger.warning("GET /health %s", 200)
+    finally:
+        stdlib_logger.handlers.clear()
+        stdlib_logger.propagate = True
+        logger.remove(handler_id)
+
+    record = json.loads(lines[0])
+    assert record["message"] == "GET /health 200" and record["logger"] == "uvicorn.access"
+    assert record["function"] == "test_standard_logging_is_routed_to_loguru"
+
+
+if __name__ == "__main__":
+    test_debug_records_are_rate_limited_and_json_formatted()
+    test_standard_logging_is_routed_to_loguru()
+    print("All tests passed!")
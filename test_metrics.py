@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+import asyncio
+import os
+import threading
+import time
+
+import jsonrpc
+from metrics import Histogram, ServerMetrics
+from router import Context, Router
+from sessions import Session
+
+
+def test_histogram_merges_thread_shards():
+    """Each thread records into its own shard; scraping sums them"""
+    histogram = Histogram("latency_seconds", "Latency", ("method",), buckets=(0.1, 1.0))
+
+    def record():
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(("add",), value)
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    series = histogram.collect()[("add",)]
+    assert series[:3] == [4, 4, 4] and abs(series[3] - 22.2) < 1e-9
+    lines = list(histogram.samples(histogram.collect()))
+    assert 'latency_seconds_bucket{method="add",le="0.1"} 4' in lines
+    assert 'latency_seconds_bucket{method="add",le="+Inf"} 12' in lines
+    assert 'latency_seconds_count{method="add"} 12' in lines
+
+
+def test_server_metrics_track_methods_and_error_codes():
+    metrics = ServerMetrics()
+    router = Router()
+    router.use(metrics.middleware)
+
+    @router.method("ping", requires_init=False)
+    async def ping(request, context):
+        return "pong"
+
+    context = Context(Session(), "stdio")
+
+    async def run():
+        return await metrics.track("stdio", "stdio", router.handle([
+            {"jsonrpc": "2.0", "method": "ping", "id": 1},
+            {"jsonrpc": "2.0", "method": "missing", "id": 2},
+            {"jsonrpc": "2.0", "id": 3}
+        ], context))
+
+    asyncio.run(run())
+    metrics.count_errors("stdio", "stdio", jsonrpc.error_response(jsonrpc.PARSE_ERROR, "Parse error"))
+    text = metrics.render().decode()
+    assert 'mcp_request_duration_seconds_count{transport="stdio",endpoint="stdio"} 1' in text
+    assert 'mcp_method_duration_seconds_count{transport="stdio",method="ping"} 1' in text
+    assert 'mcp_errors_total{transport="stdio",endpoint="stdio",code="-32002"} 1' in text
+    assert 'mcp_errors_total{transport="stdio",endpoint="stdio",code="-32600"} 1' in text
+    assert 'mcp_errors_total{transport="stdio",endpoint="stdio",code="-32700"} 1' in text
+    assert 'mcp_requests_in_flight{transport="stdio",endpoint="stdio"} 0' in text
+
+
+def test_worker_snapshots_are_merged(tmp_path):
+    """Counters and histograms add up across workers; stale gauges are dropped"""
+    metrics = ServerMetrics(shared_dir=str(tmp_path))
+    metrics.errors.inc(("http", "/", "-32601"))
+    metrics.request_duration.observe(("http", "/"), 0.01)
+    metrics.loop_lag.set(("http",), 0.25)
+
+    other = metrics.registry.snapshot()
+    other["pid"] = os.getpid() + 1
+    metrics.shared._own = os.path.join(str(tmp_path), f"worker-{other['pid']}.json")
+    metrics.shared.write(other)
+    stale = dict(other, time=time.time() - 60)
+    metrics.shared._own = os.path.join(str(tmp_path), "worker-0.json")
+    metrics.shared.write(stale)
+    metrics.shared._own = os.path.join(str(tmp_path), f"worker-{os.getpid()}.json")
+    metrics.loop_lag.set(("http",), 0.1)
+
+    text = metrics.render().decode()
+    assert 'mcp_errors_total{transport="http",endpoint="/",code="-32601"} 3' in text
+    assert 'mcp_request_duration_seconds_count{transport="http",endpoint="/"} 3' in text
+    assert 'mcp_event_loop_lag_seconds{loop="http"} 0.25' in text
+
+
+if __name__ == "__main__":
+    import tempfile
+    test_histogram_merges_thread_shards()
+    test_server_metrics_track_methods_and_error_codes()
+    test_worker_snapshots_are_merged(tempfile.mkdtemp())
+    print("All tests passed!")
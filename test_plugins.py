@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+from executor import BatchExecutor, ToolExecutor
+from plugins import PluginManager
+from result_cache import ResultCache
+from tool_registry import ToolRegistry
+
+PLUGIN_SOURCE = '''
+import json
+
+MANIFEST = [
+    {{
+        "name": "scale",
+        "description": "Multiplies numbers by a factor",
+        "parameters": {{"type": "object", "properties": {{"numbers": {{"type": "array"}}}}}},
+        "tool": "ScaleTool",
+        "deterministic": True
+    }},
+    {{"name": "{second}", "tool": "ECHO"}}
+]
+
+
+class ScaleTool:
+    name = "scale"
+    execution = "{execution}"
+
+    def execute(self, params):
+        return [n * {factor} for n in params["numbers"]]
+
+
+class EchoTool:
+    name = "{second}"
+
+    async def execute(self, params):
+        return params
+
+
+ECHO = EchoTool()
+'''
+
+
+def write_plugin(directory, factor=2, second="echo", execution="inline", name="tools.py"):
+    path = os.path.join(directory, name)
+    with open(path, "w") as plugin:
+        plugin.write(PLUGIN_SOURCE.format(factor=factor, second=second, execution=execution))
+    # A distinct mtime even on coarse-grained file systems
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9 * factor))
+    return path
+
+
+def test_plugins_register_from_manifest_and_import_on_first_call():
+    """Discovery reads manifests only; the module is imported by the first call"""
+    with tempfile.TemporaryDirectory() as directory:
+        write_plugin(directory)
+        registry = ToolRegistry()
+        manager = PluginManager(registry, directory=directory)
+
+        assert manager.scan() == {"added": ["scale", "echo"], "updated": [], "removed": []}
+        assert "mcp_plugin_tools" not in sys.modules
+        assert json.loads(registry.catalog.body)["scale"]["description"] == "Multiplies numbers by a factor"
+        assert registry["echo"].parameters == {"type": "object", "properties": {}}
+        assert manager.scan() == {"added": [], "updated": [], "removed": []}
+
+        executor = BatchExecutor(registry, ToolExecutor(thread_workers=2, process_workers=1))
+        results = asyncio.run(executor.run([
+            {"name": "scale", "parameters": {"numbers": [1, 2]}},
+            {"name": "echo", "parameters": {"x": 1}}
+        ]))
+        assert [entry["result"] for entry in results] == [[2, 4], {"x": 1}]
+        assert "mcp_plugin_tools" in sys.modules
+
+
+def test_plugins_hot_reload_atomically_and_clear_cached_results():
+    """Changed files re-register as one catalog version; removed files unregister"""
+    with tempfile.TemporaryDirectory() as directory:
+        write_plugin(directory)
+        registry = ToolRegistry()
+        cache = ResultCache(max_entries=10)
+        manager = PluginManager(registry, cache, directory)
+        manager.scan()
+        executor = BatchExecutor(registry, ToolExecutor(thread_workers=2, process_workers=1), cache=cache)
+        call = [{"name": "scale", "parameters": {"numbers": [3]}}]
+        assert asyncio.run(executor.run(call))[0]["result"] == [6]
+
+        version = registry.version
+        write_plugin(directory, factor=3, second="echo2")
+        assert manager.scan() == {"added": [], "updated": ["scale", "echo2"], "removed": ["echo"]}
+        assert registry.version == version + 1
+        assert set(json.loads(registry.catalog.body)) == {"scale", "echo2"}
+        # The cached result of the old version is gone and the module is re-imported
+        assert asyncio.run(executor.run(call))[0]["result"] == [9]
+
+        # A broken edit keeps the last good version registered
+        with open(os.path.join(directory, "tools.py"), "a") as plugin:
+            plugin.write("MANIFEST = [\n")
+        assert manager.scan() == {"added": [], "updated": [], "removed": []}
+        assert "scale" in registry
+
+        os.remove(os.path.join(directory, "tools.py"))
+        assert manager.scan()["removed"] == ["scale", "echo2"]
+        assert len(registry) == 0 and "mcp_plugin_tools" not in sys.modules
+
+
+def test_plugin_tools_run_in_process_pool_workers():
+    """CPU-bound plugin tools are pickled by reference and loaded by the worker"""
+    with tempfile.TemporaryDirectory() as directory:
+        write_plugin(directory, execution="cpu", name="cpu_tools.py")
+        registry = ToolRegistry()
+        PluginManager(registry, directory=directory).scan()
+        tool_executor = ToolExecutor(thread_workers=1, process_workers=1)
+        try:
+            results = asyncio.run(BatchExecutor(registry, tool_executor).run(
+                [{"name": "scale", "parameters": {"numbers": [5]}}]
+            ))
+        finally:
+            tool_executor.shutdown()
+        assert results[0]["result"] == [10]
+        assert tool_executor.stats()["process_pool"]["completed"] == 1
+
+
+CHECKED_PLUGIN_SOURCE = '''
+import time
+
+from schema import ValidationError
+
+MANIFEST = [{"name": "positive", "tool": "PositiveTool"}]
+
+time.sleep(0.5)  # a slow import
+
+
+class PositiveTool:
+    name = "positive"
+
+    def validate(self, params):
+        if params.get("n", 0) < 0:
+            raise ValidationError("must not be negative", ["n"])
+
+    def execute(self, params):
+        return params["n"]
+'''
+
+BROKEN_PLUGIN_SOURCE = '''
+MANIFEST = [{"name": "broken", "tool": "BrokenTool"}]
+
+raise RuntimeError("plugin failed to import")
+'''
+
+
+def test_plugin_checks_never_import_on_the_event_loop():
+    """Validation skips unloaded plugins; the executor loads them off-loop and reports failures per call"""
+    with tempfile.TemporaryDirectory() as directory:
+        for name, source in (("checked.py", CHECKED_PLUGIN_SOURCE), ("broken.py", BROKEN_PLUGIN_SOURCE)):
+            with open(os.path.join(directory, name), "w") as plugin:
+                plugin.write(source)
+        registry = ToolRegistry()
+        PluginManager(registry, directory=directory).scan()
+
+        # Neither call imports its plugin: both are checked against the manifest only
+        registry.validate("positive", {"n": -1})
+        registry.validate("broken", {})
+        assert "mcp_plugin_checked" not in sys.modules
+
+        executor = BatchExecutor(registry, ToolExecutor(thread_workers=2, process_workers=1))
+        results = asyncio.run(executor.run([
+            {"name": "positive", "parameters": {"n": -1}},
+            {"name": "broken", "parameters": {}},
+            {"name": "positive", "parameters": {"n": 2}}
+        ]))
+        assert results[0]["status"] == "error" and results[0]["error"] == "/n: must not be negative"
+        assert results[1]["status"] == "error" and "plugin failed to import" in results[1]["error"]
+        assert results[2]["result"] == 2
+
+        # Once loaded, the tool's checks run with the schema
+        try:
+            registry.validate("positive", {"n": -1})
+            raise AssertionError("expected ValidationError")
+        except ValueError as e:
+            assert str(e) == "/n: must not be negative"
+
+
+if __name__ == "__main__":
+    test_plugins_register_from_manifest_and_import_on_first_call()
+    test_plugins_hot_reload_atomically_and_clear_cached_results()
+    test_plugin_tools_run_in_process_pool_workers()
+    test_plugin_checks_never_import_on_the_event_loop()
+    print("All tests passed!")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+import asyncio
+import time
+
+from calculator import CalculatorTool
+from result_cache import ResultCache, is_deterministic
+
+
+def test_cache_hits_regardless_of_key_order_and_skips_errors():
+    cache = ResultCache(max_entries=8)
+    calculator = CalculatorTool()
+    computed = []
+
+    async def call(params):
+        async def compute():
+            computed.append(params)
+            return calculator.execute(params)
+        return await cache.get_or_compute("calculator", params, compute)
+
+    async def run():
+        first = await call({"operation": "add", "numbers": [1, 2, 3]})
+        second = await call({"numbers": [1, 2, 3], "operation": "add"})
+        try:
+            await call({"operation": "divide", "numbers": [1, 0]})
+        except ValueError:
+            pass
+        try:
+            await call({"operation": "divide", "numbers": [1, 0]})
+        except ValueError:
+            pass
+        return first, second
+
+    assert asyncio.run(run()) == (6, 6)
+    assert len(computed) == 3 and is_deterministic(calculator)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 3, 1)
+
+
+def test_cache_coalesces_concurrent_identical_calls():
+    cache = ResultCache(max_entries=8)
+    computed = []
+
+    async def compute():
+        computed.append(1)
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_compute("slow", {"x": 1}, compute) for _ in range(10)))
+
+    assert asyncio.run(run()) == [42] * 10
+    assert len(computed) == 1
+    assert cache.stats()["coalesced"] == 9 and cache.stats()["in_flight"] == 0
+
+
+def test_cache_evicts_lru_by_count_and_bytes_and_expires():
+    cache = ResultCache(max_entries=2, max_bytes=10, ttl=60)
+    a, b, c = (cache.key("t", {"n": n}) for n in range(3))
+    cache.put(a, 1)
+    cache.put(b, 2)
+    assert cache.get(a) == (True, 1)  # a is now most recently used
+    cache.put(c, 3)
+    assert cache.get(b) == (False, None) and cache.get(a) == (True, 1)
+
+    assert not cache.put(b, "x" * 20)  # larger than the whole budget
+    cache.put(b, "12345678")  # 10 bytes as JSON, so everything else goes
+    assert cache.stats()["entries"] == 1 and cache.stats()["bytes"] == 10
+
+    cache._entries[b].expires = time.monotonic() - 1
+    assert cache.get(b) == (False, None)
+    stats = cache.stats()
+    assert (stats["evictions"], stats["expirations"], stats["uncacheable"]) == (3, 1, 1)
+
+
+if __name__ == "__main__":
+    test_cache_hits_regardless_of_key_order_and_skips_errors()
+    test_cache_coalesces_concurrent_identical_calls()
+    test_cache_evicts_lru_by_count_and_bytes_and_expires()
+    print("All tests passed!")
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+import asyncio
+
+import jsonrpc
+from config import ServerConfig
+from router import Context, Router
+from sessions import Session
+
+
+def make_router(calls):
+    router = Router()
+
+    @router.method("hello", requires_init=False)
+    async def hello(request, context):
+        calls.append("handler")
+        return f"hello {request.params['name']}"
+
+    @router.method("fail")
+    async def fail(request, context):
+        raise jsonrpc.JsonRpcError(jsonrpc.INVALID_PARAMS, "Invalid params", "name: required")
+
+    async def outer(request, context, call_next):
+        calls.append("outer")
+        return await call_next(request, context)
+
+    async def inner(request, context, call_next):
+        calls.append("inner")
+        return (await call_next(request, context)).upper()
+
+    router.use(outer)
+    router.use(inner)
+    return router
+
+
+def test_router_dispatch_and_middleware():
+    """Methods are dispatched through the middleware chain, outermost first"""
+    calls = []
+    router = make_router(calls)
+    context = Context(Session(), "test")
+
+    async def run():
+        return await router.handle([
+            {"jsonrpc": "2.0", "method": "hello", "params": {"name": "mcp"}, "id": 1},
+            {"jsonrpc": "2.0", "method": "fail", "id": 2},
+            {"jsonrpc": "2.0", "method": "missing", "id": 3}
+        ], context)
+
+    hello, fail, missing = asyncio.run(run())
+    assert hello["result"] == "HELLO MCP" and calls == ["outer", "inner", "handler"]
+    assert fail["error"]["code"] == jsonrpc.SERVER_NOT_INITIALIZED
+    assert missing["error"]["code"] == jsonrpc.SERVER_NOT_INITIALIZED
+
+    context.session.initialized = True
+    fail, missing = asyncio.run(run())[1:]
+    assert fail["error"] == {"code": jsonrpc.INVALID_PARAMS, "message": "Invalid params", "data": "name: required"}
+    assert missing["error"]["code"] == jsonrpc.METHOD_NOT_FOUND
+
+
+def test_requests_can_be_cancelled_by_id():
+    """A cancelled request is answered with -32800; cancel notifications get no response"""
+    router = Router()
+
+    @router.method("wait", requires_init=False)
+    async def wait(request, context):
+        await asyncio.sleep(10)
+
+    @router.method("cancel", requires_init=False)
+    async def cancel(request, context):
+        context.session.cancel(request.params["requestId"])
+
+    context = Context(Session(), "test")
+
+    async def run():
+        waiting = asyncio.ensure_future(router.handle({"jsonrpc": "2.0", "method": "wait", "id": "a"}, context))
+        await asyncio.sleep(0.01)
+        assert "a" in context.session.requests
+        notification = await router.handle({"jsonrpc": "2.0", "method": "cancel", "params": {"requestId": "a"}},
+                                           context)
+        acknowledged = await router.handle(
+            {"jsonrpc": "2.0", "method": "cancel", "params": {"requestId": "unknown"}, "id": 2}, context
+        )
+        return await waiting, notification, acknowledged
+
+    cancelled, notification, acknowledged = asyncio.run(run())
+    assert cancelled["error"] == {"code": jsonrpc.REQUEST_CANCELLED, "message": "Request cancelled"}
+    assert cancelled["id"] == "a"
+    assert notification is None and acknowledged["result"] is None
+    assert not context.session.requests and not context.session.cancelled
+
+
+def test_requests_without_an_id_are_never_answered():
+    """Id-less requests get no response alone or in a batch, errors included; invalid ones still do"""
+    router = Router()
+    handled = []
+
+    @router.method("echo")
+    async def echo(request, context):
+        handled.append(request.params)
+        return request.params
+
+    context = Context(Session(), "test")
+
+    async def run():
+        return [
+            await router.handle({"jsonrpc": "2.0", "method": "echo", "params": {"n": 1}}, context),
+            await router.handle([{"jsonrpc": "2.0", "method": "echo", "params": {"n": 2}}], context),
+            await router.handle({"jsonrpc": "2.0", "method": "missing"}, context),
+            await router.handle({"jsonrpc": "2.0", "method": 5}, context),
+        ]
+
+    context.session.initialized = True
+    single, batch, missing, invalid = asyncio.run(run())
+    assert single is None and batch is None and missing is None
+    assert invalid["error"]["code"] == jsonrpc.PARSE_ERROR
+    assert handled == [{"n": 1}, {"n": 2}]
+
+
+def test_server_config_from_env():
+    config = ServerConfig.from_env({"MCP_HTTP_MODE": "1", "MCP_WS_MAX_IN_FLIGHT": "8", "MCP_STDIO_MAX_IN_FLIGHT": "x",
+                                    "MCP_WS_PER_MESSAGE_DEFLATE": "0"})
+    assert config.http_mode and not config.stdio_mode
+    assert config.ws_max_in_flight == 8 and config.stdio_max_in_flight == ServerConfig().stdio_max_in_flight
+    assert not config.ws_per_message_deflate
+    assert (config.http_host, config.http_port, config.http_workers) == ("0.0.0.0", 8000, 1)
+
+    config = ServerConfig.from_env({"MCP_HTTP_MODE": "1", "PORT": "9000", "MCP_HTTP_WORKERS": "4"})
+    assert config.http_port == 9000 and config.multi_worker
+    assert not ServerConfig.from_env({"MCP_HTTP_WORKERS": "4"}).multi_worker
+
+    config = ServerConfig.from_env({"MCP_LOG_FORMAT": "JSON", "MCP_LOG_DEBUG_RATE": "0"})
+    assert config.log_format == "json" and config.log_debug_rate == 0
+
+    config = ServerConfig.from_env({"MCP_RATE_LIMIT_RPS": "50", "MCP_MAX_IN_FLIGHT": "0", "MCP_MAX_REQUEST_BYTES": "-1"})
+    assert (config.rate_limit_rps, config.rate_limit_burst, config.max_in_flight) == (50, 0, 0)
+    assert config.max_request_bytes == 1
+
+    config = ServerConfig.from_env({"MCP_HTTP_SERVER": "Hypercorn", "MCP_HTTP_LOOP": "tokio", "MCP_HTTP_ACCESS_LOG": "0"})
+    assert (config.http_server, config.http_loop, config.http_parser) == ("hypercorn", "auto", "auto")
+    assert not config.http_access_log and config.http_keep_alive == 75
+
+    # Component settings: malformed values fall back to their defaults instead of failing at import
+    config = ServerConfig.from_env({"MCP_CALC_MAX_NUMBERS": "1e6", "MCP_RESULT_CACHE_TTL": "soon",
+                                    "MCP_SESSION_TTL": "60.5", "MCP_THREAD_POOL_SIZE": "3",
+                                    "MCP_CALC_MAX_OPERAND_BITS": "8", "MCP_TOOL_TIMEOUT_MS": "0"})
+    defaults = ServerConfig()
+    assert config.calc_max_numbers == defaults.calc_max_numbers and config.result_cache_ttl == defaults.result_cache_ttl
+    assert config.session_ttl == 60.5 and config.calc_max_operand_bits == 64 and config.tool_timeout_ms == 0
+    # The batch concurrency follows the thread pool size unless it is set
+    assert config.thread_pool_size == config.batch_concurrency == 3
+
+
+if __name__ == "__main__":
+    test_router_dispatch_and_middleware()
+    test_requests_can_be_cancelled_by_id()
+    test_requests_without_an_id_are_never_answered()
+    test_server_config_from_env()
+    print("All tests passed!")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+from calculator import CalculatorTool
+from schema import ValidationError, compile_schema
+from tool_registry import ToolRegistry
+
+
+def error_of(validate, value):
+    try:
+        validate(value)
+    except ValidationError as e:
+        return str(e)
+    return None
+
+
+def test_calculator_schema_errors_point_at_the_offending_value():
+    """Mismatches raise with the JSON Pointer of the value that failed"""
+    validate = compile_schema(CalculatorTool().parameters)
+
+    assert error_of(validate, {"operation": "add", "numbers": [1, 2.5, 3]}) is None
+    assert error_of(validate, {"operation": "add", "numbers": [[1, 2], [3, 4]], "axis": 0}) is None
+    assert error_of(validate, {"operation": "mean", "numbers_b64": "AAAA"}) is None
+    assert error_of(validate, {"operation": "add", "numbers": [1, 2], "axis": 1.0}) is None
+
+    assert error_of(validate, {"operation": "add", "numbers": [1, "2.5", "1/3"], "mode": "fraction"}) is None
+    assert error_of(validate, {"operation": "add", "numbers": [1, 2, None]}) == \
+        "/numbers/2: expected number or string or array, got null"
+    assert error_of(validate, {"operation": "add", "numbers": [[1, 2], [3, True]]}) == \
+        "/numbers/1/1: expected number or string, got boolean"
+    assert error_of(validate, {"operation": "add", "numbers": [[1, 2], []]}) == \
+        "/numbers/1: must have at least 1 item(s), got 0"
+    assert error_of(validate, {"operation": "add", "numbers": []}) == "/numbers: must have at least 1 item(s), got 0"
+    assert error_of(validate, {"operation": "pow", "numbers": [1]}).startswith("/operation: must be one of")
+    assert error_of(validate, {"operation": "add", "numbers": [1], "axis": 2}) == "/axis: must be one of [0, 1]"
+    assert error_of(validate, {"operation": "add", "numbers": [1], "mode": "exact"}).startswith("/mode: must be one of")
+    assert error_of(validate, {"operation": "add", "numbers": [1], "precision": 0}) == "/precision: must be >= 1"
+    assert error_of(validate, {"operation": "add", "numbers": [1], "axis": 0.5}) == \
+        "/axis: expected integer, got number"
+    assert error_of(validate, {"operation": "add"}).startswith("/: does not match any allowed schema")
+    assert error_of(validate, None) == "/: expected object, got null"
+
+
+def test_large_arrays_take_the_fast_path_but_keep_precise_errors():
+    """Bulk type checks accept large inputs; a single bad element is still located"""
+    validate = compile_schema(CalculatorTool().parameters)
+    numbers = [float(i) for i in range(100000)]
+    rows = [[1.0, 2, 3.5]] * 20000
+
+    assert error_of(validate, {"operation": "add", "numbers": numbers}) is None
+    assert error_of(validate, {"operation": "add", "numbers": rows}) is None
+
+    numbers[76543] = None
+    assert error_of(validate, {"operation": "add", "numbers": numbers}) == \
+        "/numbers/76543: expected number or string or array, got null"
+    rows = rows[:12345] + [[1.0, [], 3.0]] + rows[12345:]
+    assert error_of(validate, {"operation": "add", "numbers": rows}) == \
+        "/numbers/12345/1: expected number or string, got array"
+
+
+def test_schema_keywords():
+    """Objects, strings, bounds and combinators are enforced; annotations ignored"""
+    validate = compile_schema({
+        "type": "object",
+        "properties": {
+            "name": {"type": "string", "minLength": 2, "pattern": "^[a-z]+$"},
+            "count": {"type": "integer", "minimum": 1, "exclusiveMaximum": 10},
+            "tags": {"type": "array", "items": {"type": "string"}, "maxItems": 2},
+            "mode": {"oneOf": [{"type": "string"}, {"type": "null"}], "description": "ignored"},
+            "flag": {"const": True}
+        },
+        "required": ["name"],
+        "additionalProperties": False
+    })
+
+    assert error_of(validate, {"name": "ab", "count": 9, "tags": ["x"], "mode": None, "flag": True}) is None
+    assert error_of(validate, {"count": 1}) == "/: missing required property 'name'"
+    assert error_of(validate, {"name": "a"}) == "/name: must be at least 2 characters long"
+    assert error_of(validate, {"name": "AB"}) == "/name: must match pattern '^[a-z]+$'"
+    assert error_of(validate, {"name": "ab", "count": 10}) == "/count: must be < 10"
+    assert error_of(validate, {"name": "ab", "count": 0}) == "/count: must be >= 1"
+    assert error_of(validate, {"name": "ab", "tags": ["x", 1]}) == "/tags/1: expected string, got integer"
+    assert error_of(validate, {"name": "ab", "tags": ["x", "y", "z"]}) == "/tags: must have at most 2 item(s), got 3"
+    assert error_of(validate, {"name": "ab", "mode": 3}) == "/mode: expected string or null, got integer"
+    assert error_of(validate, {"name": "ab", "flag": 1}) == "/flag: must be one of [True]"
+    assert error_of(validate, {"name": "ab", "extra": 1}) == "/: unexpected property 'extra'"
+
+    assert compile_schema({}) is None
+
+
+def test_registry_compiles_validators_on_register():
+    """The registry validates by tool name and forgets validators with their tools"""
+    registry = ToolRegistry()
+    registry.register(CalculatorTool())
+    registry.validate("calculator", {"operation": "add", "numbers": [1, 2]})
+    assert error_of(lambda params: registry.validate("calculator", params),
+                    {"operation": "add", "numbers": [True]}) == "/numbers/0: expected number or string or array, got boolean"
+
+    registry.unregister("calculator")
+    registry.validate("calculator", {"operation": "add", "numbers": [True]})
+
+
+def test_registry_runs_tool_checks_after_the_schema():
+    """String operands are rejected up front in auto mode, naming the operand"""
+    registry = ToolRegistry()
+    registry.register(CalculatorTool())
+    validate = lambda params: registry.validate("calculator", params)
+    message = "string operands require mode float, decimal or fraction"
+    assert error_of(validate, {"operation": "add", "numbers": [1, "2"]}) == f"/numbers/1: {message}"
+    assert error_of(validate, {"operation": "add", "numbers": [[1, 2], [3, "4"]], "mode": "auto"}) == \
+        f"/numbers/1/1: {message}"
+    assert error_of(validate, {"operation": "dot", "numbers": [1, 2], "vector": [3, "4"]}) == f"/vector/1: {message}"
+    for mode in ("float", "decimal", "fraction"):
+        assert error_of(validate, {"operation": "add", "numbers": [1, "2"], "mode": mode}) is None
+    # The schema is checked first
+    assert error_of(validate, {"operation": "add", "numbers": ["1", None]}).startswith("/numbers/1: expected")
+
+
+if __name__ == "__main__":
+    test_calculator_schema_errors_point_at_the_offending_value()
+    test_large_arrays_take_the_fast_path_but_keep_precise_errors()
+    test_schema_keywords()
+    test_registry_compiles_validators_on_register()
+    test_registry_runs_tool_checks_after_the_schema()
+    print("All tests passed!")
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+import time
+
+from sessions import SessionManager
+
+
+def test_session_manager_evicts_lru_and_expires_idle():
+    """Stored sessions are bounded by count (LRU) and by idle time (TTL)"""
+    manager = SessionManager(max_sessions=2, ttl=60)
+    first, second = manager.create(), manager.create()
+    assert manager.get(first.id) is first  # first is now most recently used
+    third = manager.create()
+    assert manager.get(second.id) is None
+    assert manager.get(first.id) is first and manager.get(third.id) is third
+
+    third.last_seen = time.monotonic() - 61
+    assert manager.get(third.id) is None
+    manager.remove(first.id)
+
+    connection = manager.open(initialized=True)
+    assert connection.initialized and connection.id is None
+    stats = manager.stats()
+    assert stats["http_sessions"] == 0 and stats["connections"] == 1
+    assert (stats["created"], stats["evicted"], stats["expired"], stats["closed"]) == (4, 1, 1, 1)
+    manager.release(connection)
+    assert manager.stats()["connections"] == 0
+
+
+if __name__ == "__main__":
+    test_session_manager_evicts_lru_and_expires_idle()
+    print("All tests passed!")
@@ -77,6 +77,48 @@ def test_stdio_mode():
     execute_response = json.loads(process.stdout.readline())
     print("Execute Response:", json.dumps(execute_response, indent=2))
     
+    # String operands need an exact or float mode: rejected before any call runs
+    process.stdin.write(json.dumps({
+        "jsonrpc": "2.0",
+        "method": "execute",
+        "params": {"function_calls": [{"name": "calculator", "parameters": {"operation": "add", "numbers": [1, "2"]}}]},
+        "id": 6
+    }) + "\n")
+    process.stdin.flush()
+    invalid_response = json.loads(process.stdout.readline())
+    assert invalid_response["error"]["code"] == -32602 and invalid_response["error"]["data"]["path"] == "/numbers/1"
+
+    process.stdin.write(json.dumps({
+        "jsonrpc": "2.0",
+        "method": "execute",
+        "params": {"function_calls": [], "concurrency": "abc"},
+        "id": 7
+    }) + "\n")
+    process.stdin.flush()
+    invalid_response = json.loads(process.stdout.readline())
+    assert invalid_response["error"] == {"code": -32602, "message": "Invalid params: concurrency must be a positive integer"}
+
+    # Streamed execute: one notification per call, then the response
+    stream_request = {
+        "jsonrpc": "2.0",
+        "method": "execute",
+        "params": {
+            "stream": True,
+            "function_calls": [
+                {"name": "calculator", "parameters": {"operation": "add", "numbers": [1, 2]}},
+                {"name": "calculator", "parameters": {"operation": "multiply", "numbers": [3, 4]}}
+            ]
+        },
+        "id": 5
+    }
+    process.stdin.write(json.dumps(stream_request) + "\n")
+    process.stdin.flush()
+    streamed = [json.loads(process.stdout.readline()) for _ in range(3)]
+    notifications, stream_response = streamed[:2], streamed[2]
+    assert all(n["method"] == "notifications/result" and n["params"]["requestId"] == 5 for n in notifications)
+    assert sorted((n["params"]["index"], n["params"]["result"]) for n in notifications) == [(0, 3), (1, 12)]
+    assert stream_response["id"] == 5 and stream_response["result"] == {"calls": 2, "succeeded": 2, "failed": 0}
+
     # Shutdown request
     shutdown_request = {
         "jsonrpc": "2.0",
@@ -97,5 +139,28 @@ def test_stdio_mode():
     
     print("All tests passed!")
 
+def test_smithery_stdio_shutdown():
+    """The Smithery runner selects stdio mode, and shutdown ends the process"""
+    process = subprocess.Popen(
+        [sys.executable, "smithery_mode.py"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        env={},
+        text=True,
+        bufsize=1
+    )
+    process.stdin.write(json.dumps({"jsonrpc": "2.0", "method": "shutdown", "id": 1}) + "\n")
+    process.stdin.flush()
+    # stdin stays open: only the shutdown request may end the process
+    assert json.loads(process.stdout.readline())["id"] == 1
+    try:
+        assert process.wait(timeout=10) == 0
+    finally:
+        process.kill()
+        process.stdin.close()
+        process.stdout.close()
+
 if __name__ == "__main__":
-    test_stdio_mode() 
\ No newline at end of file
+    test_stdio_mode()
+    test_smithery_stdio_shutdown() 
\ No newline at end of file
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+import json
+import subprocess
+import sys
+import time
+
+from stdio_transport import AutoFramer, ContentLengthFramer, FramingError, NdjsonFramer, encode_frame
+
+
+def feed_all(framer, data, chunk_size):
+    frames = []
+    for i in range(0, len(data), chunk_size):
+        frames.extend(framer.feed(data[i:i + chunk_size]))
+    return frames
+
+
+MESSAGES = [
+    {"jsonrpc": "2.0", "method": "execute", "params": {"text": "br{ack}[ets] \"quoted\" \\\\"}, "id": 1},
+    {"jsonrpc": "2.0", "method": "list_tools", "id": 2},
+    [{"jsonrpc": "2.0", "method": "list_tools", "id": 3}],
+]
+
+
+def test_ndjson_framing_any_chunking():
+    """Single-line, pretty-printed and concatenated messages frame identically"""
+    data = (
+        json.dumps(MESSAGES[0]) + "\n"
+        + json.dumps(MESSAGES[1], indent=2) + "\n"
+        + json.dumps(MESSAGES[2]) + json.dumps(MESSAGES[1]) + "\n"
+    ).encode("utf-8")
+    for chunk_size in (1, 7, len(data)):
+        framer = NdjsonFramer()
+        assert feed_all(framer, data, chunk_size) == MESSAGES + [MESSAGES[1]]
+        assert not framer.pending
+
+
+def test_ndjson_recovers_from_bad_input():
+    """Garbage, invalid and oversized messages each yield one error and framing resumes"""
+    framer = NdjsonFramer(max_message_size=200)
+    data = (
+        b"garbage\n"
+        + b'{"jsonrpc": "2.0", "method": tru}\n'
+        + b'{"oversized": "' + b"x" * 500 + b'"}\n'
+        + json.dumps(MESSAGES[1]).encode("utf-8") + b"\n"
+    )
+    frames = feed_all(framer, data, 16)
+    assert [type(f) for f in frames[:3]] == [FramingError] * 3
+    assert "exceeds 200 bytes" in frames[2].reason
+    assert frames[3:] == [MESSAGES[1]]
+
+    # A truncated message is reported at the next line that starts a message
+    for truncated in (b'{"jsonrpc": "2.0", "method": ', b'{"jsonrpc": "2.0", "method": "initialize", "id": 1',
+                      b'{"jsonrpc": "2.0", "method": "execute", "params": {"text": "cut'):
+        data = truncated + b"\n" + (json.dumps(MESSAGES[1]).encode("utf-8") + b"\n") * 8
+        for chunk_size in (1, 16, len(data)):
+            framer = NdjsonFramer(max_message_size=200)
+            frames = feed_all(framer, data, chunk_size)
+            assert isinstance(frames[0], FramingError) and frames[0].reason == "Incomplete JSON message"
+            assert frames[1:] == [MESSAGES[1]] * 8
+            assert not framer.pending
+
+
+def test_ndjson_newlines_before_brackets_inside_a_message():
+    """Lines starting with { or [ inside a message do not split it"""
+    batch = [MESSAGES[1], {"jsonrpc": "2.0", "method": "execute", "params": {"rows": [[1, 2], [3]]}, "id": 4}]
+    data = (json.dumps(MESSAGES[0], indent=0) + "\n"
+            + "[\n" + ",\n".join(json.dumps(member) for member in batch) + "\n]\n").encode("utf-8")
+    for chunk_size in (1, 5, len(data)):
+        framer = NdjsonFramer()
+        assert feed_all(framer, data, chunk_size) == [MESSAGES[0], batch]
+        assert not framer.pending
+
+
+def test_ndjson_multiline_framing_is_linear():
+    """A large pretty-printed message fed line by line is not re-parsed per line"""
+    message = {"jsonrpc": "2.0", "method": "execute", "params": {"numbers": list(range(50000))}, "id": 1}
+    lines = json.dumps(message, indent=1).encode("utf-8").splitlines(keepends=True)
+    framer = NdjsonFramer()
+    start = time.perf_counter()
+    frames = []
+    for line in lines:
+        frames.extend(framer.feed(line))
+    assert frames == [message]
+    assert time.perf_counter() - start < 2.0
+
+
+def test_content_length_framing():
+    """Header framing frames by length, rejects oversized bodies and is auto-detected"""
+    data = b"".join(encode_frame(json.dumps(m).encode("utf-8"), "content-length") for m in MESSAGES)
+    for chunk_size in (1, 11, len(data)):
+        assert feed_all(ContentLengthFramer(), data, chunk_size) == MESSAGES
+        auto = AutoFramer()
+        assert feed_all(auto, data, chunk_size) == MESSAGES
+        assert auto.mode == "content-length"
+
+    framer = ContentLengthFramer(max_message_size=10)
+    frames = framer.feed(encode_frame(b'{"x": "' + b"y" * 20 + b'"}', "content-length") + encode_frame(b"[1]", "content-length"))
+    assert isinstance(frames[0], FramingError) and frames[1:] == [[1]]
+
+
+PIPELINE_SCRIPT = """
+import asyncio
+from stdio_transport import StdioServer
+
+async def handler(message):
+    await asyncio.sleep(message["params"]["delay"])
+    return {"jsonrpc": "2.0", "result": message["method"], "error": None, "id": message["id"]}
+
+asyncio.run(StdioServer(handler, max_in_flight=int(__import__("sys").argv[1])).serve())
+"""
+
+
+def run_pipeline(max_in_flight):
+    requests = [("slow", 0.3), ("fast", 0.0), ("shutdown", 0.0), ("ignored", 0.0)]
+    data = "".join(
+        json.dumps({"jsonrpc": "2.0", "method": method, "params": {"delay": delay}, "id": index}) + "\n"
+        for index, (method, delay) in enumerate(requests)
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", PIPELINE_SCRIPT, str(max_in_flight)],
+        input=data, capture_output=True, text=True, timeout=10
+    ).stdout
+    return [json.loads(line)["result"] for line in output.splitlines()]
+
+
+def test_stdio_server_pipelines_requests():
+    """Responses are written as they complete; shutdown drains in-flight work first"""
+    assert run_pipeline(8) == ["fast", "slow", "shutdown"]
+    assert run_pipeline(1) == ["slow", "fast", "shutdown"]
+
+
+CANCEL_SCRIPT = """
+import asyncio
+from stdio_transport import StdioServer
+
+tasks = {}
+
+async def handler(message):
+    if message["method"] == "notifications/cancelled":
+        tasks[message["params"]["requestId"]].cancel()
+        return None
+    tasks[message["id"]] = asyncio.current_task()
+    try:
+        await asyncio.sleep(message["params"]["delay"])
+        result = message["method"]
+    except asyncio.CancelledError:
+        result = "cancelled"
+    return {"jsonrpc": "2.0", "result": result, "error": None, "id": message["id"]}
+
+asyncio.run(StdioServer(handler, max_in_flight=1).serve())
+"""
+
+
+def test_stdio_server_cancels_at_its_cap():
+    """A cancel notification does not wait for the request it cancels to free its slot"""
+    messages = [
+        {"jsonrpc": "2.0", "method": "slow", "params": {"delay": 5.0}, "id": 1},
+        {"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": 1}},
+        {"jsonrpc": "2.0", "method": "shutdown", "params": {"delay": 0.0}, "id": 2},
+    ]
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CANCEL_SCRIPT], input="".join(json.dumps(m) + "\n" for m in messages),
+        capture_output=True, text=True, timeout=10
+    ).stdout
+    assert [json.loads(line)["result"] for line in output.splitlines()] == ["cancelled", "shutdown"]
+    assert time.perf_counter() - start < 4.0
+
+
+BACKPRESSURE_SCRIPT = """
+import asyncio
+import sys
+from stdio_transport import StdioServer
+
+sent = 0
+
+async def handler(message):
+    global sent
+    for index in range(message["params"]["count"]):
+        await server.notify({"jsonrpc": "2.0", "method": "notifications/result", "params": {"index": index, "pad": "x" * 1000}})
+        sent += 1
+    return {"jsonrpc": "2.0", "result": sent, "error": None, "id": message["id"]}
+
+async def probe():
+    await asyncio.sleep(0.5)
+    print(sent, file=sys.stderr, flush=True)
+
+async def main():
+    asyncio.get_running_loop().create_task(probe())
+    await server.serve()
+
+server = StdioServer(handler, send_queue_size=4)
+asyncio.run(main())
+"""
+
+
+def test_stdio_server_outbox_is_bounded():
+    """Notifications wait for room while stdout is not read, then all arrive"""
+    count = 5000
+    process = subprocess.Popen(
+        [sys.executable, "-c", BACKPRESSURE_SCRIPT], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE, text=True
+    )
+    request = {"jsonrpc": "2.0", "method": "stream", "params": {"count": count}, "id": 1}
+    process.stdin.write(json.dumps(request) + "\n")
+    process.stdin.flush()
+    # Nothing reads stdout yet: only a pipe buffer and the outbox fit
+    assert int(process.stderr.readline()) < count // 2
+    process.stdin.close()
+    lines = process.stdout.read().splitlines()
+    process.wait(timeout=10)
+    process.stdout.close()
+    process.stderr.close()
+    assert len(lines) == count + 1 and json.loads(lines[-1])["result"] == count
+
+
+if __name__ == "__main__":
+    test_ndjson_framing_any_chunking()
+    test_ndjson_recovers_from_bad_input()
+    test_ndjson_newlines_before_brackets_inside_a_message()
+    test_ndjson_multiline_framing_is_linear()
+    test_content_length_framing()
+    test_stdio_server_pipelines_requests()
+    test_stdio_server_cancels_at_its_cap()
+    test_stdio_server_outbox_is_bounded()
+    print("All tests passed!")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+import json
+
+import jsonrpc
+from tool_registry import ToolRegistry
+
+
+class EchoTool:
+    def __init__(self, name="echo"):
+        self.name = name
+        self.description = "Echoes its parameters"
+        self.parameters = {"type": "object", "properties": {}}
+
+    def execute(self, params):
+        return params
+
+
+def test_catalog_is_cached_until_registry_changes():
+    """The catalog is built once and rebuilt only on register/unregister"""
+    registry = ToolRegistry()
+    registry.register(EchoTool())
+
+    catalog = registry.catalog
+    assert registry.catalog is catalog
+    assert json.loads(catalog.body) == {
+        "echo": {"name": "echo", "description": "Echoes its parameters", "parameters": {"type": "object", "properties": {}}}
+    }
+
+    registry.register(EchoTool("other"))
+    assert registry.catalog is not catalog
+    assert registry.catalog.etag != catalog.etag
+    assert set(json.loads(registry.catalog.body)) == {"echo", "other"}
+
+    registry.unregister("other")
+    assert set(json.loads(registry.catalog.body)) == {"echo"}
+
+
+def test_catalog_etag_and_encoded_results():
+    """Responses splice the cached catalog bytes, alone or in a batch, and ETags are honoured"""
+    registry = ToolRegistry()
+    registry.register(EchoTool())
+    catalog = registry.catalog
+    assert catalog.tools_result.data is catalog.body
+
+    for request_id in (1, "abc", None):
+        for result in (catalog.tools_result, catalog.initialize_result):
+            response = jsonrpc.result_response(result, request_id)
+            expected = jsonrpc.result_response(result.value, request_id)
+            assert json.loads(jsonrpc.dumps(response)) == expected
+            other = jsonrpc.error_response(jsonrpc.INTERNAL_ERROR, "Internal error", 2)
+            assert json.loads(jsonrpc.dumps([other, response])) == [other, expected]
+    assert json.loads(catalog.initialize_result.data)["capabilities"]["tools"] == json.loads(catalog.body)
+
+    assert catalog.matches(catalog.etag)
+    assert catalog.matches(f'"stale", {catalog.etag}')
+    assert catalog.matches("*")
+    assert not catalog.matches('"stale"')
+    assert not catalog.matches(None)
+
+
+if __name__ == "__main__":
+    test_catalog_is_cached_until_registry_changes()
+    test_catalog_etag_and_encoded_results()
+    print("All tests passed!")
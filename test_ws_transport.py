@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import time
+
+from ws_transport import WebSocketSession
+
+
+class FakeWebSocket:
+    """Feeds queued text frames to the session and records what it sends"""
+
+    def __init__(self, messages, expected=3):
+        self.expected = expected
+        self.incoming = asyncio.Queue()
+        for message in messages:
+            self.incoming.put_nowait({"type": "websocket.receive", "text": message})
+        self.sent = []
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+        if len(self.sent) == self.expected:
+            self.incoming.put_nowait({"type": "websocket.disconnect", "code": 1000})
+
+
+async def handler(data):
+    await asyncio.sleep(data["params"]["delay"])
+    return {"jsonrpc": "2.0", "result": data["method"], "error": None, "id": data["id"]}
+
+
+def run_session(max_in_flight):
+    messages = [
+        json.dumps({"jsonrpc": "2.0", "method": "slow", "params": {"delay": 0.2}, "id": 1}),
+        "{not json",
+        json.dumps({"jsonrpc": "2.0", "method": "fast", "params": {"delay": 0.0}, "id": 2}),
+    ]
+
+    async def run():
+        websocket = FakeWebSocket(messages)
+        try:
+            await WebSocketSession(websocket, handler, max_in_flight=max_in_flight, send_queue_size=1).serve()
+        except Exception as e:
+            assert type(e).__name__ == "WebSocketDisconnect"
+        return websocket.sent
+
+    return asyncio.run(run())
+
+
+def test_websocket_session_multiplexes_requests():
+    """Responses are sent as they complete; a bad frame does not end the session"""
+    sent = run_session(max_in_flight=8)
+    assert sent[0]["error"]["code"] == -32700
+    assert [response["id"] for response in sent[1:]] == [2, 1]
+
+    sent = run_session(max_in_flight=1)
+    assert [response["id"] for response in sent if response["id"] is not None] == [1, 2]
+
+
+def test_cancel_reaches_requests_holding_every_slot():
+    """A cancel notification is dispatched while the connection is at its cap"""
+    tasks = {}
+
+    async def cancellable(data):
+        if data["method"] == "notifications/cancelled":
+            tasks[data["params"]["requestId"]].cancel()
+            return None
+        tasks[data["id"]] = asyncio.current_task()
+        try:
+            await asyncio.sleep(data["params"]["delay"])
+            result = data["method"]
+        except asyncio.CancelledError:
+            result = "cancelled"
+        return {"jsonrpc": "2.0", "result": result, "error": None, "id": data["id"]}
+
+    messages = [
+        json.dumps({"jsonrpc": "2.0", "method": "slow", "params": {"delay": 5.0}, "id": 1}),
+        json.dumps({"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": 1}}),
+        json.dumps({"jsonrpc": "2.0", "method": "fast", "params": {"delay": 0.0}, "id": 2}),
+    ]
+
+    async def run():
+        websocket = FakeWebSocket(messages, expected=2)
+        try:
+            await WebSocketSession(websocket, cancellable, max_in_flight=1).serve()
+        except Exception as e:
+            assert type(e).__name__ == "WebSocketDisconnect"
+        return websocket.sent
+
+    start = time.perf_counter()
+    sent = asyncio.run(run())
+    assert [response["result"] for response in sent] == ["cancelled", "fast"]
+    assert time.perf_counter() - start < 2.0
+
+
+if __name__ == "__main__":
+    test_websocket_session_multiplexes_requests()
+    test_cancel_reaches_requests_holding_every_slot()
+    print("All tests passed!")
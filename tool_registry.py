@@ -0,0 +1,175 @@
+"""
+Tool registry for the MCP server.
+The registry owns the set of available tools and a cached, pre-serialized
+catalog of their schemas. The catalog is rebuilt only when a tool is
+registered or removed, so list_tools, initialize and GET /tools can be
+answered without walking the tools or re-encoding their schemas: the two
+methods return jsonrpc.Encoded results, whose bytes every transport splices
+into the response. Each tool's
+parameters schema is also compiled into a validator when the tool is
+registered (see schema.py), so calls are checked without re-reading it.
+A tool can add checks the schema cannot express with a `validate(params)`
+method raising schema.ValidationError; it runs after the schema passed.
+"""
+
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+import jsonrpc
+from schema import compile_schema
+
+SERVER_NAME = "Python MCP Calculator Server"
+SERVER_VERSION = "1.0.0"
+
+
+Check = Callable[[Any], None]
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def _validator(tool: Any) -> Optional[Check]:
+    """The tool's compiled schema, followed by the tool's own `validate`, if any"""
+    schema_check = compile_schema(tool.parameters)
+    tool_check = getattr(tool, "validate", None)
+    if not callable(tool_check):
+        return schema_check
+    if schema_check is None:
+        return tool_check
+
+    def check(params: Any) -> None:
+        schema_check(params)
+        tool_check(params)
+    return check
+
+
+class ToolCatalog:
+    """Immutable snapshot of the tool schemas at one registry version"""
+
+    __slots__ = ("version", "schemas", "body", "etag", "tools_result", "initialize_result")
+
+    def __init__(self, version: int, schemas: Dict[str, Dict[str, Any]]):
+        self.version = version
+        self.schemas = schemas
+        self.body = _encode(schemas)
+        digest = hashlib.sha1(self.body).hexdigest()[:16]
+        self.etag = f'"{version}-{digest}"'
+        # The list_tools and initialize results (shared, do not mutate)
+        self.tools_result = jsonrpc.Encoded(schemas, self.body)
+        initialize = {
+            "name": SERVER_NAME,
+            "version": SERVER_VERSION,
+            "capabilities": {
+                "tools": schemas
+            }
+        }
+        self.initialize_result = jsonrpc.Encoded(initialize, _encode(initialize))
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Check an If-None-Match header value against the catalog ETag"""
+        if not if_none_match:
+            return False
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or self.etag in candidates or f"W/{self.etag}" in candidates
+
+
+class ToolRegistry:
+    """Name -> tool mapping with a lazily built, cached catalog"""
+
+    def __init__(self):
+        self._tools: Dict[str, Any] = {}
+        self._validators: Dict[str, Optional[Check]] = {}
+        self._lock = threading.Lock()
+        self._version = 0
+        self._catalog: Optional[ToolCatalog] = None
+
+    def register(self, tool: Any) -> None:
+        validator = _validator(tool)
+        with self._lock:
+            self._tools[tool.name] = tool
+            self._validators[tool.name] = validator
+            self._invalidate_locked()
+        logger.debug(f"Registered tool '{tool.name}' (catalog version {self._version})")
+
+    def unregister(self, name: str) -> Any:
+        with self._lock:
+            tool = self._tools.pop(name)
+            self._validators.pop(name, None)
+            self._invalidate_locked()
+        logger.debug(f"Unregistered tool '{name}' (catalog version {self._version})")
+        return tool
+
+    def update(self, register: Iterable[Any] = (), unregister: Iterable[str] = ()) -> None:
+        """Remove and add several tools as one change: one new catalog version"""
+        register, unregister = list(register), list(unregister)
+        validators = {tool.name: _validator(tool) for tool in register}
+        with self._lock:
+            for name in unregister:
+                self._tools.pop(name, None)
+                self._validators.pop(name, None)
+            for tool in register:
+                self._tools[tool.name] = tool
+            self._validators.update(validators)
+            self._invalidate_locked()
+        logger.debug(f"Updated tools: registered {[tool.name for tool in register]}, "
+                     f"unregistered {unregister} (catalog version {self._version})")
+
+    def invalidate(self) -> None:
+        """Drop the cached catalog, e.g. after a tool changed its schema in place"""
+        with self._lock:
+            self._validators = {name: _validator(tool) for name, tool in self._tools.items()}
+            self._invalidate_locked()
+
+    def validate(self, name: str, params: Any) -> None:
+        """Check a call's parameters against the tool's schema and checks; raises schema.ValidationError"""
+        validator = self._validators.get(name)
+        if validator is not None:
+            validator(params)
+
+    def _invalidate_locked(self) -> None:
+        self._version += 1
+        self._catalog = None
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def catalog(self) -> ToolCatalog:
+        catalog = self._catalog
+        if catalog is not None:
+            return catalog
+        with self._lock:
+            if self._catalog is None:
+                schemas = {}
+                for name, tool in self._tools.items():
+                    schemas[name] = {
+                        "name": tool.name,
+                        "description": tool.description,
+                        "parameters": tool.parameters
+                    }
+                self._catalog = ToolCatalog(self._version, schemas)
+            return self._catalog
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self._tools.get(name, default)
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return list(self._tools.items())
+
+    def __getitem__(self, name: str) -> Any:
+        return self._tools[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._tools
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._tools))
+
+    def __len__(self) -> int:
+        return len(self._tools)
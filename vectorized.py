@@ -0,0 +1,171 @@
+"""
+Vectorized NumPy engine for the calculator tool.
+Large operands can be sent as a typed binary payload (`numbers_b64`: base64
+of little-endian float64 values), which is decoded straight into a float64
+array instead of being parsed element by element as JSON. Payloads with at
+least `threshold` elements (MCP_VECTOR_THRESHOLD, passed in by the
+calculator) are reduced with NumPy ufuncs, as are batched 2-D `numbers` of
+at least that many elements.
+
+Tolerance against the pure-Python path over the same float64 values:
+- multiply, divide, min and max agree exactly
+- add, subtract, mean, sum_of_squares and dot use NumPy's pairwise or BLAS
+  summation, which may differ from the sequential Python sum by at most
+  n * 2**-53 * sum(|term|)
+Integer arrays are only reduced in int64 when the result provably cannot
+overflow; otherwise the exact pure-Python path is used.
+
+NumPy is optional. Without it binary payloads are decoded with the `array`
+module and reduced by the pure-Python path, so results stay the same. It is
+imported on the first input large enough to use it, so processes that only
+see small inputs never pay for importing it.
+"""
+
+import base64
+import binascii
+import sys
+from array import array
+from typing import Any, List, Optional, Sequence
+
+_NOT_LOADED = object()
+np: Any = _NOT_LOADED
+
+DEFAULT_VECTOR_THRESHOLD = 1024
+FLOAT64_SIZE = 8
+INT64_LIMIT = 2 ** 63
+FLOAT64_EXACT_INT = 2 ** 53
+MATRIX_SHAPE_ERROR = "numbers must be a list of numbers or a list of equal-length rows"
+
+
+def available() -> bool:
+    """Whether NumPy can be used, importing it on the first call"""
+    global np
+    if np is _NOT_LOADED:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:  # NumPy is an optional speed-up
+            np = None
+    return np is not None
+
+
+def decode_float64(data: str, threshold: int = DEFAULT_VECTOR_THRESHOLD) -> Sequence[float]:
+    """Decode base64 little-endian float64 values without per-element parsing"""
+    if not isinstance(data, str):
+        raise ValueError("numbers_b64 must be a base64 string")
+    try:
+        raw = base64.b64decode(data, validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError("numbers_b64 is not valid base64")
+    if len(raw) % FLOAT64_SIZE:
+        raise ValueError("numbers_b64 must encode little-endian float64 values (8 bytes each)")
+
+    if len(raw) // FLOAT64_SIZE >= threshold and available():
+        return np.frombuffer(raw, dtype="<f8")
+    values = array("d", raw)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tolist()
+
+
+def is_vector(numbers: Any) -> bool:
+    # Only arrays made by this module can be ndarrays, so never import here
+    return np is not None and np is not _NOT_LOADED and isinstance(numbers, np.ndarray)
+
+
+def _fold(operation: str, values: "np.ndarray", axis: int = 0) -> "np.ndarray":
+    if operation == "add":
+        return np.add.reduce(values, axis=axis)
+    elif operation == "subtract":
+        head = values.take(0, axis=axis)
+        rest = values[1:] if axis == 0 else values[:, 1:]
+        return head - np.add.reduce(rest, axis=axis)
+    elif operation == "multiply":
+        return np.multiply.reduce(values, axis=axis)
+    elif operation == "divide":
+        rest = values[1:] if axis == 0 else values[:, 1:]
+        if np.count_nonzero(rest) != rest.size:
+            raise ValueError("Division by zero is not allowed")
+        return np.divide.reduce(values, axis=axis)
+    elif operation == "mean":
+        return np.add.reduce(values, axis=axis) / values.shape[axis]
+    elif operation == "min":
+        return np.minimum.reduce(values, axis=axis)
+    elif operation == "max":
+        return np.maximum.reduce(values, axis=axis)
+    elif operation == "sum_of_squares":
+        if values.ndim == 1:
+            return np.dot(values, values)
+        return np.einsum("ij,ij->j" if axis == 0 else "ij,ij->i", values, values)
+    raise ValueError(f"Unknown operation: {operation}")
+
+
+def reduce(operation: str, values: "np.ndarray") -> Any:
+    """Fold a 1-D float64 array with the calculator semantics"""
+    with np.errstate(all="ignore"):
+        return _fold(operation, values).item()
+
+
+def _max_abs(values: "np.ndarray") -> int:
+    return max(abs(int(values.min())), abs(int(values.max()))) if values.size else 0
+
+
+def _int64_safe(operation: str, values: "np.ndarray", count: int) -> Optional["np.ndarray"]:
+    """Return an array that reduces without int64 overflow, or None"""
+    largest = _max_abs(values)
+    if operation in ("min", "max"):
+        return values
+    if operation in ("add", "subtract", "mean"):
+        return values if count * largest < INT64_LIMIT else None
+    if operation == "sum_of_squares":
+        return values if count * largest * largest < INT64_LIMIT else None
+    if operation == "divide" and largest <= FLOAT64_EXACT_INT:
+        # Every operand is exact in float64, so the first division rounds
+        # exactly like Python's int / int
+        return values.astype(np.float64)
+    return None
+
+
+def as_matrix(rows: List[Any]) -> Optional["np.ndarray"]:
+    """Convert a list of equal-length rows to a 2-D int64/float64 array.
+
+    Returns None when the rows hold values NumPy cannot reduce exactly
+    (big integers, strings, ...); callers fall back to the Python path.
+    """
+    try:
+        values = np.array(rows)
+    except (ValueError, OverflowError):
+        raise ValueError(MATRIX_SHAPE_ERROR)
+    if values.ndim != 2 or values.dtype.kind not in "if":
+        return None
+    return values
+
+
+def reduce_axis(operation: str, values: "np.ndarray", axis: int) -> Optional[List[Any]]:
+    """Reduce a 2-D array along `axis`; None if int64 could not stay exact"""
+    if values.dtype.kind == "i":
+        values = _int64_safe(operation, values, values.shape[axis])
+        if values is None:
+            return None
+    with np.errstate(all="ignore"):
+        return _fold(operation, values, axis=axis).tolist()
+
+
+def dot(numbers: List[Any], vector: List[Any]) -> Optional[Any]:
+    """Dot product of 1-D or 2-D numbers with a vector; None if not exact"""
+    try:
+        values = np.array(numbers)
+        other = np.asarray(vector)
+    except (ValueError, OverflowError):
+        return None
+    if values.ndim not in (1, 2) or values.dtype.kind not in "if":
+        return None
+    if other.ndim != 1 or other.dtype.kind not in "if":
+        return None
+    if values.shape[-1] != other.shape[0]:
+        raise ValueError("vector must have one entry per column of numbers")
+    if values.dtype.kind == "i" and other.dtype.kind == "i":
+        if other.shape[0] * _max_abs(values) * _max_abs(other) >= INT64_LIMIT:
+            return None
+    with np.errstate(all="ignore"):
+        return np.dot(values, other).tolist()
@@ -0,0 +1,129 @@
+"""
+WebSocket transport for the MCP server.
+A WebSocketSession handles the messages of one connection concurrently:
+every message is dispatched in its own task, at most MCP_WS_MAX_IN_FLIGHT
+per connection, and each response is sent as soon as it is ready, so clients
+match responses to requests by id.
+
+Responses go through a bounded send queue (MCP_WS_SEND_QUEUE_SIZE entries)
+drained by a single sender task. When a client reads slower than it sends,
+the queue fills, finished requests wait for room while still holding their
+in-flight slot, and the session stops reading new messages until the client
+catches up. Cancel notifications are dispatched without waiting for a slot,
+so a client can cancel requests even when all of its slots are taken.
+Handlers can send notifications ahead of their response through `notify`,
+which waits for room the same way. Errors the session raises itself
+(unparseable messages, failing handlers) are also passed to `on_error`, e.g.
+to count them.
+
+The limits are passed in by the server from its ServerConfig.
+permessage-deflate is negotiated by the ASGI server; see
+`ws_per_message_deflate` in server.start_http_mode (MCP_WS_PER_MESSAGE_DEFLATE).
+"""
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional, Union
+
+import jsonrpc
+from admission import AdmissionController
+
+if TYPE_CHECKING:
+    from fastapi import WebSocket
+
+DEFAULT_MAX_IN_FLIGHT = 64
+DEFAULT_SEND_QUEUE_SIZE = 256
+
+Handler = Callable[[Any], Awaitable[Optional[Union[bytes, dict, list]]]]
+
+
+class WebSocketSession:
+    """Concurrent JSON-RPC over one WebSocket connection"""
+
+    def __init__(self, websocket: "WebSocket", handler: Handler,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT, send_queue_size: int = DEFAULT_SEND_QUEUE_SIZE,
+                 on_error: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.websocket = websocket
+        self.handler = handler
+        self.max_in_flight = max(1, max_in_flight)
+        self.on_error = on_error
+        self._outbox: asyncio.Queue = asyncio.Queue(maxsize=max(1, send_queue_size))
+
+    async def _send(self, response: Union[bytes, dict, list]) -> None:
+        """Queue a response, waiting while the send queue is full"""
+        if not isinstance(response, bytes):
+            response = jsonrpc.dumps(response)
+        await self._outbox.put(response)
+
+    async def notify(self, message: Dict[str, Any]) -> None:
+        """Send a message ahead of the response, e.g. a streamed result"""
+        await self._send(message)
+
+    async def _send_error(self, code: int, message: str, request_id: Any = None, data: Any = None) -> None:
+        response = jsonrpc.error_response(code, message, request_id, data)
+        if self.on_error is not None:
+            self.on_error(response)
+        await self._send(response)
+
+    async def _send_loop(self) -> None:
+        outbox = self._outbox
+        while True:
+            data = await outbox.get()
+            if data is None:
+                return
+            await self.websocket.send_text(data.decode("utf-8"))
+
+    async def _run(self, data: Any, slots: Optional[asyncio.Semaphore]) -> None:
+        try:
+            try:
+                response = await self.handler(data)
+            except Exception as e:
+                await self._send_error(jsonrpc.INTERNAL_ERROR, "Internal error", jsonrpc.extract_id(data), str(e))
+                return
+            if response is not None:
+                await self._send(response)
+        finally:
+            if slots is not None:
+                slots.release()
+
+    async def _receive(self) -> Union[str, bytes]:
+        message = await self.websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            # Imported here so that importing this module (e.g. for its
+            # defaults, from config.py) does not import the web stack
+            from fastapi import WebSocketDisconnect
+            raise WebSocketDisconnect(message.get("code", 1000))
+        text = message.get("text")
+        return text if text is not None else message.get("bytes") or b""
+
+    async def serve(self) -> None:
+        """Read and dispatch messages until the client disconnects"""
+        sender = asyncio.create_task(self._send_loop())
+        slots = asyncio.Semaphore(self.max_in_flight)
+        in_flight = set()
+        try:
+            while not sender.done():
+                raw = await self._receive()
+                try:
+                    data = jsonrpc.loads(raw)
+                except ValueError as e:
+                    await self._send_error(jsonrpc.PARSE_ERROR, "Parse error", None, str(e))
+                    continue
+
+                if AdmissionController.exempt(data):
+                    # Cancel notifications take no slot: they must reach the
+                    # requests holding every slot
+                    task = asyncio.create_task(self._run(data, None))
+                else:
+                    # Waits here once max_in_flight requests are running
+                    await slots.acquire()
+                    task = asyncio.create_task(self._run(data, slots))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+        finally:
+            # The client is gone (or the sender failed): nobody can receive
+            # the remaining responses, so drop the outstanding work
+            for task in list(in_flight) + [sender]:
+                task.cancel()
+            await asyncio.gather(*in_flight, sender, return_exceptions=True)
+        if not sender.cancelled() and sender.exception() is not None:
+            raise sender.exception()